@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
+
+from utils.search import ensure_trigram_extension
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Import signals to register them
+        from . import signals  # noqa: F401
+
+        # pg_trgm backs the search indexes on users, projects and templates
+        pre_migrate.connect(
+            ensure_trigram_extension,
+            sender=self,
+            dispatch_uid="accounts.ensure_trigram_extension",
+        )
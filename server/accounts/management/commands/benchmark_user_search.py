@@ -0,0 +1,134 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from accounts.models import Users
+from utils.search import USER_SEARCH_FIELDS, search
+
+
+class _Rollback(Exception):
+    pass
+
+
+SYLLABLES = "ka mu ni wa ja ro be li to sa ke di na mo pe zi go ha ri yu".split()
+
+
+def _name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time user search on a synthetic population (default 100k users) with "
+        "and without the trigram indexes. Runs in a transaction that is rolled "
+        "back unless --keep is given; use a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--runs", type=int, default=20, help="Timed runs per query")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated users"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                if not options["keep"]:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Rolled back the generated users")
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        self.stdout.write(f"Generating {options['users']} users...")
+        samples = self.seed_users(rng, options["users"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Users._meta.db_table}")
+
+        queries = {
+            "name prefix": samples["first_name"][:3],
+            "full name": f"{samples['first_name']} {samples['last_name']}",
+            "email fragment": samples["email"].split("@")[0][-6:],
+            "phone digits": samples["phone"][-5:],
+        }
+        base = Users.objects.filter(type="tenant", is_deleted=False)
+
+        def legacy(q):
+            return base.filter(
+                Q(phone__icontains=q)
+                | Q(email__icontains=q)
+                | Q(first_name__icontains=q)
+                | Q(last_name__icontains=q)
+            ).order_by("first_name", "last_name")[:20]
+
+        def ranked(q):
+            return search(base, q, USER_SEARCH_FIELDS).order_by(
+                "-search_rank", "first_name", "last_name"
+            )[:20]
+
+        for label, q in queries.items():
+            plan = search(base, q, USER_SEARCH_FIELDS).explain()
+            uses_index = "_trgm" in plan
+            self.stdout.write(f"\n{label}: {q!r} (trigram index used: {uses_index})")
+            self.report("  search()", ranked, q, options["runs"])
+            self.report("  legacy icontains", legacy, q, options["runs"])
+            # Forces the sequential scan every search did before the indexes
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_bitmapscan = off")
+                cursor.execute("SET LOCAL enable_indexscan = off")
+            try:
+                self.report("  search(), no index", ranked, q, options["runs"])
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute("RESET enable_bitmapscan")
+                    cursor.execute("RESET enable_indexscan")
+
+    def seed_users(self, rng, count, batch_size=5000):
+        sample = None
+        created = 0
+        while created < count:
+            batch = []
+            for i in range(created, min(created + batch_size, count)):
+                first_name, last_name = _name(rng), _name(rng)
+                suffix = "".join(rng.choices(string.ascii_lowercase, k=4))
+                email = f"{first_name}.{last_name}.{i}{suffix}@example.com"
+                batch.append(
+                    Users(
+                        username=f"bench-{i}-{suffix}",
+                        email=email.lower(),
+                        phone=f"07{rng.randint(0, 99_999_999):08d}",
+                        first_name=first_name,
+                        last_name=last_name,
+                        type="tenant",
+                        password="!",
+                    )
+                )
+            Users.objects.bulk_create(batch)
+            created += len(batch)
+            if sample is None:
+                sample = batch[len(batch) // 2]
+        return {
+            field: getattr(sample, field)
+            for field in ("first_name", "last_name", "email", "phone")
+        }
+
+    def report(self, label, build, q, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            rows = list(build(q))
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{label}: {len(rows)} rows, p50 {statistics.median(timings):.1f} ms, "
+            f"p95 {p95:.1f} ms"
+        )
@@ -6,6 +6,7 @@ from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from django.utils import timezone
 
+from utils.search import trigram_indexes
 from utils.validate import validate_media
 
 
@@ -161,6 +162,7 @@ class Users(AbstractUser):
         ordering = ("-created_at",)
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = trigram_indexes("users", "first_name", "last_name", "email", "phone")
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import BlockedIP
+from utils.ip_blocklist import publish_blocklist_change
+
+
+@receiver(post_save, sender=BlockedIP)
+@receiver(post_delete, sender=BlockedIP)
+def blocked_ip_changed(sender, instance, **kwargs):
+    publish_blocklist_change(instance.blocked_ip)
@@ -6,7 +6,6 @@ import django_filters
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Permission
 from django.db import transaction
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
@@ -23,6 +22,7 @@ from accounts.models import Users
 from company.models import Owner
 from utils.custom_pagination import CustomPageNumberPagination
 from utils.email_utils import send_welcome_email
+from utils.search import USER_SEARCH_FIELDS, search_filter
 from utils.serilaizer import flatten_errors
 
 from .serilazier import (
@@ -81,12 +81,7 @@ class StaffFilter(django_filters.FilterSet):
         """
         Search in first_name, last_name, email, and phone fields.
         """
-        return queryset.filter(
-            Q(first_name__icontains=value)
-            | Q(last_name__icontains=value)
-            | Q(email__icontains=value)
-            | Q(phone__icontains=value)
-        )
+        return search_filter(queryset, value, USER_SEARCH_FIELDS)
 
 
 @extend_schema(
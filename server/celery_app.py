@@ -23,9 +23,21 @@ def import_tasks():
         from payments.tasks import (
             calculate_single_owner_payout,
             calculate_all_owner_payouts_for_period,
+            recompute_dirty_payouts,
             generate_monthly_invoices,
+            generate_invoices_for_partition,
+            finalize_monthly_invoices,
             send_invoice_reminders,
+            process_payment_callback,
+            requeue_stale_payment_callbacks,
+            import_transaction_file,
         )
+        from notifications.tasks import (
+            requeue_stale_outbound_emails,
+            send_outbound_emails,
+        )
+        from dashboard.tasks import refresh_dashboard_metrics
+        from reports.tasks import export_report
 
         return True
     except Exception as e:
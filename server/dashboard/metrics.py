@@ -0,0 +1,307 @@
+"""
+Dashboard metrics.
+
+Every dashboard tile is computed with a couple of conditional aggregates
+and kept in the default (Redis) cache. A periodic task refreshes the cache
+on a short cadence and PropertyTenant/Invoice/Receipt/Expense/Payout writes
+schedule an earlier, debounced refresh, so page loads read the cache
+instead of querying Postgres.
+"""
+
+import logging
+
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from payments.models import Expense, Invoice, Payout, Receipt
+from properties.models import LocationNode, PropertyTenant
+from utils.currency import get_serialized_default_currency
+from utils.format import format_money_with_currency
+
+logger = logging.getLogger(__name__)
+
+# Comfortably longer than the refresh cadence, so readers never miss
+DASHBOARD_CACHE_TIMEOUT = 60 * 10
+# Writes within this window share one refresh
+DASHBOARD_REFRESH_DEBOUNCE = 10
+
+_REFRESH_PENDING_KEY = "dashboard:refresh_pending"
+
+FULL_MANAGEMENT = "FULL_MANAGEMENT"
+SERVICE_ONLY = "SERVICE_ONLY"
+
+
+def _cache_key(name):
+    return f"dashboard:{name}"
+
+
+def build_stats():
+    """Property and lease tiles, in two scans"""
+    today = timezone.now().date()
+    thirty_days_from_now = today + relativedelta(days=30)
+
+    nodes = LocationNode.objects.filter(
+        is_deleted=False, node_type__in=["UNIT", "HOUSE"]
+    ).aggregate(
+        total=Count("id"),
+        full_management=Count(
+            "id",
+            filter=Q(unit_detail__management_mode=FULL_MANAGEMENT)
+            | Q(villa_detail__management_mode=FULL_MANAGEMENT),
+        ),
+        services_only=Count(
+            "id",
+            filter=Q(unit_detail__management_mode=SERVICE_ONLY)
+            | Q(villa_detail__management_mode=SERVICE_ONLY),
+        ),
+    )
+
+    leases = PropertyTenant.objects.filter(is_deleted=False).aggregate(
+        rented=Count(
+            "id",
+            filter=Q(
+                contract_end__gte=today,
+                node__is_deleted=False,
+                node__node_type__in=["UNIT", "HOUSE"],
+            ),
+        ),
+        active=Count("id", filter=Q(contract_end__gte=today)),
+        ending_soon=Count(
+            "id",
+            filter=Q(contract_end__gte=today, contract_end__lte=thirty_days_from_now),
+        ),
+        expired=Count("id", filter=Q(contract_end__lt=today)),
+    )
+
+    total_properties = nodes["total"]
+    occupancy_rate = (
+        (leases["rented"] / total_properties * 100) if total_properties > 0 else 0
+    )
+
+    return {
+        "totalProperties": total_properties,
+        "fullManagement": nodes["full_management"],
+        "servicesOnly": nodes["services_only"],
+        "occupancyRate": round(occupancy_rate, 1),
+        # Active tenants and active contracts are the same leases
+        "activeTenants": leases["active"],
+        "activeContracts": leases["active"],
+        "leasesEndingSoon": leases["ending_soon"],
+        "expiredLeases": leases["expired"],
+    }
+
+
+def build_finance_summary():
+    """Current month totals and the 12-month expense/payout chart"""
+    today = timezone.now().date()
+    current_month = today.month
+    current_year = today.year
+    currency = get_serialized_default_currency()
+
+    total_received = (
+        Receipt.objects.filter(
+            payment_date__year=current_year,
+            payment_date__month=current_month,
+            is_deleted=False,
+        ).aggregate(total=Sum("paid_amount"))["total"]
+        or 0
+    )
+
+    expenses_by_month = dict(
+        Expense.objects.filter(
+            invoice_date__year=current_year,
+            status__in=["approved", "paid"],
+            is_deleted=False,
+        )
+        .values("invoice_date__month")
+        .annotate(total=Sum("total_amount"))
+        .values_list("invoice_date__month", "total")
+    )
+    payouts_by_month = dict(
+        Payout.objects.filter(
+            year=current_year,
+            status__in=["completed", "paid", "pending"],
+            is_deleted=False,
+        )
+        .values("month")
+        .annotate(total=Sum("net_amount"))
+        .values_list("month", "total")
+    )
+
+    total_expenses = expenses_by_month.get(current_month) or 0
+    total_payouts = payouts_by_month.get(current_month) or 0
+    net_income = total_received - (total_expenses + total_payouts)
+
+    chart_data = [
+        {
+            "month": timezone.datetime(current_year, month, 1).strftime("%b"),
+            "expenses": float(expenses_by_month.get(month) or 0),
+            "payouts": float(payouts_by_month.get(month) or 0),
+        }
+        for month in range(1, 13)
+    ]
+
+    return {
+        "summary": {
+            "totalReceived": format_money_with_currency(total_received, currency),
+            "totalExpenses": format_money_with_currency(total_expenses, currency),
+            "totalPayouts": format_money_with_currency(total_payouts, currency),
+            "netIncome": format_money_with_currency(net_income, currency),
+        },
+        "chartData": chart_data,
+    }
+
+
+def build_recent_transactions():
+    """Ten most recent invoices, receipts, expenses and payouts combined"""
+    currency = get_serialized_default_currency()
+
+    recent_invoices = (
+        Invoice.objects.filter(is_deleted=False)
+        .select_related("property")
+        .order_by("-created_at")[:10]
+    )
+    recent_receipts = (
+        Receipt.objects.filter(is_deleted=False)
+        .select_related("invoice__property")
+        .order_by("-created_at")[:10]
+    )
+    recent_expenses = (
+        Expense.objects.filter(is_deleted=False)
+        .select_related("vendor", "location_node")
+        .order_by("-created_at")[:10]
+    )
+    recent_payouts = (
+        Payout.objects.filter(is_deleted=False)
+        .select_related("owner", "property_node")
+        .order_by("-created_at")[:10]
+    )
+
+    transactions = []
+
+    for invoice in recent_invoices:
+        transactions.append(
+            {
+                "id": str(invoice.id),
+                "type": "invoice",
+                "title": f"Invoice #{invoice.invoice_number}",
+                "amount": format_money_with_currency(invoice.total_amount, currency),
+                "status": invoice.status.lower(),
+                "date": invoice.issue_date.isoformat(),
+                "property": invoice.property.name if invoice.property else None,
+                "invoice_number": str(invoice.invoice_number),
+            }
+        )
+
+    for receipt in recent_receipts:
+        transactions.append(
+            {
+                "id": str(receipt.id),
+                "type": "receipt",
+                "title": f"Payment - Invoice #{receipt.invoice.invoice_number}",
+                "amount": format_money_with_currency(receipt.paid_amount, currency),
+                "status": "completed",
+                "date": receipt.payment_date.isoformat(),
+                "property": (
+                    receipt.invoice.property.name if receipt.invoice.property else None
+                ),
+                "receipt_number": str(receipt.receipt_number),
+            }
+        )
+
+    for expense in recent_expenses:
+        vendor_name = expense.vendor.name if expense.vendor else None
+        transactions.append(
+            {
+                "id": str(expense.id),
+                "type": "expense",
+                "title": f"Expense - To {vendor_name or 'Vendor'}",
+                # Negative for expenses
+                "amount": format_money_with_currency(-expense.total_amount, currency),
+                "status": expense.status.lower(),
+                "date": expense.invoice_date.isoformat(),
+                "property": (
+                    expense.location_node.name if expense.location_node else None
+                ),
+                "vendor": vendor_name,
+                "expense_number": str(expense.expense_number),
+            }
+        )
+
+    for payout in recent_payouts:
+        owner_name = payout.owner.get_full_name() if payout.owner else "Owner"
+        transactions.append(
+            {
+                "id": str(payout.id),
+                "type": "payout",
+                "title": f"Payout - {owner_name}",
+                # Negative for payouts
+                "amount": format_money_with_currency(-payout.net_amount, currency),
+                "status": payout.status.lower(),
+                "date": payout.created_at.isoformat(),
+                "property": (
+                    payout.property_node.name if payout.property_node else None
+                ),
+                "payout_number": payout.payout_number,
+            }
+        )
+
+    # Sort by date (most recent first) and take top 10
+    transactions.sort(key=lambda x: x["date"], reverse=True)
+    return {"transactions": transactions[:10]}
+
+
+METRICS = {
+    "stats": build_stats,
+    "finance_summary": build_finance_summary,
+    "recent_transactions": build_recent_transactions,
+}
+
+
+def get_metric(name):
+    """Cached metric, computed on the spot only when the cache is cold"""
+    data = cache.get(_cache_key(name))
+    if data is None:
+        data = refresh_metric(name)
+    return data
+
+
+def refresh_metric(name):
+    data = METRICS[name]()
+    cache.set(_cache_key(name), data, timeout=DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def refresh_all_metrics():
+    cache.delete(_REFRESH_PENDING_KEY)
+    refreshed = []
+    for name in METRICS:
+        try:
+            refresh_metric(name)
+            refreshed.append(name)
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh dashboard metric {name}: {e}")
+    return refreshed
+
+
+def schedule_refresh():
+    """
+    Refresh the dashboard shortly after the current transaction commits;
+    writes inside the debounce window share a single refresh
+    """
+    transaction.on_commit(_enqueue_refresh)
+
+
+def _enqueue_refresh():
+    from dashboard.tasks import refresh_dashboard_metrics
+
+    try:
+        if cache.add(_REFRESH_PENDING_KEY, 1, timeout=DASHBOARD_REFRESH_DEBOUNCE * 6):
+            refresh_dashboard_metrics.apply_async(
+                countdown=DASHBOARD_REFRESH_DEBOUNCE
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not schedule dashboard refresh: {e}")
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from dashboard.metrics import schedule_refresh
+from payments.models import Expense, Invoice, Payout, Receipt
+from properties.models import PropertyTenant
+
+
+@receiver(post_save, sender=PropertyTenant)
+@receiver(post_delete, sender=PropertyTenant)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Receipt)
+@receiver(post_delete, sender=Receipt)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Payout)
+@receiver(post_delete, sender=Payout)
+def dashboard_source_changed(sender, instance, **kwargs):
+    schedule_refresh()
@@ -0,0 +1,15 @@
+import logging
+
+from celery import shared_task
+
+from dashboard.metrics import refresh_all_metrics
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_dashboard_metrics():
+    """Recompute every cached dashboard tile"""
+    refreshed = refresh_all_metrics()
+    logger.info(f"📊 Refreshed dashboard metrics: {', '.join(refreshed)}")
+    return {"refreshed": refreshed}
@@ -41,23 +41,18 @@ class FinanceSummaryView(APIView):
     def get(self, request):
         """Get finance summary data"""
         try:
-            from utils.payments import check_account_balance
-            from utils.get_sassa_pay_token import token
             import os
             from utils.format import format_money_with_currency
+            from utils.sasapay import get_org_account_balance
 
             serializer = FinanceSummarySerializer()
             data = serializer.to_representation(None)
-            access_token = token()
             merchant_code = os.environ.get("MERCHANT_CODE")
-            if access_token:
-                balance = check_account_balance(merchant_code, access_token)
-                if balance.get("responseCode") == "0":
-                    data["org_account_balance"] = format_money_with_currency(
-                        balance["data"].get("OrgAccountBalance", None)
-                    )
-                else:
-                    data["org_account_balance"] = None
+            balance = get_org_account_balance(merchant_code)
+            if balance and balance.get("responseCode") == "0":
+                data["org_account_balance"] = format_money_with_currency(
+                    balance["data"].get("OrgAccountBalance", None)
+                )
             else:
                 data["org_account_balance"] = None
 
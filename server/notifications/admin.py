@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from notifications.models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = [
+        "recipient_email",
+        "kind",
+        "subject",
+        "status",
+        "attempts",
+        "sent_at",
+        "created_at",
+    ]
+    list_filter = ["status", "kind", "created_at"]
+    search_fields = ["recipient_email", "subject", "invoice__invoice_number"]
+    readonly_fields = ["created_at", "updated_at", "sent_at", "provider_message_id"]
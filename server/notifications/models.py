@@ -1,3 +1,73 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+from accounts.models import Users
+from properties.models import TimeStampedUUIDModel
+
+
+class OutboundEmail(TimeStampedUUIDModel):
+    """
+    Persisted outbox entry for an email handed to the mail queue.
+
+    Producers only insert rows; rendering and delivery happen on the
+    ``email_queue`` workers, so callers never wait on SendGrid.
+    """
+
+    KIND_CHOICES = [
+        ("INVOICE", "Invoice"),
+        ("REMINDER", "Reminder"),
+        ("TEMPLATE", "Template"),
+    ]
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("SENDING", "Sending"),
+        ("SENT", "Sent"),
+        ("FAILED", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default="TEMPLATE")
+    recipient_email = models.EmailField()
+    subject = models.CharField(max_length=255, blank=True)
+    template_name = models.CharField(max_length=100, blank=True)
+    context = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    # Invoice and reminder emails are rendered from the invoice at send time
+    invoice = models.ForeignKey(
+        "payments.Invoice",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="outbound_emails",
+    )
+    user = models.ForeignKey(
+        Users,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="outbound_emails",
+        help_text="User whose company details are used when rendering",
+    )
+    reminder_type = models.CharField(max_length=20, blank=True)
+    # Ledger key: a message with a key already in the outbox is not queued
+    # again, so reruns of a producer are idempotent
+    dedup_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="PENDING", db_index=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        db_table = "outbound_email"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["invoice", "kind"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} email to {self.recipient_email} ({self.status})"
@@ -0,0 +1,255 @@
+"""
+Outbound mail queue.
+
+Producers call the ``queue_*`` helpers, which insert ``OutboundEmail`` rows and
+hand their ids to the ``email_queue`` Celery workers. Workers render each
+message, group identical messages into one SendGrid request (one
+personalization per recipient) and retry failed recipients individually with
+exponential backoff.
+"""
+
+import logging
+
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import OutboundEmail
+from utils.email_utils import MAX_PERSONALIZATIONS, EmailDeliveryError, email_service
+
+logger = logging.getLogger(__name__)
+
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_BASE_SECONDS = 60
+# Outbox rows handed to a single worker task
+EMAIL_DISPATCH_BATCH_SIZE = 200
+
+
+def retry_delay(attempts: int) -> int:
+    """Backoff before the next attempt: 1, 2, 4, 8... minutes"""
+    return EMAIL_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+
+
+def queue_invoice_emails(pairs: Iterable) -> List[OutboundEmail]:
+    """
+    Queue invoice emails for ``(invoice, user)`` pairs.
+
+    The invoice PDF is rendered by the worker, not the caller.
+    """
+    return _queue(
+        OutboundEmail(
+            kind="INVOICE",
+            invoice=invoice,
+            user=user,
+            recipient_email=user.email,
+        )
+        for invoice, user in pairs
+        if user and user.email
+    )
+
+
+def reminder_dedup_key(invoice_id, user_id, reminder_type, day) -> str:
+    return f"reminder:{invoice_id}:{user_id}:{reminder_type}:{day.isoformat()}"
+
+
+def queue_reminder_emails(triples: Iterable, day=None) -> List[OutboundEmail]:
+    """
+    Queue reminder emails for ``(invoice, user, reminder_type)`` triples.
+
+    With ``day``, a reminder already queued for the same invoice, user and
+    type on that day is skipped.
+    """
+    return _queue(
+        OutboundEmail(
+            kind="REMINDER",
+            invoice=invoice,
+            user=user,
+            reminder_type=reminder_type,
+            recipient_email=user.email,
+            dedup_key=(
+                reminder_dedup_key(invoice.id, user.id, reminder_type, day)
+                if day
+                else None
+            ),
+        )
+        for invoice, user, reminder_type in triples
+        if user and user.email
+    )
+
+
+def queue_template_email(
+    recipient_emails: Iterable[str],
+    subject: str,
+    template_name: str,
+    context: Optional[dict] = None,
+) -> List[OutboundEmail]:
+    """
+    Queue the same templated email for several recipients.
+
+    Recipients sharing the rendered message go out in a single SendGrid call.
+    """
+    return _queue(
+        OutboundEmail(
+            kind="TEMPLATE",
+            recipient_email=email,
+            subject=subject,
+            template_name=template_name,
+            context=context or {},
+        )
+        for email in recipient_emails
+        if email
+    )
+
+
+def _queue(rows) -> List[OutboundEmail]:
+    rows = list(rows)
+    keys = {row.dedup_key for row in rows if row.dedup_key}
+    if keys:
+        seen = set(
+            OutboundEmail.objects.filter(dedup_key__in=keys).values_list(
+                "dedup_key", flat=True
+            )
+        )
+        unique_rows = []
+        for row in rows:
+            if row.dedup_key and row.dedup_key in seen:
+                continue
+            seen.add(row.dedup_key)
+            unique_rows.append(row)
+        rows = unique_rows
+
+    # A concurrent producer may insert a key between the check and the insert
+    OutboundEmail.objects.bulk_create(
+        rows, batch_size=EMAIL_DISPATCH_BATCH_SIZE * 5, ignore_conflicts=bool(keys)
+    )
+    if keys and rows:
+        # ignore_conflicts does not say which rows went in
+        inserted = set(
+            OutboundEmail.objects.filter(id__in=[row.id for row in rows]).values_list(
+                "id", flat=True
+            )
+        )
+        rows = [row for row in rows if row.id in inserted]
+    if rows:
+        ids = [str(row.id) for row in rows]
+        transaction.on_commit(lambda: dispatch_outbound_emails(ids))
+    return rows
+
+
+def dispatch_outbound_emails(email_ids: List[str]):
+    """Split outbox ids into worker-sized tasks on the email queue"""
+    from notifications.tasks import send_outbound_emails
+
+    for start in range(0, len(email_ids), EMAIL_DISPATCH_BATCH_SIZE):
+        send_outbound_emails.delay(email_ids[start : start + EMAIL_DISPATCH_BATCH_SIZE])
+
+
+def render_outbound_email(email: OutboundEmail):
+    """Return ``(subject, html_content)`` for an outbox row"""
+    from utils.invoice import render_invoice_email, render_reminder_email
+
+    if email.kind == "INVOICE":
+        subject, html_content, _ = render_invoice_email(email.invoice, email.user)
+        return subject, html_content
+    if email.kind == "REMINDER":
+        return render_reminder_email(email.invoice, email.user, email.reminder_type)
+
+    template_content = email_service._load_template(email.template_name)
+    return email.subject, email_service._render_template(
+        template_content, email.context
+    )
+
+
+def deliver_outbound_emails(email_ids: List[str]) -> dict:
+    """
+    Render and send pending outbox rows.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so a redelivered
+    task never sends a message twice. Returns the rows that need a retry.
+    """
+    with transaction.atomic():
+        claimed = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(id__in=email_ids, status="PENDING")
+            .values_list("id", flat=True)
+        )
+        OutboundEmail.objects.filter(id__in=claimed).update(
+            status="SENDING", updated_at=timezone.now()
+        )
+
+    emails = OutboundEmail.objects.select_related("invoice", "user").filter(
+        id__in=claimed
+    )
+
+    # Group rows whose rendered message is identical into one request
+    groups = defaultdict(list)
+    failures = {}
+    for email in emails:
+        try:
+            subject, html_content = render_outbound_email(email)
+            groups[(subject, html_content)].append(email)
+        except Exception as e:
+            logger.error(f"❌ Could not render email {email.id}: {e}")
+            failures[email] = str(e)
+
+    sent = []
+    for (subject, html_content), members in groups.items():
+        for start in range(0, len(members), MAX_PERSONALIZATIONS):
+            batch = members[start : start + MAX_PERSONALIZATIONS]
+            try:
+                message_id = email_service.send_batch(
+                    [email.recipient_email for email in batch], subject, html_content
+                )
+            except EmailDeliveryError as e:
+                logger.warning(f"⚠️ SendGrid batch of {len(batch)} failed: {e}")
+                for email in batch:
+                    failures[email] = str(e)
+                continue
+
+            now = timezone.now()
+            for email in batch:
+                email.status = "SENT"
+                email.subject = subject
+                email.sent_at = now
+                email.attempts += 1
+                email.last_error = ""
+                email.provider_message_id = message_id
+                email.updated_at = now
+                sent.append(email)
+
+    retry = []
+    now = timezone.now()
+    for email, error in failures.items():
+        email.attempts += 1
+        email.last_error = error[:2000]
+        email.updated_at = now
+        if email.attempts >= EMAIL_MAX_ATTEMPTS:
+            email.status = "FAILED"
+        else:
+            email.status = "PENDING"
+            retry.append(email)
+
+    OutboundEmail.objects.bulk_update(
+        sent + list(failures),
+        [
+            "status",
+            "subject",
+            "sent_at",
+            "attempts",
+            "last_error",
+            "provider_message_id",
+            "updated_at",
+        ],
+    )
+
+    logger.info(
+        f"📧 Outbox: {len(sent)} sent, {len(retry)} to retry, "
+        f"{len(failures) - len(retry)} failed"
+    )
+    return {
+        "sent": len(sent),
+        "failed": len(failures) - len(retry),
+        "retry": [(str(email.id), email.attempts) for email in retry],
+    }
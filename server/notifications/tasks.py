@@ -0,0 +1,52 @@
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from notifications.models import OutboundEmail
+from notifications.outbox import (
+    deliver_outbound_emails,
+    dispatch_outbound_emails,
+    retry_delay,
+)
+
+logger = logging.getLogger(__name__)
+
+# Outbox rows untouched this long are assumed lost with their worker or task
+STALE_OUTBOX_MINUTES = 30
+
+
+@shared_task(bind=True, max_retries=0)
+def send_outbound_emails(self, email_ids):
+    """
+    Send a batch of outbox rows; failed recipients are rescheduled one by one
+    """
+    result = deliver_outbound_emails(email_ids)
+
+    for email_id, attempts in result.pop("retry"):
+        send_outbound_emails.apply_async(
+            args=[[email_id]], countdown=retry_delay(attempts)
+        )
+
+    return result
+
+
+@shared_task
+def requeue_stale_outbound_emails():
+    """
+    Re-dispatch outbox rows whose worker died or whose task was lost
+    """
+    cutoff = timezone.now() - timezone.timedelta(minutes=STALE_OUTBOX_MINUTES)
+
+    stale = OutboundEmail.objects.filter(
+        status__in=["PENDING", "SENDING"], updated_at__lt=cutoff
+    )
+    stale_ids = [str(email_id) for email_id in stale.values_list("id", flat=True)]
+    OutboundEmail.objects.filter(id__in=stale_ids).update(
+        status="PENDING", updated_at=timezone.now()
+    )
+    if stale_ids:
+        dispatch_outbound_emails(stale_ids)
+
+    logger.info(f"📧 Requeued {len(stale_ids)} outbox emails")
+    return {"requeued": len(stale_ids)}
@@ -0,0 +1,247 @@
+"""
+Payment callback ingestion.
+
+``PaymentCallBackView`` only stores the raw callback
+(``record_payment_callback``) and acknowledges the gateway. The
+``callback_queue`` workers then apply it (``apply_payment_callback``):
+
+- The callback, its ``PaymentRequestTransactions`` row and the paid invoices
+  are locked with ``SELECT ... FOR UPDATE``. Invoices are locked in id order,
+  so concurrent callbacks cannot deadlock.
+- Invoice balances are running balances: each receipt subtracts its amount
+  from ``Invoice.balance`` instead of re-summing the invoice's receipts.
+- A callback key is stored once, and a transaction that is already paid is
+  not applied again, so gateway retries cannot double-apply receipts.
+"""
+
+import logging
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from payments.models import (
+    Invoice,
+    PaymentCallback,
+    PaymentRequestTransactions,
+    Receipt,
+)
+from utils.redis_pubsub import notify_payment_status
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_MAX_ATTEMPTS = 5
+CALLBACK_RETRY_BASE_SECONDS = 30
+AMOUNT_TOLERANCE = Decimal("0.01")
+CENTS = Decimal("0.01")
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt: 30s, 1, 2, 4... minutes"""
+    return CALLBACK_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+
+
+def safe_decimal(value):
+    try:
+        return Decimal(str(value)).quantize(CENTS)
+    except Exception:
+        return Decimal("0")
+
+
+def callback_key(data):
+    return data.get("CheckoutRequestID") or data.get("TransactionCode")
+
+
+def record_payment_callback(data):
+    """
+    Store a callback once per key and queue it after commit.
+
+    Returns ``(callback, created)``; ``(None, False)`` when the payload has
+    no key to deduplicate on.
+    """
+    key = callback_key(data)
+    if not key:
+        return None, False
+
+    payload = data.dict() if hasattr(data, "dict") else dict(data)
+    try:
+        with transaction.atomic():
+            callback = PaymentCallback.objects.create(
+                idempotency_key=str(key), payload=payload
+            )
+    except IntegrityError:
+        # Gateway retry of a callback we already have
+        return PaymentCallback.objects.get(idempotency_key=str(key)), False
+
+    transaction.on_commit(lambda: enqueue_payment_callback(callback.id))
+    return callback, True
+
+
+def enqueue_payment_callback(callback_id, countdown=None):
+    from payments.tasks import process_payment_callback
+
+    try:
+        process_payment_callback.apply_async(
+            args=[str(callback_id)], countdown=countdown
+        )
+    except Exception as e:
+        # Stays PENDING; requeue_stale_payment_callbacks picks it up
+        logger.error(f"❌ Could not queue payment callback {callback_id}: {e}")
+
+
+def apply_payment_callback(callback_id):
+    """
+    Apply a stored callback. Returns the callback, or None when it is already
+    done or being applied by another worker.
+    """
+    notifications = []
+    with transaction.atomic():
+        callback = (
+            PaymentCallback.objects.select_for_update(skip_locked=True)
+            .filter(id=callback_id, status="PENDING")
+            .first()
+        )
+        if callback is None:
+            return None
+
+        callback.attempts += 1
+        try:
+            with transaction.atomic():
+                callback.status, callback.last_error = _apply_payment(
+                    callback.payload, notifications
+                )
+        except Exception as e:
+            logger.error(f"❌ Payment callback {callback.idempotency_key} failed: {e}")
+            notifications.clear()
+            callback.last_error = str(e)
+            if callback.attempts >= CALLBACK_MAX_ATTEMPTS:
+                callback.status = "FAILED"
+
+        if callback.status != "PENDING":
+            callback.processed_at = timezone.now()
+        callback.save(
+            update_fields=[
+                "status",
+                "attempts",
+                "last_error",
+                "processed_at",
+                "updated_at",
+            ]
+        )
+
+        for transaction_id, pay_status in notifications:
+            transaction.on_commit(
+                lambda transaction_id=transaction_id, pay_status=pay_status: (
+                    notify_payment_status(transaction_id, pay_status)
+                )
+            )
+    return callback
+
+
+def _apply_payment(data, notifications):
+    """
+    Apply one callback payload, returning the callback's new status and the
+    reason when it is rejected
+    """
+    result_code = str(data.get("ResultCode"))
+
+    payment_request = (
+        PaymentRequestTransactions.objects.select_for_update()
+        .filter(
+            checkout_request_id=data.get("CheckoutRequestID"),
+            merchant_request_id=data.get("MerchantRequestID"),
+        )
+        .first()
+    )
+    if payment_request is None:
+        # May still be committing on the request side; retried
+        raise LookupError("Transaction not found.")
+
+    if payment_request.pay_status == "Paid":
+        return "IGNORED", "Transaction already paid."
+
+    if result_code != "0":
+        payment_request.result_code = result_code
+        payment_request.result_desc = data.get("ResultDesc")
+        payment_request.pay_status = "Failed"
+        payment_request.save()
+        notifications.append((payment_request.id, "Failed"))
+        return "APPLIED", ""
+
+    for field, value in {
+        "payment_request_id": data.get("PaymentRequestID"),
+        "result_code": result_code,
+        "result_desc": data.get("ResultDesc"),
+        "amount": data.get("TransAmount", 0),
+        "source_channel": data.get("SourceChannel"),
+        "bill_ref_number": data.get("BillRefNumber"),
+        "transaction_date": data.get("TransactionDate"),
+        "customer_mobile": data.get("CustomerMobile"),
+        "transaction_code": data.get("TransactionCode"),
+        "third_party_trans_id": data.get("ThirdPartyTransID"),
+        "pay_status": "Paid",
+    }.items():
+        setattr(payment_request, field, value)
+
+    amount = safe_decimal(data.get("TransAmount", 0))
+
+    if payment_request.is_multiple_invoices and payment_request.invoices_data:
+        allocations = [
+            (str(item["invoice_id"]), safe_decimal(item["applied_amount"]))
+            for item in payment_request.invoices_data
+        ]
+        expected = safe_decimal(payment_request.expected_total_amount)
+        allocated = sum((applied for _, applied in allocations), Decimal("0"))
+        if (
+            abs(amount - expected) > AMOUNT_TOLERANCE
+            or abs(amount - allocated) > AMOUNT_TOLERANCE
+        ):
+            payment_request.pay_status = "Failed"
+            payment_request.result_desc = (
+                f"Amount mismatch. Expected: {expected}, Received: {amount}"
+            )
+            payment_request.save()
+            notifications.append((payment_request.id, "Failed"))
+            return "REJECTED", payment_request.result_desc
+    else:
+        allocations = [(str(payment_request.invoice_id), amount)]
+
+    payment_request.save()
+    apply_receipts(allocations)
+    notifications.append((payment_request.id, "Paid"))
+    return "APPLIED", ""
+
+
+def apply_receipts(allocations, **receipt_fields):
+    """
+    Create a receipt per ``(invoice_id, amount)`` and move each invoice's
+    running balance and status; the invoices are locked in id order
+    """
+    invoice_ids = sorted({invoice_id for invoice_id, _ in allocations})
+    invoices = {
+        str(invoice.id): invoice
+        for invoice in Invoice.objects.select_for_update()
+        .filter(id__in=invoice_ids)
+        .order_by("id")
+    }
+
+    receipts = []
+    for invoice_id, amount in allocations:
+        invoice = invoices.get(invoice_id)
+        if invoice is None:
+            logger.warning(f"⚠️ Invoice {invoice_id} not found for payment")
+            continue
+
+        invoice.balance = max(Decimal("0"), invoice.balance - amount)
+        invoice.status = "PAID" if invoice.balance == 0 else "PARTIAL"
+        invoice.save(update_fields=["balance", "status", "updated_at"])
+        receipts.append(
+            Receipt.objects.create(
+                invoice=invoice,
+                paid_amount=amount,
+                balance=invoice.balance,
+                **receipt_fields,
+            )
+        )
+    return receipts
@@ -1,18 +1,14 @@
 import datetime
-import json
 import os
 import uuid
 
 from decimal import Decimal
 
-import requests
-
 from django.db import models
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 from drf_spectacular.utils import extend_schema
-from requests.auth import HTTPBasicAuth
 from rest_framework import serializers, status
 from rest_framework.generics import DestroyAPIView, ListAPIView, get_object_or_404
 from rest_framework.parsers import FormParser, MultiPartParser
@@ -23,11 +19,13 @@ from rest_framework.views import APIView
 # Local imports
 from payments.models import PaymentDisparment
 from utils.currency import get_serialized_default_currency
-from utils.custom_pagination import CustomPageNumberPagination
+from utils.custom_pagination import KeysetPagination
 from utils.expense import send_expense_approval_email
+from utils.export import ExportMixin
 from utils.format import format_money_with_currency
 from utils.payments import pay_bills, payout_withdrawal
 from utils.redis_pubsub import wait_for_expense_status, wait_for_payment_status
+from utils.sasapay import get_access_token
 from utils.serilaizer import flatten_errors
 
 from .models import Expense, PayBill
@@ -55,19 +53,7 @@ except ImportError as e:
 
 
 def token():
-    url = "https://sandbox.sasapay.app/api/v1/auth/token/?grant_type=client_credentials"
-    params = {"grant_type": "client_credentials"}
-    res = requests.get(
-        url,
-        auth=HTTPBasicAuth(
-            "40tcB9ytloIYRTUbuG3LNdYT7TTCc7SYGIeU7T65",
-            "gvye9Sk6TnfCQiP7rqaXUQ9aaOohw6AySO0tBLTbybpDuuJrSQmU8dKxfpK9hEI6aTQGYX1scqAgyUWvvUgXBltSXjC7C4JimMDtX3vMzGiSXJZuoONwrsUoV5Va3dsD",
-        ),
-        params=params,
-    )
-    response = json.loads(res.text)
-    access_token = response["access_token"]
-    return access_token
+    return get_access_token()
 
 
 @extend_schema(
@@ -117,21 +103,30 @@ class ExpenseStatsSummaryView(APIView):
 
 @extend_schema(
     tags=["Billings"],
-    description="List all expenses (paginated, cached, filterable by date range).",
+    description=(
+        "List all expenses (paginated, cached, filterable by date range). "
+        "Supports ?export=csv|xlsx (add &background=true for a file in the media "
+        "bucket). Pass ?cursor= (empty for the first page, then next_cursor) for "
+        "keyset pagination on creation time."
+    ),
 )
 @method_decorator(
     ratelimit(key="ip", rate="20/m", method="GET", block=True),
     name="dispatch",
 )
-class ExpenseTableListView(ListAPIView):
+class ExpenseTableListView(ExportMixin, ListAPIView):
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = KeysetPagination
+    export_filename = "expenses"
 
     def get_queryset(self):
         return Expense.objects.all().order_by("-invoice_date", "-id")
 
     def list(self, request, *args, **kwargs):
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         page_number = request.query_params.get("page", 1)
         page_size = request.query_params.get("page_size", 10)
         qs = self.filter_queryset(self.get_queryset())
@@ -0,0 +1,267 @@
+"""
+Maintenance of the ``FinancialFact`` table.
+
+Facts are recomputed per (month, set of nodes) slice: the slice is deleted
+and rebuilt from grouped queries over Invoice/InvoiceItem/Receipt/Expense.
+Signals mark slices dirty and they are refreshed once the surrounding
+transaction commits, so a burst of saves costs one recompute per slice.
+
+Only writes mark slices dirty, so existing history is filled in by
+``manage.py rebuild_financial_facts``, which ``make migrate`` runs on every
+deploy; until it has run, the reports read zeros for older months.
+"""
+
+import datetime
+import logging
+import threading
+
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth, Upper
+
+from payments.models import Expense, FinancialFact, Invoice, InvoiceItem, Receipt
+from properties.models import LocationNode
+
+logger = logging.getLogger(__name__)
+
+# Item types whose unit amount counts as management fee
+MANAGEMENT_FEE_CATEGORIES = {"SERVICE_CHARGE"}
+
+MEASURES = (
+    "billed_amount",
+    "billed_item_amount",
+    "collected_amount",
+    "expense_amount",
+    "expense_paid_amount",
+    "management_fee_amount",
+)
+
+_pending = threading.local()
+
+
+def month_start(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def compute_facts(month: datetime.date, node_ids: Optional[Iterable] = None) -> Dict:
+    """
+    Fact measures for one month, optionally restricted to some nodes.
+
+    Returns:
+        dict: (node_id, category, billed_to, service_id) -> measures
+    """
+    start, end = month_start(month), next_month(month_start(month))
+    invoices = Invoice.objects.filter(
+        issue_date__gte=start, issue_date__lt=end, is_deleted=False
+    )
+    expenses = Expense.objects.filter(
+        invoice_date__gte=start, invoice_date__lt=end, is_deleted=False
+    )
+    if node_ids is not None:
+        node_ids = list(node_ids)
+        invoices = invoices.filter(property_id__in=node_ids)
+        expenses = expenses.filter(location_node_id__in=node_ids)
+
+    facts = defaultdict(lambda: dict.fromkeys(MEASURES, Decimal("0")))
+
+    paid_by_invoice = dict(
+        Receipt.objects.filter(invoice__in=invoices)
+        .values("invoice_id")
+        .annotate(total=Sum("paid_amount"))
+        .values_list("invoice_id", "total")
+    )
+
+    owner_billed = Exists(
+        Invoice.owners.through.objects.filter(invoice_id=OuterRef("invoice_id"))
+    )
+    items = (
+        InvoiceItem.objects.filter(invoice__in=invoices)
+        .annotate(category=Upper("type"), owner_billed=owner_billed)
+        .values(
+            "invoice_id",
+            "invoice__property_id",
+            "category",
+            "owner_billed",
+            "service__service_id",
+        )
+        .annotate(billed=Sum("price"), item_amount=Sum("amount"))
+        .order_by("invoice_id")
+    )
+
+    by_invoice = groupby(items.iterator(), key=lambda row: row["invoice_id"])
+    for invoice_id, rows in by_invoice:
+        rows = list(rows)
+        invoice_billed = sum((row["billed"] or 0 for row in rows), Decimal("0"))
+        paid = paid_by_invoice.get(invoice_id) or Decimal("0")
+
+        for row in rows:
+            key = (
+                row["invoice__property_id"],
+                row["category"],
+                "OWNER" if row["owner_billed"] else "TENANT",
+                row["service__service_id"],
+            )
+            billed = row["billed"] or Decimal("0")
+            fact = facts[key]
+            fact["billed_amount"] += billed
+            fact["billed_item_amount"] += row["item_amount"] or Decimal("0")
+            if row["category"] in MANAGEMENT_FEE_CATEGORIES:
+                fact["management_fee_amount"] += row["item_amount"] or Decimal("0")
+            if paid and invoice_billed:
+                fact["collected_amount"] += paid * billed / invoice_billed
+
+    for row in expenses.values("location_node_id", "service_id").annotate(
+        amount=Sum("amount"),
+        paid_total=Sum("total_amount", filter=Q(status="paid")),
+    ):
+        key = (
+            row["location_node_id"],
+            FinancialFact.EXPENSE_CATEGORY,
+            "",
+            row["service_id"],
+        )
+        facts[key]["expense_amount"] += row["amount"] or Decimal("0")
+        facts[key]["expense_paid_amount"] += row["paid_total"] or Decimal("0")
+
+    return facts
+
+
+def refresh_month(month: datetime.date, node_ids: Optional[Iterable] = None) -> int:
+    """
+    Rebuild the facts of one month (for some nodes, or all of them).
+
+    Returns:
+        int: Number of fact rows written
+    """
+    month = month_start(month)
+    with transaction.atomic():
+        if node_ids is not None:
+            node_ids = sorted(set(node_ids))
+            # Serialise concurrent refreshes of the same slice
+            list(
+                LocationNode.objects.select_for_update()
+                .filter(id__in=node_ids)
+                .values_list("id", flat=True)
+            )
+
+        facts = compute_facts(month, node_ids)
+
+        stale = FinancialFact.objects.filter(month=month)
+        if node_ids is not None:
+            stale = stale.filter(node_id__in=node_ids)
+        stale.delete()
+
+        FinancialFact.objects.bulk_create(
+            [
+                FinancialFact(
+                    node_id=node_id,
+                    month=month,
+                    category=category,
+                    billed_to=billed_to,
+                    service_id=service_id,
+                    **{name: round(value, 2) for name, value in measures.items()},
+                )
+                for (node_id, category, billed_to, service_id), measures in (
+                    facts.items()
+                )
+            ],
+            batch_size=1000,
+        )
+    return len(facts)
+
+
+def rebuild_financial_facts(date_from=None, date_to=None) -> Dict:
+    """
+    Rebuild every month with invoices or expenses between the given dates
+    """
+    invoice_months = Invoice.objects.filter(is_deleted=False)
+    expense_months = Expense.objects.filter(is_deleted=False)
+    if date_from:
+        invoice_months = invoice_months.filter(issue_date__gte=month_start(date_from))
+        expense_months = expense_months.filter(
+            invoice_date__gte=month_start(date_from)
+        )
+    if date_to:
+        invoice_months = invoice_months.filter(issue_date__lte=date_to)
+        expense_months = expense_months.filter(invoice_date__lte=date_to)
+
+    months = set(
+        invoice_months.annotate(month=TruncMonth("issue_date"))
+        .values_list("month", flat=True)
+        .distinct()
+    ) | set(
+        expense_months.annotate(month=TruncMonth("invoice_date"))
+        .values_list("month", flat=True)
+        .distinct()
+    )
+
+    # Months that no longer have any data
+    stale = FinancialFact.objects.exclude(month__in=months)
+    if date_from:
+        stale = stale.filter(month__gte=month_start(date_from))
+    if date_to:
+        stale = stale.filter(month__lte=date_to)
+    stale.delete()
+
+    rows = 0
+    for month in sorted(months):
+        rows += refresh_month(month)
+        logger.info(f"📊 Rebuilt financial facts for {month:%Y-%m}")
+    return {"months": len(months), "rows": rows}
+
+
+def mark_dirty(node_id, date):
+    """
+    Queue the (node, month) slice for a refresh after the current transaction
+    """
+    if not node_id or not date:
+        return
+    slices = _pending_slices()
+    slices.add((node_id, month_start(date)))
+    transaction.on_commit(flush_dirty)
+
+
+def mark_invoice_dirty(invoice_id):
+    invoice = (
+        Invoice.objects.filter(id=invoice_id)
+        .values("property_id", "issue_date")
+        .first()
+    )
+    if invoice:
+        mark_dirty(invoice["property_id"], invoice["issue_date"])
+
+
+def flush_dirty():
+    """Refresh every queued slice, one recompute per month"""
+    slices = _pending_slices()
+    if not slices:
+        return
+    queued = set(slices)
+    slices.clear()
+
+    nodes_by_month = defaultdict(set)
+    for node_id, month in queued:
+        nodes_by_month[month].add(node_id)
+
+    for month, node_ids in nodes_by_month.items():
+        try:
+            refresh_month(month, node_ids)
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh financial facts for {month}: {e}")
+
+
+def _pending_slices() -> Set[Tuple]:
+    if not hasattr(_pending, "slices"):
+        _pending.slices = set()
+    return _pending.slices
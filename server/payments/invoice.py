@@ -27,9 +27,13 @@ from properties.models import (
     PropertyTenant,
 )
 from utils.currency import get_serialized_default_currency
-from utils.custom_pagination import CustomPageNumberPagination
+from utils.custom_pagination import KeysetPagination
 from utils.format import format_money_with_currency
-from utils.invoice import get_missing_invoice_items, send_invoice_email
+from utils.invoice import (
+    BillingSnapshot,
+    get_missing_invoice_items,
+    send_invoice_email,
+)
 
 from .serializers.invoice import (
     InvoiceCreateSerializer,
@@ -148,9 +152,14 @@ class TenantUnitItemDetailsView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        property_tenants = PropertyTenant.objects.filter(
-            tenant_user=tenant, is_deleted=False
-        ).select_related("node", "currency")
+        property_tenants = list(
+            PropertyTenant.objects.filter(
+                tenant_user=tenant, is_deleted=False
+            ).select_related("node", "currency")
+        )
+        snapshot = BillingSnapshot.for_nodes(
+            [pt.node for pt in property_tenants], year, month
+        )
         units_data = []
         with_items = request.query_params.get("with_items", "true").lower() == "true"
         for pt in property_tenants:
@@ -174,6 +183,7 @@ class TenantUnitItemDetailsView(APIView):
                 month=month,
                 user_type="tenant",
                 period_label=period_label,
+                snapshot=snapshot,
             )
             if with_items:
                 if not items:
@@ -222,9 +232,14 @@ class OwnerNodeItemDetailsView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        property_owners = PropertyOwner.objects.filter(
-            owner_user=owner, is_deleted=False
-        ).select_related("node")
+        property_owners = list(
+            PropertyOwner.objects.filter(
+                owner_user=owner, is_deleted=False
+            ).select_related("node")
+        )
+        snapshot = BillingSnapshot.for_nodes(
+            [po.node for po in property_owners], year, month
+        )
         nodes_data = []
         for po in property_owners:
             node = po.node
@@ -247,6 +262,7 @@ class OwnerNodeItemDetailsView(APIView):
                 month=month,
                 user_type="owner",
                 period_label=None,
+                snapshot=snapshot,
             )
             if items:
                 nodes_data.append(
@@ -483,7 +499,11 @@ class InvoiceStatsSummaryView(APIView):
 
 @extend_schema(
     tags=["Invoices"],
-    description="List all invoices (paginated, cached, filterable by date range).",
+    description=(
+        "List all invoices (paginated, cached, filterable by date range). "
+        "Pass ?cursor= (empty for the first page, then next_cursor) for keyset "
+        "pagination on creation time."
+    ),
 )
 @method_decorator(
     ratelimit(key="ip", rate="20/m", method="GET", block=True),
@@ -492,7 +512,7 @@ class InvoiceStatsSummaryView(APIView):
 class InvoiceTableListView(ListAPIView):
     serializer_class = InvoiceTableItemSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         qs = Invoice.objects.all()
@@ -775,7 +795,7 @@ class InvoiceDownloadPDFView(APIView):
         try:
             invoice = Invoice.objects.get(id=invoice_id, is_deleted=False)
 
-            # Generate PDF on-demand every time
+            # Generate PDF on demand
             try:
                 print(f"Generating PDF for invoice {invoice.id}...")
 
@@ -792,10 +812,13 @@ class InvoiceDownloadPDFView(APIView):
                 )
                 html_content = email_service._render_template(template_content, context)
 
-                # Generate PDF in memory (don't save to database)
+                # Reuse the stored PDF unless the invoice content changed
                 from utils.invoice import generate_invoice_pdf
 
+                previous_hash = invoice.pdf_hash
                 pdf_file_path = generate_invoice_pdf(invoice, html_content)
+                if pdf_file_path and invoice.pdf_hash != previous_hash:
+                    invoice.save(update_fields=["pdf_file", "pdf_hash", "updated_at"])
 
                 if not pdf_file_path:
                     return Response(
@@ -0,0 +1,458 @@
+"""
+Set-based engine for the monthly invoice run.
+
+The per-recipient path (``get_missing_invoice_items`` + ``Invoice.objects.create``)
+costs a handful of queries per invoice item. This module loads everything a
+billing period needs up front, computes the items in memory with the same
+``InvoiceCalculator`` rules, and writes invoices, items and M2M rows with
+``bulk_create``.
+"""
+
+import logging
+import time
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.outbox import queue_invoice_emails
+from payments import financial_facts
+from payments.models import Invoice, InvoiceItem, Penalty, Receipt
+from payments.numbering import invoice_numbers
+from payments.payouts import recompute as payout_recompute
+from properties.models import (
+    Currencies,
+    PropertyOwner,
+    PropertyService,
+    PropertyTenant,
+)
+from sales.models import PaymentSchedule, PropertySaleItem
+from utils.invoice import (
+    BillingSnapshot,
+    BillingType,
+    InvoiceCalculator,
+    InvoiceItemData,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses that make an owner's invoice for the month count as existing
+OWNER_EXISTING_INVOICE_STATUSES = ["ISSUED", "PARTIAL", "PAID", "OVERDUE", "DRAFT"]
+
+
+class BillingPeriodData(BillingSnapshot):
+    """
+    All rows the monthly run reads for one period, loaded in a few queries.
+
+    Extends the BillingSnapshot (invoiced keys and project ancestors) with the
+    tenants, services, penalties, deposits and installments of the run, keyed
+    by primary key so item calculation never touches the database once
+    ``load()`` has run.
+    """
+
+    def __init__(self, year: int, month: int, tenants, owners):
+        super().__init__(year, month)
+        self.tenants = list(tenants)
+        self.owners = list(owners)
+
+        self.owner_invoiced = set()  # {(property_owner_id, node_id)}
+        self.tenant_by_user_node = {}
+        self.owner_by_node = {}
+        self.services_by_node = defaultdict(list)
+        self.services_by_id = {}
+        self.penalties_by_tenant = defaultdict(list)
+        self.penalties_by_id = {}
+        self.paid_deposits = set()  # {(property_tenant_id, node_id)}
+        self.sale_items_by_buyer = defaultdict(list)
+        self.installments_by_plan = defaultdict(list)
+        self.default_currency = None
+
+    def load(self, nodes=None) -> "BillingPeriodData":
+        if nodes is None:
+            nodes = {pt.node for pt in self.tenants} | {po.node for po in self.owners}
+        nodes = list(nodes)
+        node_ids = {node.id for node in nodes}
+        tenant_ids = [pt.id for pt in self.tenants]
+
+        for pt in self.tenants:
+            self.tenant_by_user_node[(pt.tenant_user_id, pt.node_id)] = pt
+        for po in self.owners:
+            self.owner_by_node[po.node_id] = po
+
+        # Invoiced keys and project roots for every node of the run
+        super().load(nodes)
+        project_ids = {project.id for project in self.projects_by_tree.values()}
+
+        self.owner_invoiced = set(
+            Invoice.objects.filter(
+                owners__in=self.owners,
+                property_id__in=node_ids,
+                issue_date__year=self.year,
+                issue_date__month=self.month,
+                status__in=OWNER_EXISTING_INVOICE_STATUSES,
+            ).values_list("owners", "property_id")
+        )
+
+        for svc in PropertyService.objects.filter(
+            property_node_id__in=node_ids | project_ids,
+            service__is_deleted=False,
+            is_deleted=False,
+        ).select_related("service", "currency"):
+            self.services_by_node[svc.property_node_id].append(svc)
+            self.services_by_id[str(svc.id)] = svc
+
+        for penalty in Penalty.objects.filter(
+            property_tenant_id__in=tenant_ids, status="pending"
+        ).select_related("currency"):
+            self.penalties_by_tenant[penalty.property_tenant_id].append(penalty)
+            self.penalties_by_id[str(penalty.id)] = penalty
+
+        self.paid_deposits = set(
+            Receipt.objects.filter(
+                invoice__tenants__in=tenant_ids,
+                invoice__property_id__in=node_ids,
+            )
+            .values_list("invoice__tenants", "invoice__property_id")
+            .distinct()
+        )
+
+        owner_user_ids = {po.owner_user_id for po in self.owners if po.owner_user_id}
+        plan_ids = []
+        for sale_item in PropertySaleItem.objects.filter(
+            buyer_id__in=owner_user_ids
+        ).select_related("property_node", "payment_plan"):
+            self.sale_items_by_buyer[sale_item.buyer_id].append(sale_item)
+            plan = getattr(sale_item, "payment_plan", None)
+            if plan is not None:
+                plan_ids.append(plan.id)
+
+        for installment in PaymentSchedule.objects.filter(
+            payment_plan_id__in=plan_ids,
+            status="pending",
+            due_date__year=self.year,
+            due_date__month=self.month,
+        ):
+            self.installments_by_plan[installment.payment_plan_id].append(installment)
+
+        self.default_currency = Currencies.objects.filter(default=True).first()
+        return self
+
+
+class PrefetchedInvoiceCalculator(InvoiceCalculator):
+    """
+    InvoiceCalculator that answers every lookup from a BillingPeriodData
+    instead of the database.
+    """
+
+    def __init__(self, data: BillingPeriodData, user, node, user_type: str):
+        super().__init__(user, node, data.year, data.month, user_type, snapshot=data)
+        self.data = data
+
+    @property
+    def property_tenant(self) -> Optional[PropertyTenant]:
+        return self.data.tenant_by_user_node.get((self.user.id, self.node.id))
+
+    @property
+    def property_owner(self) -> Optional[PropertyOwner]:
+        return self.data.owner_by_node.get(self.node.id)
+
+    def _has_paid_deposit(self, pt) -> bool:
+        return (pt.id, self.node.id) in self.data.paid_deposits
+
+    def _get_property_services(self, node, billed_to):
+        return [
+            svc
+            for svc in self.data.services_by_node.get(node.id, [])
+            if svc.service.billed_to == billed_to
+        ]
+
+    def _get_pending_penalties(self, pt):
+        return self.data.penalties_by_tenant.get(pt.id, [])
+
+    def _get_buyer_sale_items(self):
+        return self.data.sale_items_by_buyer.get(self.user.id, [])
+
+    def _get_due_installments(self, payment_plan):
+        return self.data.installments_by_plan.get(payment_plan.id, [])
+
+    def _get_default_currency(self):
+        return self.data.default_currency
+
+
+@dataclass
+class PlannedInvoice:
+    """An invoice computed in memory, waiting to be written"""
+
+    invoice: Invoice
+    user: object
+    items: List[InvoiceItem] = field(default_factory=list)
+    penalties: List[Penalty] = field(default_factory=list)
+    tenant: Optional[PropertyTenant] = None
+    owner: Optional[PropertyOwner] = None
+
+
+class BulkInvoiceGenerator:
+    """
+    Generate a month of invoices for every active tenant and owner.
+
+    ``chunk_size=None`` writes the whole run in one transaction; otherwise each
+    chunk of ``chunk_size`` invoices is written (and rolled back) on its own.
+    ``tree_ids`` restricts the run to the given project trees, which is how the
+    Celery pipeline partitions the work.
+    """
+
+    def __init__(
+        self,
+        now=None,
+        chunk_size: Optional[int] = None,
+        send_emails=True,
+        tree_ids: Optional[List[int]] = None,
+    ):
+        self.now = now or timezone.now()
+        self.year, self.month = self.now.year, self.now.month
+        self.period_label = self.now.strftime("%B %Y")
+        self.chunk_size = chunk_size
+        self.send_emails = send_emails
+        self.tree_ids = tree_ids
+        self.created: List[PlannedInvoice] = []
+
+        self.generated_count = 0
+        self.skipped_count = 0
+        self.error_count = 0
+        self.tenant_processed = 0
+        self.owner_processed = 0
+
+    def get_tenants(self):
+        tenants = PropertyTenant.objects.filter(is_deleted=False)
+        if self.tree_ids is not None:
+            tenants = tenants.filter(node__tree_id__in=self.tree_ids)
+        return tenants.select_related("tenant_user", "node", "currency")
+
+    def get_owners(self):
+        owners = PropertyOwner.objects.filter(is_deleted=False)
+        if self.tree_ids is not None:
+            owners = owners.filter(node__tree_id__in=self.tree_ids)
+        return owners.select_related(
+            "owner_user", "node", "node__unit_detail", "node__villa_detail"
+        )
+
+    def run(self) -> Dict:
+        started = time.monotonic()
+
+        tenants = list(self.get_tenants())
+        owners = list(self.get_owners())
+        self.tenant_processed = len(tenants)
+        self.owner_processed = len(owners)
+
+        if not tenants and not owners:
+            return self._result(started, reason="no_tenants_or_owners")
+
+        data = BillingPeriodData(self.year, self.month, tenants, owners).load()
+        planned = self.plan(data, tenants, owners)
+
+        for chunk in self._chunks(planned):
+            self._write_chunk(chunk)
+
+        logger.info(
+            f"📄 Bulk invoice generation: {self.generated_count} generated, "
+            f"{self.skipped_count} skipped, {self.error_count} errors"
+        )
+        return self._result(started)
+
+    def plan(self, data: BillingPeriodData, tenants, owners) -> List[PlannedInvoice]:
+        """Compute every invoice of the run in memory"""
+        planned = []
+
+        for tenant in tenants:
+            try:
+                plan = self._plan_invoice(
+                    data, tenant.tenant_user, tenant.node, "tenant", tenant=tenant
+                )
+            except Exception as e:
+                logger.error(f"Error generating invoice for tenant {tenant.id}: {e}")
+                self.error_count += 1
+                continue
+            if plan:
+                planned.append(plan)
+            else:
+                self.skipped_count += 1
+
+        for owner in owners:
+            if (owner.id, owner.node_id) in data.owner_invoiced:
+                self.skipped_count += 1
+                continue
+            try:
+                plan = self._plan_invoice(
+                    data, owner.owner_user, owner.node, "owner", owner=owner
+                )
+            except Exception as e:
+                logger.error(f"Error generating invoice for owner {owner.id}: {e}")
+                self.error_count += 1
+                continue
+            if plan:
+                planned.append(plan)
+            else:
+                self.skipped_count += 1
+
+        return planned
+
+    def _plan_invoice(self, data, user, node, user_type, tenant=None, owner=None):
+        calculator = PrefetchedInvoiceCalculator(data, user, node, user_type)
+        items = self._filter_items(calculator.collect_items(), user_type)
+        if not items:
+            return None
+
+        invoice = Invoice(
+            issue_date=self.now,
+            due_date=self.now + timedelta(days=10),
+            status="ISSUED",
+            description=f"Auto-generated invoice for {self.period_label}",
+            discount=0,
+            tax_percentage=0,
+            total_amount=0,
+            balance=0,
+            property=node,
+        )
+        plan = PlannedInvoice(invoice=invoice, user=user, tenant=tenant, owner=owner)
+
+        subtotal = Decimal("0")
+        for item in items:
+            price = item.amount * item.quantity
+            service = (
+                data.services_by_id.get(item.service_id) if item.service_id else None
+            )
+            penalty = (
+                data.penalties_by_id.get(item.penalty_id) if item.penalty_id else None
+            )
+            if penalty is not None:
+                penalty.status = "applied_to_invoice"
+                penalty.linked_invoice = invoice
+                penalty.updated_at = self.now
+                plan.penalties.append(penalty)
+
+            plan.items.append(
+                InvoiceItem(
+                    invoice=invoice,
+                    type=item.type.upper(),
+                    name=item.description,
+                    amount=item.amount,
+                    quantity=item.quantity,
+                    price=price,
+                    service=service,
+                    penalty=penalty,
+                )
+            )
+            # Mirror what is written so later recipients on this node see it
+            data.mark_invoiced(
+                node.id,
+                item.type,
+                service.id if service else None,
+                penalty.id if penalty else None,
+            )
+            subtotal += price
+
+        # Tax and discount default to zero on auto-generated invoices
+        invoice.total_amount = subtotal
+        invoice.balance = subtotal
+        return plan
+
+    @staticmethod
+    def _filter_items(items: List[InvoiceItemData], user_type) -> List[InvoiceItemData]:
+        # Tenants are never auto-billed variable items, owners never service charge
+        excluded = (
+            BillingType.VARIABLE.value
+            if user_type == "tenant"
+            else BillingType.SERVICE_CHARGE.value
+        )
+        return [item for item in items if item.type.upper() != excluded]
+
+    def _chunks(self, planned):
+        if not self.chunk_size:
+            yield planned
+            return
+        for start in range(0, len(planned), self.chunk_size):
+            yield planned[start : start + self.chunk_size]
+
+    def _write_chunk(self, chunk: List[PlannedInvoice]):
+        if not chunk:
+            return
+        try:
+            with transaction.atomic():
+                self._bulk_write(chunk)
+        except Exception as e:
+            logger.error(f"Error writing invoice chunk of {len(chunk)}: {e}")
+            self.error_count += len(chunk)
+            return
+
+        self.generated_count += len(chunk)
+        self.created.extend(chunk)
+        if self.send_emails:
+            self._send_emails(chunk)
+
+    def _bulk_write(self, chunk: List[PlannedInvoice]):
+        invoices = [plan.invoice for plan in chunk]
+        for invoice, number in zip(invoices, invoice_numbers.allocate(len(invoices))):
+            invoice.invoice_number = number
+        Invoice.objects.bulk_create(invoices)
+
+        InvoiceItem.objects.bulk_create([item for plan in chunk for item in plan.items])
+
+        TenantLink = Invoice.tenants.through
+        OwnerLink = Invoice.owners.through
+        TenantLink.objects.bulk_create(
+            [
+                TenantLink(invoice_id=plan.invoice.id, propertytenant_id=plan.tenant.id)
+                for plan in chunk
+                if plan.tenant
+            ]
+        )
+        OwnerLink.objects.bulk_create(
+            [
+                OwnerLink(invoice_id=plan.invoice.id, propertyowner_id=plan.owner.id)
+                for plan in chunk
+                if plan.owner
+            ]
+        )
+
+        penalties = [penalty for plan in chunk for penalty in plan.penalties]
+        if penalties:
+            Penalty.objects.bulk_update(
+                penalties, ["status", "linked_invoice", "updated_at"]
+            )
+
+        # bulk_create skips the signals that keep the report facts and
+        # payouts current
+        for invoice in invoices:
+            financial_facts.mark_dirty(invoice.property_id, invoice.issue_date)
+        payout_recompute.mark_nodes_dirty(invoice.property_id for invoice in invoices)
+
+    def _send_emails(self, chunk: List[PlannedInvoice]):
+        """Hand the chunk's invoice emails to the outbound mail queue"""
+        try:
+            queued = queue_invoice_emails((plan.invoice, plan.user) for plan in chunk)
+            logger.info(f"Queued {len(queued)} invoice emails")
+        except Exception as e:
+            logger.warning(f"Failed to queue invoice emails: {e}")
+            self.error_count += 1
+
+    def _result(self, started, reason=None) -> Dict:
+        duration = time.monotonic() - started
+        result = {
+            "generated": self.generated_count,
+            "skipped": self.skipped_count,
+            "errors": self.error_count,
+            "tenant_processed": self.tenant_processed,
+            "owner_processed": self.owner_processed,
+            "duration_seconds": round(duration, 3),
+            "invoices_per_second": (
+                round(self.generated_count / duration, 2) if duration > 0 else 0
+            ),
+        }
+        if reason:
+            result["reason"] = reason
+        return result
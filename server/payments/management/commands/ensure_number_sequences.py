@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from payments.numbering import ensure_number_sequences
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the invoice, receipt, payout and penalty number sequences "
+        "(run on deploy, after migrate)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year",
+            dest="years",
+            type=int,
+            action="append",
+            help="Penalty year to create (repeatable, default: this and next year)",
+        )
+
+    def handle(self, *args, **options):
+        names = ensure_number_sequences(options["years"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Number sequences ready: {', '.join(names)}")
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.financial_facts import rebuild_financial_facts
+from reports.utils import parse_date_param
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly financial fact table used by the reports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            help="First month to rebuild (YYYY-MM-DD, default: all history)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            help="Last day to rebuild (YYYY-MM-DD, default: all history)",
+        )
+
+    def handle(self, *args, **options):
+        date_from = parse_date_param(options["date_from"])
+        date_to = parse_date_param(options["date_to"])
+        if options["date_from"] and not date_from:
+            raise CommandError("--from must be YYYY-MM-DD")
+        if options["date_to"] and not date_to:
+            raise CommandError("--to must be YYYY-MM-DD")
+
+        self.stdout.write("Rebuilding financial facts...")
+        result = rebuild_financial_facts(date_from, date_to)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {result['months']} months ({result['rows']} fact rows)"
+            )
+        )
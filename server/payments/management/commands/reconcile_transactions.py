@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import reconcile_transactions
+
+
+class Command(BaseCommand):
+    help = "Match unverified transactions to invoices and apply them in one batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the reconciliation report without writing anything",
+        )
+
+    def handle(self, *args, **options):
+        report = reconcile_transactions(dry_run=options["dry_run"])
+
+        for exception in report["exceptions"]:
+            self.stdout.write(
+                f"{exception['reason']}: {exception['trans_id']} "
+                f"({exception['amount']}) - {exception['message']}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Would reconcile' if options['dry_run'] else 'Reconciled'} "
+                f"{report['matched']} of {report['transactions']} transactions: "
+                f"{report['receipts']} receipts, {report['amount_applied']} applied, "
+                f"{len(report['exceptions'])} exceptions"
+            )
+        )
@@ -0,0 +1,103 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from payments.models import Invoice
+from properties.models import PropertyOwner, PropertyTenant
+from utils.email_utils import email_service
+from utils.invoice import build_invoice_context, generate_invoice_pdfs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render invoice PDFs for a billing month in a process pool. "
+        "Invoices whose stored PDF is still current are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", type=int, help="Issue month (default: current)")
+        parser.add_argument("--year", type=int, help="Issue year (default: current)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Render processes (default: CPU count)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Invoices rendered per pool batch",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        year = options["year"] or now.year
+        month = options["month"] or now.month
+
+        invoices = (
+            Invoice.objects.filter(
+                issue_date__year=year, issue_date__month=month, is_deleted=False
+            )
+            .exclude(status="CANCELLED")
+            .prefetch_related(
+                Prefetch(
+                    "tenants",
+                    queryset=PropertyTenant.objects.select_related("tenant_user"),
+                ),
+                Prefetch(
+                    "owners",
+                    queryset=PropertyOwner.objects.select_related("owner_user"),
+                ),
+                "items",
+            )
+            .order_by("invoice_number")
+        )
+
+        template_content = email_service._load_template("invoice_email_template.html")
+        totals = {"rendered": 0, "reused": 0, "failed": 0}
+        batch = []
+
+        self.stdout.write(f"Rendering invoice PDFs for {month:02d}/{year}...")
+        for invoice in invoices.iterator(chunk_size=options["batch_size"]):
+            # Same recipient user the invoice email is rendered for
+            user = self._recipient_user(invoice)
+            context = build_invoice_context(invoice, user)
+            batch.append(
+                (invoice, email_service._render_template(template_content, context))
+            )
+            if len(batch) >= options["batch_size"]:
+                self._flush(batch, options["workers"], totals)
+                batch = []
+        self._flush(batch, options["workers"], totals)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done: {totals['rendered']} rendered, {totals['reused']} reused, "
+                f"{totals['failed']} failed"
+            )
+        )
+
+    def _flush(self, batch, workers, totals):
+        if not batch:
+            return
+        result = generate_invoice_pdfs(batch, workers=workers)
+        for key in totals:
+            totals[key] += result[key]
+        self.stdout.write(
+            f"  {result['rendered']} rendered, {result['reused']} reused, "
+            f"{result['failed']} failed"
+        )
+
+    def _recipient_user(self, invoice):
+        tenants = list(invoice.tenants.all())
+        if tenants:
+            return tenants[0].tenant_user
+        owners = list(invoice.owners.all())
+        if owners:
+            return owners[0].owner_user
+        return None
@@ -155,6 +155,11 @@ class Invoice(TimeStampedUUIDModel):
         blank=True,
         help_text="Generated PDF file for this invoice",
     )
+    pdf_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Content hash of the HTML the stored PDF was rendered from",
+    )
 
     class Meta:
         db_table = "invoice"
@@ -167,8 +172,9 @@ class Invoice(TimeStampedUUIDModel):
 
     def save(self, *args, **kwargs):
         if not self.invoice_number:
-            last = Invoice.objects.order_by("-invoice_number").first()
-            self.invoice_number = (last.invoice_number if last else 0) + 1
+            from payments.numbering import invoice_numbers
+
+            self.invoice_number = invoice_numbers.next()
         super().save(*args, **kwargs)
 
 
@@ -448,8 +454,9 @@ class Receipt(TimeStampedUUIDModel):
 
     def save(self, *args, **kwargs):
         if not self.receipt_number:
-            last = Receipt.objects.order_by("-receipt_number").first()
-            self.receipt_number = (last.receipt_number if last else 0) + 1
+            from payments.numbering import receipt_numbers
+
+            self.receipt_number = receipt_numbers.next()
         super().save(*args, **kwargs)
 
 
@@ -589,18 +596,13 @@ class Payout(TimeStampedUUIDModel):
     def save(self, *args, **kwargs):
         """Auto-generate payout number if not provided"""
         if not self.payout_number:
-            last = Payout.objects.order_by("-payout_number").first()
-            if last and last.payout_number:
-                try:
-                    last_num = int(last.payout_number.split("-")[-1])
-                    new_num = last_num + 1
-                except (ValueError, IndexError):
-                    new_num = 1
-            else:
-                new_num = 1
+            from payments.numbering import format_payout_number, payout_numbers
+
             year = self.year if self.year else timezone.now().year
             month = self.month if self.month else timezone.now().month
-            self.payout_number = f"PO-{year}-{month:02d}-{str(new_num).zfill(3)}"
+            self.payout_number = format_payout_number(
+                year, month, payout_numbers.next()
+            )
         super().save(*args, **kwargs)
 
     @property
@@ -854,6 +856,49 @@ class PaymentRequestTransactions(TimeStampedUUIDModel):
 
     class Meta:
         db_table = "request_transactions"
+        indexes = [
+            models.Index(fields=["checkout_request_id", "merchant_request_id"]),
+        ]
+
+
+class PaymentCallback(TimeStampedUUIDModel):
+    """
+    Raw payment gateway callback, stored before it is applied.
+
+    The callback view only inserts the row (``idempotency_key`` is unique, so
+    a retried callback is stored once) and acknowledges the gateway; the
+    ``callback_queue`` workers apply it. See ``payments.callbacks``.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("APPLIED", "Applied"),
+        ("REJECTED", "Rejected"),
+        ("IGNORED", "Ignored"),
+        ("FAILED", "Failed"),
+    ]
+
+    idempotency_key = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="CheckoutRequestID, or TransactionCode when it is missing",
+    )
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="PENDING", db_index=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "payment_callback"
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"Payment callback {self.idempotency_key} ({self.status})"
 
 
 class PaymentDisparment(TimeStampedUUIDModel):
@@ -1310,3 +1355,70 @@ class TaskConfiguration(TimeStampedUUIDModel):
                 "error_count",
             ]
         )
+
+
+class FinancialFact(TimeStampedUUIDModel):
+    """
+    Materialized monthly totals per property node, category and service.
+
+    Invoice items are keyed by the invoice's property and issue month, with
+    ``category`` being the item type. Expenses are keyed by their location node
+    and invoice month under the ``EXPENSE`` category. Receipts are spread over
+    the categories of the invoice they pay, pro rata to the item prices.
+    Maintained by ``payments.financial_facts``; rebuild with
+    ``python manage.py rebuild_financial_facts``.
+    """
+
+    EXPENSE_CATEGORY = "EXPENSE"
+
+    node = models.ForeignKey(
+        LocationNode,
+        on_delete=models.CASCADE,
+        related_name="financial_facts",
+    )
+    month = models.DateField(help_text="First day of the month")
+    category = models.CharField(
+        max_length=32, help_text="Invoice item type, or EXPENSE"
+    )
+    billed_to = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text="TENANT or OWNER for invoice facts, blank for expenses",
+    )
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="financial_facts",
+    )
+    billed_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Sum of item prices"
+    )
+    billed_item_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of item unit amounts",
+    )
+    collected_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_paid_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Total amount (incl. tax) of paid expenses",
+    )
+    management_fee_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+
+    class Meta:
+        db_table = "financial_fact"
+        indexes = [
+            models.Index(fields=["month", "category"]),
+            models.Index(fields=["node", "month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.node_id} {self.month:%Y-%m} {self.category}"
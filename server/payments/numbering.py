@@ -0,0 +1,147 @@
+"""
+Sequence-backed document numbering for invoices, receipts, penalties and
+payouts.
+
+Numbers come from PostgreSQL sequences instead of ``MAX(number) + 1``: one
+``nextval`` per insert, no serialisation between concurrent writers, and bulk
+callers can reserve a whole block in a single round trip. Sequences are seeded
+from the highest number already stored, so no data migration is needed; the
+``ensure_number_sequences`` command creates them at deploy time, and any that
+are missing (a new year's penalty sequence) are created on first use.
+"""
+
+import logging
+import zlib
+
+from typing import List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Sequences known to exist (committed) in this process
+_ready_sequences = set()
+
+
+class NumberSequence:
+    """
+    A named database sequence seeded from an existing numbered column.
+
+    Args:
+        name: Sequence name in the database
+        seed_sql: SELECT returning the highest number currently in use
+    """
+
+    def __init__(self, name: str, seed_sql: str):
+        self.name = name
+        self.seed_sql = seed_sql
+
+    def next(self) -> int:
+        """Return the next number"""
+        return self.allocate(1)[0]
+
+    def allocate(self, count: int) -> List[int]:
+        """Reserve ``count`` unique numbers in one round trip, in ascending order"""
+        if count <= 0:
+            return []
+
+        with connection.cursor() as cursor:
+            self._ensure(cursor)
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)", [self.name, count]
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def ensure(self):
+        """Create the sequence if it does not exist yet"""
+        with connection.cursor() as cursor:
+            self._ensure(cursor)
+
+    def _exists(self, cursor) -> bool:
+        cursor.execute("SELECT to_regclass(%s)", [self.name])
+        return cursor.fetchone()[0] is not None
+
+    def _ensure(self, cursor):
+        if self.name in _ready_sequences:
+            return
+
+        if not self._exists(cursor):
+            with transaction.atomic():
+                # Held until the creating transaction commits, so a concurrent
+                # creator waits and then finds the sequence
+                lock_id = zlib.crc32(self.name.encode())
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id])
+                if not self._exists(cursor):
+                    self._create(cursor)
+
+        # Only cached once committed: a rolled back transaction takes the
+        # sequence with it. Runs immediately outside an atomic block.
+        transaction.on_commit(lambda: _ready_sequences.add(self.name))
+
+    def _create(self, cursor):
+        cursor.execute(self.seed_sql)
+        last = cursor.fetchone()[0] or 0
+        quoted = connection.ops.quote_name(self.name)
+        cursor.execute(f"CREATE SEQUENCE {quoted} MINVALUE 1")
+        cursor.execute("SELECT setval(%s, %s, false)", [self.name, last + 1])
+        logger.info(f"Created sequence {self.name} starting at {last + 1}")
+
+
+invoice_numbers = NumberSequence(
+    "invoice_number_seq",
+    "SELECT COALESCE(MAX(invoice_number), 0) FROM invoice",
+)
+
+receipt_numbers = NumberSequence(
+    "receipt_number_seq",
+    "SELECT COALESCE(MAX(receipt_number), 0) FROM receipt",
+)
+
+
+payout_numbers = NumberSequence(
+    "payout_number_seq",
+    "SELECT COALESCE(MAX(CAST(SPLIT_PART(payout_number, '-', 4) AS INTEGER)), 0) "
+    "FROM payout WHERE payout_number ~ '^PO-[0-9]+-[0-9]+-[0-9]+$'",
+)
+
+
+def penalty_numbers(year: int) -> NumberSequence:
+    """Penalty numbers restart every year, so each year has its own sequence"""
+    return NumberSequence(
+        f"penalty_number_{year}_seq",
+        "SELECT COALESCE(MAX(CAST(SPLIT_PART(penalty_number, '-', 3) AS INTEGER)), 0) "
+        f"FROM penalty WHERE penalty_number LIKE 'PEN-{int(year)}-%'",
+    )
+
+
+def ensure_number_sequences(years=None) -> List[str]:
+    """
+    Create the document number sequences (penalties: this and next year, or
+    ``years``); returns their names
+    """
+    if years is None:
+        year = timezone.now().year
+        years = [year, year + 1]
+    sequences = [invoice_numbers, receipt_numbers, payout_numbers]
+    sequences += [penalty_numbers(year) for year in years]
+    for sequence in sequences:
+        sequence.ensure()
+    return [sequence.name for sequence in sequences]
+
+
+def format_penalty_number(year: int, number: int) -> str:
+    return f"PEN-{year}-{str(number).zfill(3)}"
+
+
+def allocate_penalty_numbers(count: int, year: int = None) -> List[str]:
+    """Reserve ``count`` penalty numbers for the given (default: current) year"""
+    year = year or timezone.now().year
+    return [
+        format_penalty_number(year, number)
+        for number in penalty_numbers(year).allocate(count)
+    ]
+
+
+def format_payout_number(year: int, month: int, number: int) -> str:
+    return f"PO-{year}-{month:02d}-{str(number).zfill(3)}"
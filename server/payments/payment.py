@@ -1,18 +1,15 @@
 import datetime
-import json
 import os
 import time
 import uuid
 
-import requests
-
 from django.core.cache import cache
-from django.db.models import Max, Sum
+from django.db.models import Max, Prefetch, Sum
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 from drf_spectacular.utils import extend_schema, OpenApiResponse
-from requests.auth import HTTPBasicAuth
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -25,6 +22,8 @@ from payments.models import (
     PaymentRequestTransactions,
     Receipt,
 )
+from payments.payouts import recompute as payout_recompute
+from payments.reconciliation import reconcile_transactions
 from payments.serializers.payment import (
     CreateCreditNoteSerializer,
     CreatePaymentSerializer,
@@ -33,13 +32,15 @@ from payments.serializers.payment import (
     PaymentTableResponseSerializer,
     UnpaidInvoiceSerializer,
 )
-from properties.models import PropertyOwner, PropertyTenant
+from properties.models import LocationNode, PropertyOwner, PropertyTenant
 from utils.currency import get_serialized_default_currency
-from utils.custom_pagination import CustomPageNumberPagination
+from utils.custom_pagination import KeysetPagination
 from utils.exception_handler import flatten_errors
+from utils.export import EXPORT_CHUNK_SIZE, ExportMixin
 from utils.format import format_money_with_currency
 from utils.payments import get_payment_request, payout_withdrawal
 from utils.redis_pubsub import wait_for_payment_status
+from utils.sasapay import get_access_token
 
 
 @extend_schema(
@@ -106,19 +107,7 @@ class UnpaidInvoicesForUserView(APIView):
 
 
 def token():
-    url = "https://sandbox.sasapay.app/api/v1/auth/token/?grant_type=client_credentials"
-    params = {"grant_type": "client_credentials"}
-    res = requests.get(
-        url,
-        auth=HTTPBasicAuth(
-            "40tcB9ytloIYRTUbuG3LNdYT7TTCc7SYGIeU7T65",
-            "gvye9Sk6TnfCQiP7rqaXUQ9aaOohw6AySO0tBLTbybpDuuJrSQmU8dKxfpK9hEI6aTQGYX1scqAgyUWvvUgXBltSXjC7C4JimMDtX3vMzGiSXJZuoONwrsUoV5Va3dsD",
-        ),
-        params=params,
-    )
-    response = json.loads(res.text)
-    access_token = response["access_token"]
-    return access_token
+    return get_access_token()
 
 
 @extend_schema(
@@ -617,17 +606,99 @@ class PaymentStatsSummaryView(ListAPIView):
         )
 
 
+def _project_name(node, project_nodes):
+    """
+    Name of the project ``node`` belongs to; the projects of each tree are
+    loaded once into ``project_nodes`` instead of walking ancestors per row
+    """
+    if node is None:
+        return ""
+    if node.tree_id not in project_nodes:
+        project_nodes[node.tree_id] = list(
+            LocationNode.objects.filter(tree_id=node.tree_id, node_type="PROJECT")
+            .order_by("lft")
+            .values_list("lft", "rght", "name")
+        )
+    return next(
+        (
+            name
+            for lft, rght, name in project_nodes[node.tree_id]
+            if lft <= node.lft and node.rght <= rght
+        ),
+        "",
+    )
+
+
+def payment_table_item(receipt, project_nodes):
+    """Payment table row of a receipt (see ``PaymentTableListView``)"""
+    invoice = receipt.invoice
+    # Tenants and owners are prefetched in id order, so [0] is .first()
+    tenants = list(invoice.tenants.all())
+    owners = list(invoice.owners.all())
+    if tenants:
+        contact = tenants[0].tenant_user
+    elif owners:
+        contact = owners[0].owner_user
+    else:
+        contact = None
+
+    return {
+        "id": str(receipt.id),
+        # Use receipt.receipt_number for paymentNumber, formatted like invoice number
+        "paymentNumber": (
+            f"RV-{receipt.payment_date.year}-{str(receipt.receipt_number).zfill(4)}"
+            if receipt.receipt_number is not None
+            else ""
+        ),
+        "tenant": {
+            "name": contact.get_full_name() if contact else "",
+            "email": contact.email if contact else "",
+            "phone": contact.phone if contact else "",
+        },
+        "property": {
+            "unit": invoice.property.name if invoice.property else "",
+            "projectName": _project_name(invoice.property, project_nodes),
+        },
+        "paymentDate": receipt.payment_date.isoformat(),
+        "paymentMethod": "cash",  # TODO: update if you have payment method field
+        "amountPaid": format_money_with_currency(float(receipt.paid_amount)),
+        "amountPaidNoCurrency": float(receipt.paid_amount),
+        "invoicesApplied": [
+            {
+                "id": str(invoice.id),
+                "invoiceNumber": f"INV-{invoice.issue_date.year}-{str(invoice.invoice_number).zfill(3)}",
+                "amount": format_money_with_currency(float(invoice.total_amount)),
+            }
+        ],
+        "balanceRemaining": format_money_with_currency(float(receipt.balance)),
+        "status": "success",  # TODO: update if you have payment status field
+        "notes": invoice.description or "",
+        "receiptUrl": None,
+        "createdBy": "",  # TODO: fill if you have creator info
+        "createdAt": receipt.payment_date.isoformat(),
+        "updatedAt": None,
+    }
+
+
 @extend_schema(
     tags=["Payments"],
     responses={200: PaymentTableResponseSerializer},
-    description="List all payments (paginated, cached, filterable by date range). Supports ?from=YYYY-MM-DD&to=YYYY-MM-DD&page=1&page_size=10.",
+    description="List all payments (paginated, cached, filterable by date range). Supports ?from=YYYY-MM-DD&to=YYYY-MM-DD&page=1&page_size=10, and ?export=csv|xlsx (add &background=true for a file in the media bucket). Pass ?cursor= (empty for the first page, then next_cursor) for keyset pagination on creation time.",
 )
-class PaymentTableListView(ListAPIView):
+class PaymentTableListView(ExportMixin, ListAPIView):
     serializer_class = PaymentTableItemSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = KeysetPagination
+    export_filename = "payments"
 
     def get_queryset(self):
-        receipt_qs = Receipt.objects.select_related("invoice").all()
+        tenants = PropertyTenant.objects.select_related("tenant_user").order_by("id")
+        owners = PropertyOwner.objects.select_related("owner_user").order_by("id")
+        receipt_qs = Receipt.objects.select_related(
+            "invoice__property"
+        ).prefetch_related(
+            Prefetch("invoice__tenants", queryset=tenants),
+            Prefetch("invoice__owners", queryset=owners),
+        )
         from_str = self.request.query_params.get("from")
         to_str = self.request.query_params.get("to")
         if from_str:
@@ -645,119 +716,30 @@ class PaymentTableListView(ListAPIView):
         return receipt_qs.order_by("-payment_date", "-id")
 
     def list(self, request, *args, **kwargs):
-        page_number = request.query_params.get("page", 1)
-        page_size = request.query_params.get("page_size", 10)
-        from_str = request.query_params.get("from", "")
-        to_str = request.query_params.get("to", "")
-        filters = f"from:{from_str}:to:{to_str}"
-        receipt_qs = Receipt.objects.select_related("invoice").all()
-        if from_str:
-            try:
-                from_date = datetime.datetime.strptime(from_str, "%Y-%m-%d").date()
-                receipt_qs = receipt_qs.filter(payment_date__date__gte=from_date)
-            except Exception:
-                pass
-        if to_str:
-            try:
-                to_date = datetime.datetime.strptime(to_str, "%Y-%m-%d").date()
-                receipt_qs = receipt_qs.filter(payment_date__date__lte=to_date)
-            except Exception:
-                pass
-        qs = receipt_qs.order_by("-payment_date", "-id")
-        page = self.paginate_queryset(qs)
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
 
-        def build_item(receipt):
-            invoice = receipt.invoice
-            # Compose the payment row as per PaymentTableItemSchema
-            return {
-                "id": str(receipt.id),
-                # Use receipt.receipt_number for paymentNumber, formatted like invoice number
-                "paymentNumber": (
-                    f"RV-{receipt.payment_date.year}-{str(receipt.receipt_number).zfill(4)}"  # noqa: E501
-                    if hasattr(receipt, "receipt_number")
-                    and receipt.receipt_number is not None
-                    else ""
-                ),
-                "tenant": {
-                    "name": (
-                        invoice.tenants.first().tenant_user.get_full_name()
-                        if invoice.tenants.exists()
-                        else (
-                            invoice.owners.first().owner_user.get_full_name()
-                            if invoice.owners.exists()
-                            else ""
-                        )
-                    ),
-                    "email": (
-                        invoice.tenants.first().tenant_user.email
-                        if invoice.tenants.exists()
-                        else (
-                            invoice.owners.first().owner_user.email
-                            if invoice.owners.exists()
-                            else ""
-                        )
-                    ),
-                    "phone": (
-                        invoice.tenants.first().tenant_user.phone
-                        if invoice.tenants.exists()
-                        else (
-                            invoice.owners.first().owner_user.phone
-                            if invoice.owners.exists()
-                            else ""
-                        )
-                    ),
-                },
-                "property": {
-                    "unit": invoice.property.name if invoice.property else "",
-                    "projectName": (
-                        next(
-                            (
-                                a.name
-                                for a in invoice.property.get_ancestors(
-                                    include_self=True
-                                )
-                                if a.node_type == "PROJECT"
-                            ),
-                            "",
-                        )
-                        if invoice.property
-                        else ""
-                    ),
-                },
-                "paymentDate": receipt.payment_date.isoformat(),
-                "paymentMethod": "cash",  # TODO: update if you have payment method field
-                "amountPaid": format_money_with_currency(float(receipt.paid_amount)),
-                "amountPaidNoCurrency": float(receipt.paid_amount),
-                "invoicesApplied": [
-                    {
-                        "id": str(invoice.id),
-                        "invoiceNumber": f"INV-{invoice.issue_date.year}-{str(invoice.invoice_number).zfill(3)}",
-                        "amount": format_money_with_currency(
-                            float(invoice.total_amount)
-                        ),
-                    }
-                ],
-                "balanceRemaining": format_money_with_currency(float(receipt.balance)),
-                "status": "success",  # TODO: update if you have payment status field
-                "notes": invoice.description or "",
-                "receiptUrl": None,
-                "createdBy": "",  # TODO: fill if you have creator info
-                "createdAt": receipt.payment_date.isoformat(),
-                "updatedAt": None,
-            }
+        qs = self.get_queryset()
+        page = self.paginate_queryset(qs)
+        project_nodes = {}
 
         if page is not None:
-            items = [build_item(receipt) for receipt in page]
+            items = [payment_table_item(receipt, project_nodes) for receipt in page]
             paginated_response = self.get_paginated_response(items)
             data = paginated_response.data
             return Response({"error": False, "data": data}, status=status.HTTP_200_OK)
-        items = [build_item(receipt) for receipt in qs]
+        items = [payment_table_item(receipt, project_nodes) for receipt in qs]
         data = {
             "count": qs.count(),
             "results": items,
         }
         return Response({"error": False, "data": data}, status=status.HTTP_200_OK)
 
+    def export_rows(self):
+        project_nodes = {}
+        for receipt in self.get_queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield payment_table_item(receipt, project_nodes)
+
 # Update bills from paybill/till:
 @extend_schema(
     tags=["Payments"],
@@ -882,44 +864,46 @@ class UpdateBillsFromTransactionView(APIView):
             updated_invoices = []
             created_receipts = []
 
-            for invoice in unpaid_invoices:
-                if remaining_amount <= 0:
-                    break
-
-                # Calculate amount to apply to this invoice
-               # invoice_balance = Decimal(str(invoice.balance))
-                # Use total_amount if balance is 0 or not set
-                invoice_balance = Decimal(str(invoice.balance)) if invoice.balance > 0 else Decimal(str(invoice.total_amount))
-                amount_to_apply = min(remaining_amount, invoice_balance)
-
-                # Create receipt for this invoice
-                receipt = Receipt.objects.create(
-                    invoice=invoice,
-                    paid_amount=float(amount_to_apply),
-                    balance=float(invoice_balance - amount_to_apply),
-                    #payment_method=payment_method,
-                    payment_method=valid_payment_method,
-                    notes=f"Payment from transaction {transaction_id} for apartment {apartment_number}",
-                )
-                created_receipts.append(receipt)
-
-                # Update invoice
-                invoice.balance = float(invoice_balance - amount_to_apply)
-                if invoice.balance <= 0:
-                    invoice.status = "PAID"
-                else:
-                    invoice.status = "PARTIAL"
-                invoice.save()
-
-                updated_invoices.append({
-                    "invoice_id": str(invoice.id),
-                    "invoice_number": invoice.invoice_number,
-                    "amount_applied": float(amount_to_apply),
-                    "new_balance": float(invoice.balance),
-                    "status": invoice.status,
-                })
-
-                remaining_amount -= amount_to_apply
+            # One payout recompute for all the invoices and receipts below
+            with payout_recompute.suspended():
+                for invoice in unpaid_invoices:
+                    if remaining_amount <= 0:
+                        break
+
+                    # Calculate amount to apply to this invoice
+                   # invoice_balance = Decimal(str(invoice.balance))
+                    # Use total_amount if balance is 0 or not set
+                    invoice_balance = Decimal(str(invoice.balance)) if invoice.balance > 0 else Decimal(str(invoice.total_amount))
+                    amount_to_apply = min(remaining_amount, invoice_balance)
+
+                    # Create receipt for this invoice
+                    receipt = Receipt.objects.create(
+                        invoice=invoice,
+                        paid_amount=float(amount_to_apply),
+                        balance=float(invoice_balance - amount_to_apply),
+                        #payment_method=payment_method,
+                        payment_method=valid_payment_method,
+                        notes=f"Payment from transaction {transaction_id} for apartment {apartment_number}",
+                    )
+                    created_receipts.append(receipt)
+
+                    # Update invoice
+                    invoice.balance = float(invoice_balance - amount_to_apply)
+                    if invoice.balance <= 0:
+                        invoice.status = "PAID"
+                    else:
+                        invoice.status = "PARTIAL"
+                    invoice.save()
+
+                    updated_invoices.append({
+                        "invoice_id": str(invoice.id),
+                        "invoice_number": invoice.invoice_number,
+                        "amount_applied": float(amount_to_apply),
+                        "new_balance": float(invoice.balance),
+                        "status": invoice.status,
+                    })
+
+                    remaining_amount -= amount_to_apply
 
             # Prepare response data
             response_data = {
@@ -954,7 +938,62 @@ class UpdateBillsFromTransactionView(APIView):
 
 @extend_schema(
     tags=["Payments"],
-    description="Get all instant payment notifications (transactions)",
+    description=(
+        "Match all unverified transactions to units/invoices and apply them to "
+        "the oldest unpaid invoices in one batch. Returns the reconciliation "
+        "report and the transactions that need manual review."
+    ),
+    request={
+        "type": "object",
+        "properties": {
+            "transaction_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Only reconcile these transactions (default: all unverified)",
+            },
+            "dry_run": {"type": "boolean", "description": "Report without writing"},
+        },
+    },
+    responses={
+        200: OpenApiResponse(description="Reconciliation report"),
+        500: OpenApiResponse(description="Internal server error"),
+    },
+)
+class ReconcileTransactionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            dry_run = str(request.data.get("dry_run", False)).lower() in ("1", "true")
+            report = reconcile_transactions(
+                transaction_ids=request.data.get("transaction_ids") or None,
+                dry_run=dry_run,
+                user=request.user,
+            )
+            return Response(
+                {
+                    "error": False,
+                    "message": (
+                        f"Reconciled {report['matched']} of {report['transactions']} "
+                        f"transactions, {len(report['exceptions'])} need review"
+                    ),
+                    "data": report,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response(
+                {
+                    "error": True,
+                    "message": f"Error reconciling transactions: {str(e)}",
+                    "data": None,
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+@extend_schema(
+    tags=["Payments"],
+    description="Get all instant payment notifications (transactions). Pass ?cursor= (empty for the first page, then next_cursor) to page them instead; data is then a {count, results, next_cursor, previous_cursor} page.",
     responses={
         200: OpenApiResponse(description="Transactions retrieved successfully"),
         500: OpenApiResponse(description="Internal server error"),
@@ -967,7 +1006,14 @@ class TransactionsListView(APIView):
         try:
             # Get all instant payment notifications
             transactions = InstantPaymentNotification.objects.all().order_by('-created_at')
-            
+
+            paginator = None
+            if KeysetPagination.cursor_query_param in request.query_params:
+                paginator = KeysetPagination()
+                transactions = paginator.paginate_queryset(
+                    transactions, request, view=self
+                )
+
             # Convert to the format expected by frontend
             transactions_data = []
             for transaction in transactions:
@@ -988,6 +1034,11 @@ class TransactionsListView(APIView):
                     "updated_at": transaction.updated_at.isoformat(),
                 })
 
+            if paginator is not None:
+                transactions_data = paginator.get_paginated_response(
+                    transactions_data
+                ).data
+
             return Response(
                 {
                     "error": False,
@@ -997,6 +1048,11 @@ class TransactionsListView(APIView):
                 status=status.HTTP_200_OK,
             )
 
+        except ValidationError as e:
+            return Response(
+                {"error": True, "message": flatten_errors(e.detail), "data": None},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             return Response(
                 {
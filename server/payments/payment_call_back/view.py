@@ -1,12 +1,13 @@
 from decimal import Decimal
 
-from django.db.models import Q, Sum
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from payments.callbacks import record_payment_callback
 from payments.models import (
     Expense,
     Invoice,
@@ -23,12 +24,6 @@ from utils.redis_pubsub import (
 )
 
 
-def get_transaction(checkout_id, merchant_id):
-    return PaymentRequestTransactions.objects.filter(
-        Q(checkout_request_id=checkout_id) & Q(merchant_request_id=merchant_id)
-    ).first()
-
-
 def update_transaction_fields(transaction, update_data):
     for key, value in update_data.items():
         setattr(transaction, key, value)
@@ -43,160 +38,26 @@ def safe_decimal(value):
 
 
 class PaymentCallBackView(APIView):
+    """
+    Stores the callback and acknowledges the gateway right away; it is
+    applied on the callback queue (see payments.callbacks). Retried
+    callbacks are stored once.
+    """
+
     permission_classes = [AllowAny]
 
     def post(self, request):
-        data = request.data
-        result_code = str(data.get("ResultCode"))
-        checkout_id = data.get("CheckoutRequestID")
-        merchant_id = data.get("MerchantRequestID")
-
-        transaction = get_transaction(checkout_id, merchant_id)
-        if not transaction:
+        callback, _ = record_payment_callback(request.data)
+        if callback is None:
             return Response(
-                {"message": "Transaction not found."}, status=status.HTTP_404_NOT_FOUND
+                {"message": "CheckoutRequestID is required."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if result_code == "0":
-            # Update transaction fields
-            update_data = {
-                "payment_request_id": data.get("PaymentRequestID"),
-                "result_code": result_code,
-                "result_desc": data.get("ResultDesc"),
-                "amount": data.get("TransAmount", 0),
-                "source_channel": data.get("SourceChannel"),
-                "bill_ref_number": data.get("BillRefNumber"),
-                "transaction_date": data.get("TransactionDate"),
-                "customer_mobile": data.get("CustomerMobile"),
-                "transaction_code": data.get("TransactionCode"),
-                "third_party_trans_id": data.get("ThirdPartyTransID"),
-                "pay_status": "Paid",
-            }
-            update_transaction_fields(transaction, update_data)
-
-            trans_amount_decimal = safe_decimal(data.get("TransAmount", 0))
-
-            # Check if this is a multiple invoice transaction
-            if transaction.is_multiple_invoices and transaction.invoices_data:
-                # Validate received amount matches expected total
-                if (
-                    abs(
-                        float(trans_amount_decimal)
-                        - float(transaction.expected_total_amount)
-                    )
-                    > 0.01
-                ):
-                    # Amount mismatch - mark as failed
-                    transaction.pay_status = "Failed"
-                    transaction.result_desc = f"Amount mismatch. Expected: {transaction.expected_total_amount}, Received: {trans_amount_decimal}"
-                    transaction.save()
-                    notify_payment_status(transaction.id, "Failed")
-                    return Response(
-                        {"message": "Payment amount mismatch"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                # Process multiple invoices
-                self._process_multiple_invoices(transaction, trans_amount_decimal)
-            else:
-                # Process single invoice (backward compatibility)
-                self._process_single_invoice(transaction, trans_amount_decimal)
-
-            notify_payment_status(transaction.id, "Paid")
-        else:
-            update_data = {
-                "MerchantRequestID": data.get("MerchantRequestID"),
-                "CheckoutRequestID": data.get("CheckoutRequestID"),
-                "MerchantCode": data.get("MerchantCode"),
-                "PaymentRequestID": data.get("PaymentRequestID"),
-                "ResultCode": result_code,
-                "ResultDesc": data.get("ResultDesc"),
-                "pay_status": "Failed",
-            }
-            update_transaction_fields(transaction, update_data)
-            notify_payment_status(transaction.id, "Failed")
-
         return Response(
             {"message": "Payment callback received"}, status=status.HTTP_200_OK
         )
 
-    def _process_single_invoice(self, transaction, trans_amount_decimal):
-        """Process payment for a single invoice (backward compatibility)"""
-        invoice = transaction.invoice
-
-        total_paid_before = (
-            invoice.receipts.aggregate(total=Sum("paid_amount"))["total"] or 0
-        )
-        total_paid_after = float(total_paid_before) + float(trans_amount_decimal)
-        new_balance = max(0, float(invoice.total_amount) - total_paid_after)
-
-        print(total_paid_before, total_paid_after, new_balance)
-
-        Receipt.objects.create(
-            invoice=invoice,
-            paid_amount=trans_amount_decimal,
-            balance=new_balance,
-        )
-        invoice.balance = new_balance
-        if invoice.balance == 0:
-            invoice.status = "PAID"
-            # TODO: Make the related Penalty status PAID
-        elif invoice.balance > 0:
-            invoice.status = "PARTIAL"
-        invoice.save()
-
-    def _process_multiple_invoices(self, transaction, trans_amount_decimal):
-        """Process payment for multiple invoices"""
-        invoices_data = transaction.invoices_data
-        total_received = float(trans_amount_decimal)
-
-        # Calculate total expected amount for validation
-        total_expected = sum(float(inv["applied_amount"]) for inv in invoices_data)
-
-        # Validate total amounts match
-        if abs(total_received - total_expected) > 0.01:
-            raise ValueError(
-                f"Amount mismatch. Expected: {total_expected}, Received: {total_received}"
-            )
-
-        # Process each invoice
-        for inv_data in invoices_data:
-            try:
-                invoice = Invoice.objects.get(id=inv_data["invoice_id"])
-                applied_amount = float(inv_data["applied_amount"])
-
-                # Calculate new balance for this invoice
-                total_paid_before = (
-                    invoice.receipts.aggregate(total=Sum("paid_amount"))["total"] or 0
-                )
-                total_paid_after = float(total_paid_before) + applied_amount
-                new_balance = max(0, float(invoice.balance) - total_paid_after)
-
-                # Create receipt for this invoice
-                Receipt.objects.create(
-                    invoice=invoice,
-                    paid_amount=applied_amount,
-                    balance=new_balance,
-                )
-
-                # Update invoice status and balance
-                invoice.balance = new_balance
-                if invoice.balance == 0:
-                    invoice.status = "PAID"
-                    # TODO: Make the related Penalty status PAID
-                elif invoice.balance > 0:
-                    invoice.status = "PARTIAL"
-                invoice.save()
-
-                print(f"Processed invoice {invoice.invoice_number}: {applied_amount}")
-
-            except Invoice.DoesNotExist:
-                print(f"Invoice {inv_data['invoice_id']} not found")
-                continue
-            except Exception as e:
-                print(f"Error processing invoice {inv_data['invoice_id']}: {str(e)}")
-                continue
-
 
 class PayoutCallBackView(APIView):
     permission_classes = [AllowAny]
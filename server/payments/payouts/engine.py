@@ -0,0 +1,307 @@
+"""
+Portfolio-wide payout computation.
+
+Computes the same figures as ``calculate_single_owner_payout`` (rent collected,
+the rent share of receipts and the conditional service charge) for every
+(owner, property) of a month with a handful of grouped queries, then writes
+all payouts with one bulk upsert. Intermediate results are plain per-node
+lookup tables, so the cost no longer grows with queries per owner or per
+invoice.
+"""
+
+import calendar
+import datetime
+import logging
+
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Min, Q, Sum
+
+from payments.models import Invoice, InvoiceItem, Payout, Receipt
+from payments.numbering import format_payout_number, payout_numbers
+from properties.models import LocationNode, PropertyOwner, PropertyTenant
+
+logger = logging.getLogger(__name__)
+
+# Invoice statuses counted as billed rent
+PAYOUT_INVOICE_STATUSES = ["ISSUED", "PAID", "PARTIAL", "OVERDUE"]
+
+FULL_MANAGEMENT = Q(
+    node_type="UNIT", unit_detail__management_mode="FULL_MANAGEMENT"
+) | Q(node_type="HOUSE", villa_detail__management_mode="FULL_MANAGEMENT")
+
+CENT = Decimal("0.01")
+
+
+@dataclass
+class PayoutRow:
+    owner_id: object
+    property_node_id: object
+    rent_collected: Decimal
+    service_charge: Decimal
+    notes: str = ""
+
+    @property
+    def net_amount(self) -> Decimal:
+        return self.rent_collected - self.service_charge
+
+
+def full_management_pairs(owner_ids: Optional[Iterable] = None) -> Set[Tuple]:
+    """
+    (owner_id, node_id) for every full-management unit/house an owner holds,
+    directly or through a PROJECT they own
+    """
+    ownerships = PropertyOwner.objects.filter(owner_user__type="owner")
+    if owner_ids is not None:
+        ownerships = ownerships.filter(owner_user_id__in=list(owner_ids))
+
+    pairs = set()
+
+    # Units and houses owned directly
+    direct = ownerships.filter(
+        node__in=LocationNode.objects.filter(FULL_MANAGEMENT)
+    ).values_list("owner_user_id", "node_id")
+    pairs.update(direct)
+
+    # Units and houses under owned projects (projects are tree roots)
+    projects = defaultdict(list)
+    for owner_id, tree_id, lft, rght in ownerships.filter(
+        node__node_type="PROJECT"
+    ).values_list("owner_user_id", "node__tree_id", "node__lft", "node__rght"):
+        projects[tree_id].append((owner_id, lft, rght))
+
+    if projects:
+        nodes = LocationNode.objects.filter(
+            FULL_MANAGEMENT, tree_id__in=list(projects)
+        ).values_list("id", "tree_id", "lft")
+        for node_id, tree_id, lft in nodes:
+            for owner_id, project_lft, project_rght in projects[tree_id]:
+                if project_lft < lft < project_rght:
+                    pairs.add((owner_id, node_id))
+
+    return pairs
+
+
+def collected_rent_by_node(node_ids: List, month: int, year: int) -> Dict:
+    """
+    Rent share of the receipts of each node's invoices for the month
+
+    Each invoice contributes ``receipts * rent items / all items``.
+    """
+    invoice_filter = {
+        "invoice__property_id__in": node_ids,
+        "invoice__issue_date__year": year,
+        "invoice__issue_date__month": month,
+        "invoice__status__in": PAYOUT_INVOICE_STATUSES,
+    }
+    item_totals = (
+        InvoiceItem.objects.filter(**invoice_filter)
+        .values("invoice_id", "invoice__property_id")
+        .annotate(total=Sum("price"), rent=Sum("price", filter=Q(type="RENT")))
+    )
+    receipts = dict(
+        Receipt.objects.filter(**invoice_filter)
+        .values("invoice_id")
+        .annotate(total=Sum("paid_amount"))
+        .values_list("invoice_id", "total")
+    )
+
+    collected = defaultdict(Decimal)
+    for row in item_totals:
+        rent, total = row["rent"], row["total"]
+        if not rent or not total:
+            continue
+        paid = receipts.get(row["invoice_id"]) or Decimal("0")
+        collected[row["invoice__property_id"]] += paid * (rent / total)
+    return collected
+
+
+def service_charge_invoices_by_node(node_ids: List, month: int, year: int) -> Dict:
+    """
+    Lowest owner-invoice number with a SERVICE_CHARGE item, per node, for the
+    month; such invoices replace the payout's service charge deduction
+    """
+    return dict(
+        Invoice.objects.filter(
+            property_id__in=node_ids,
+            issue_date__year=year,
+            issue_date__month=month,
+            owners__isnull=False,
+            items__type="SERVICE_CHARGE",
+        )
+        .values("property_id")
+        .annotate(invoice_number=Min("invoice_number"))
+        .values_list("property_id", "invoice_number")
+    )
+
+
+def service_charge_by_node(node_ids: List) -> Dict:
+    charges = {}
+    for node_id, node_type, unit_charge, villa_charge in LocationNode.objects.filter(
+        id__in=node_ids
+    ).values_list(
+        "id",
+        "node_type",
+        "unit_detail__service_charge",
+        "villa_detail__service_charge",
+    ):
+        charge = unit_charge if node_type == "UNIT" else villa_charge
+        charges[node_id] = charge or Decimal("0")
+    return charges
+
+
+def occupied_nodes(node_ids: List, period_start, period_end) -> Set:
+    return set(
+        PropertyTenant.objects.filter(
+            node_id__in=node_ids,
+            contract_start__lte=period_end,
+            contract_end__gte=period_start,
+            is_deleted=False,
+        )
+        .values_list("node_id", flat=True)
+        .distinct()
+    )
+
+
+def compute_payouts(
+    month: int, year: int, owner_ids: Optional[Iterable] = None
+) -> List[PayoutRow]:
+    """Payout figures for every (owner, full-management property) of a month"""
+    pairs = full_management_pairs(owner_ids)
+    if not pairs:
+        return []
+
+    node_ids = list({node_id for _, node_id in pairs})
+    period_start = datetime.date(year, month, 1)
+    period_end = datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+    collected = collected_rent_by_node(node_ids, month, year)
+    invoiced_charges = service_charge_invoices_by_node(node_ids, month, year)
+    charges = service_charge_by_node(node_ids)
+    occupied = occupied_nodes(node_ids, period_start, period_end)
+
+    rows = []
+    for owner_id, node_id in sorted(pairs, key=str):
+        rent_collected = collected.get(node_id, Decimal("0"))
+        if node_id not in occupied:
+            rent_collected = Decimal("0")
+
+        notes = ""
+        if node_id in invoiced_charges:
+            service_charge = Decimal("0")
+            notes = (
+                f"Invoice {invoiced_charges[node_id]} is applied to the service charge"
+            )
+        else:
+            service_charge = charges.get(node_id, Decimal("0"))
+
+        rows.append(
+            PayoutRow(
+                owner_id=owner_id,
+                property_node_id=node_id,
+                rent_collected=rent_collected.quantize(CENT, ROUND_HALF_UP),
+                service_charge=Decimal(service_charge).quantize(CENT, ROUND_HALF_UP),
+                notes=notes,
+            )
+        )
+    return rows
+
+
+def recalculate_payouts(
+    month: int, year: int, owner_ids: Optional[Iterable] = None
+) -> Dict:
+    """
+    Recompute and store the payouts of a month in bulk.
+
+    Positive balances are upserted on (owner, property_node, month, year);
+    zero or negative balances remove the matching non-positive payout, as
+    the per-owner task did.
+    """
+    rows = compute_payouts(month, year, owner_ids)
+
+    positive = [row for row in rows if row.net_amount > 0]
+    skipped = [row for row in rows if row.net_amount <= 0]
+
+    with transaction.atomic():
+        # Rows that already exist keep their number (it is not in
+        # update_fields), so numbers are only drawn for the new ones
+        keys = [(row.owner_id, row.property_node_id) for row in positive]
+        payout_number_by_key = {}
+        if keys:
+            wanted = set(keys)
+            payout_number_by_key = {
+                (owner_id, node_id): payout_number
+                for owner_id, node_id, payout_number in Payout.objects.filter(
+                    month=month,
+                    year=year,
+                    property_node_id__in={node_id for _, node_id in wanted},
+                ).values_list("owner_id", "property_node_id", "payout_number")
+                if (owner_id, node_id) in wanted
+            }
+        new_keys = [key for key in keys if key not in payout_number_by_key]
+        for key, number in zip(new_keys, payout_numbers.allocate(len(new_keys))):
+            payout_number_by_key[key] = format_payout_number(year, month, number)
+        Payout.objects.bulk_create(
+            [
+                Payout(
+                    payout_number=payout_number_by_key[
+                        (row.owner_id, row.property_node_id)
+                    ],
+                    owner_id=row.owner_id,
+                    property_node_id=row.property_node_id,
+                    month=month,
+                    year=year,
+                    rent_collected=row.rent_collected,
+                    services_expenses=0,  # No longer used
+                    management_fee=row.service_charge,
+                    net_amount=row.net_amount,
+                    status="pending",
+                    payout_date=None,
+                    notes=row.notes,
+                )
+                for row in positive
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["owner", "property_node", "month", "year"],
+            update_fields=[
+                "rent_collected",
+                "services_expenses",
+                "management_fee",
+                "net_amount",
+                "status",
+                "payout_date",
+                "notes",
+                "updated_at",
+            ],
+        )
+
+        deleted = 0
+        if skipped:
+            skipped_keys = {(row.owner_id, row.property_node_id) for row in skipped}
+            stale_ids = [
+                payout_id
+                for payout_id, owner_id, node_id in Payout.objects.filter(
+                    month=month,
+                    year=year,
+                    net_amount__lte=0,
+                    property_node_id__in={node_id for _, node_id in skipped_keys},
+                ).values_list("id", "owner_id", "property_node_id")
+                if (owner_id, node_id) in skipped_keys
+            ]
+            deleted, _ = Payout.objects.filter(id__in=stale_ids).delete()
+
+    logger.info(
+        f"💰 Payouts {year}-{month:02d}: {len(positive)} upserted, "
+        f"{len(skipped)} skipped, {deleted} removed"
+    )
+    return {
+        "owners": len({row.owner_id for row in rows}),
+        "properties": len(rows),
+        "upserted": len(positive),
+        "skipped": len(skipped),
+    }
@@ -0,0 +1,160 @@
+"""
+Debounced payout recomputation.
+
+Writes that affect a payout (invoices, receipts, tenancies, ownerships,
+services) only mark ``(owner, property, month)`` keys dirty. Once the
+surrounding transaction commits the keys are added to a Redis set and a
+``recompute_dirty_payouts`` task is scheduled a little later; keys marked
+within that window share the run, which recomputes each owner's month once
+with the payout engine.
+
+``suspended()`` holds the keys back during bulk operations and flushes them
+when the block ends.
+"""
+
+import datetime
+import logging
+import threading
+
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Set, Tuple
+
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from payments.payouts.engine import recalculate_payouts
+from properties.models import PropertyOwner
+
+logger = logging.getLogger(__name__)
+
+# Writes within this window share one recompute
+PAYOUT_RECOMPUTE_DEBOUNCE = 30
+
+DIRTY_PAYOUTS_KEY = "payouts:dirty"
+_RECOMPUTE_PENDING_KEY = "payouts:recompute_pending"
+
+_pending = threading.local()
+
+
+def _pending_keys() -> Set[Tuple]:
+    if not hasattr(_pending, "keys"):
+        _pending.keys = set()
+    return _pending.keys
+
+
+def _is_suspended() -> bool:
+    return getattr(_pending, "suspended", 0) > 0
+
+
+def mark_dirty(owner_id, node_id, month=None, year=None):
+    """Queue an owner's payout for a property (default: this month)"""
+    if not owner_id or not node_id:
+        return
+    if month is None or year is None:
+        today = datetime.date.today()
+        month, year = today.month, today.year
+    _pending_keys().add((str(owner_id), str(node_id), int(month), int(year)))
+    if not _is_suspended():
+        transaction.on_commit(flush_dirty)
+
+
+def mark_nodes_dirty(node_ids: Iterable, month=None, year=None):
+    """Queue the payouts of every owner of the given nodes"""
+    node_ids = {node_id for node_id in node_ids if node_id}
+    if not node_ids:
+        return
+    for owner_id, node_id in PropertyOwner.objects.filter(
+        node_id__in=node_ids
+    ).values_list("owner_user_id", "node_id"):
+        mark_dirty(owner_id, node_id, month, year)
+
+
+@contextmanager
+def suspended():
+    """
+    Collect dirty payouts without scheduling a recompute inside the block;
+    they are flushed once when the outermost block ends
+    """
+    _pending.suspended = getattr(_pending, "suspended", 0) + 1
+    try:
+        yield
+    finally:
+        _pending.suspended -= 1
+        if not _is_suspended() and _pending_keys():
+            transaction.on_commit(flush_dirty)
+
+
+def flush_dirty():
+    """Hand the queued keys to Redis and schedule a debounced recompute"""
+    keys = _pending_keys()
+    if _is_suspended() or not keys:
+        return
+    queued = set(keys)
+    keys.clear()
+
+    try:
+        redis_client = get_redis_connection("default")
+        redis_client.sadd(
+            DIRTY_PAYOUTS_KEY, *[":".join(map(str, key)) for key in queued]
+        )
+        if redis_client.set(
+            _RECOMPUTE_PENDING_KEY, 1, nx=True, ex=PAYOUT_RECOMPUTE_DEBOUNCE * 6
+        ):
+            _enqueue_recompute()
+    except Exception as e:
+        # The periodic payout run still picks these up
+        logger.warning(f"⚠️ Could not queue {len(queued)} dirty payouts: {e}")
+
+
+def _enqueue_recompute():
+    from payments.tasks import recompute_dirty_payouts
+
+    recompute_dirty_payouts.apply_async(countdown=PAYOUT_RECOMPUTE_DEBOUNCE)
+
+
+def recompute_dirty_payouts() -> Dict:
+    """
+    Recompute every dirty payout, each owner's month once; keys are put back
+    if the recompute fails
+    """
+    redis_client = get_redis_connection("default")
+    # Keys marked from here on schedule a new run
+    redis_client.delete(_RECOMPUTE_PENDING_KEY)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.smembers(DIRTY_PAYOUTS_KEY)
+    pipe.delete(DIRTY_PAYOUTS_KEY)
+    members, _ = pipe.execute()
+
+    members = [
+        member.decode() if isinstance(member, bytes) else member for member in members
+    ]
+    owners_by_month = defaultdict(set)
+    for member in members:
+        owner_id, _, month, year = member.split(":")
+        owners_by_month[(int(month), int(year))].add(owner_id)
+
+    done = set()
+    try:
+        for (month, year), owner_ids in sorted(owners_by_month.items()):
+            recalculate_payouts(month, year, owner_ids=owner_ids)
+            done.add((month, year))
+    except Exception:
+        failed = [
+            member
+            for member in members
+            if tuple(int(part) for part in member.split(":")[2:]) not in done
+        ]
+        if failed:
+            redis_client.sadd(DIRTY_PAYOUTS_KEY, *failed)
+        raise
+
+    logger.info(
+        f"💰 Recomputed {len(members)} dirty payouts in "
+        f"{len(owners_by_month)} month(s)"
+    )
+    return {
+        "keys": len(members),
+        "owners": sum(len(owner_ids) for owner_ids in owners_by_month.values()),
+        "months": len(owners_by_month),
+    }
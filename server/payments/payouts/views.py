@@ -1,16 +1,10 @@
-import json
-
-# from utils.get_sassa_pay_token import token
 import os
 import uuid
 
 from datetime import datetime, timezone
 
-import requests
-
 from django.db.models import Sum
 from django.utils.dateparse import parse_date
-from requests.auth import HTTPBasicAuth
 from rest_framework import generics, status
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.response import Response
@@ -18,13 +12,14 @@ from rest_framework.decorators import api_view
 
 from payments.models import PayBill, PaymentDisparment, Payout
 from utils.currency import get_serialized_default_currency
-from utils.custom_pagination import CustomPageNumberPagination
+from utils.custom_pagination import KeysetPagination
 from utils.format import format_money_with_currency
 from utils.payments import pay_bills, payout_withdrawal
 from utils.redis_pubsub import (
     wait_for_payment_status,
     wait_for_payout_status_payout,
 )
+from utils.sasapay import get_access_token
 from utils.serilaizer import flatten_errors
 
 from .serializers import PayoutSerializer, PayoutStatusUpdateSerializer
@@ -32,7 +27,7 @@ from .serializers import PayoutSerializer, PayoutStatusUpdateSerializer
 
 class PayoutListView(generics.ListAPIView):
     serializer_class = PayoutSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = KeysetPagination
     queryset = Payout.objects.all().order_by("-created_at")
 
     def get_queryset(self):
@@ -69,19 +64,7 @@ class PayoutListView(generics.ListAPIView):
 
 
 def token():
-    url = "https://sandbox.sasapay.app/api/v1/auth/token/?grant_type=client_credentials"
-    params = {"grant_type": "client_credentials"}
-    res = requests.get(
-        url,
-        auth=HTTPBasicAuth(
-            "40tcB9ytloIYRTUbuG3LNdYT7TTCc7SYGIeU7T65",
-            "gvye9Sk6TnfCQiP7rqaXUQ9aaOohw6AySO0tBLTbybpDuuJrSQmU8dKxfpK9hEI6aTQGYX1scqAgyUWvvUgXBltSXjC7C4JimMDtX3vMzGiSXJZuoONwrsUoV5Va3dsD",
-        ),
-        params=params,
-    )
-    response = json.loads(res.text)
-    access_token = response["access_token"]
-    return access_token
+    return get_access_token()
 
 
 class PayoutStatusUpdateView(RetrieveUpdateAPIView):
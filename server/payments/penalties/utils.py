@@ -3,26 +3,14 @@ from django.db.models import Sum, Count
 from datetime import datetime, timedelta
 
 from payments.models import Penalty
+from payments.numbering import allocate_penalty_numbers
 from properties.models import PropertyTenant
 from utils.format import format_money_with_currency
 
 
 def generate_penalty_number():
     """Generate unique penalty number"""
-    year = timezone.now().year
-    last_penalty = (
-        Penalty.objects.filter(penalty_number__startswith=f"PEN-{year}-")
-        .order_by("-penalty_number")
-        .first()
-    )
-
-    if last_penalty:
-        last_number = int(last_penalty.penalty_number.split("-")[-1])
-        new_number = last_number + 1
-    else:
-        new_number = 1
-
-    return f"PEN-{year}-{str(new_number).zfill(3)}"
+    return allocate_penalty_numbers(1)[0]
 
 
 def calculate_penalty_amount(amount):
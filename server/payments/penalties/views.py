@@ -23,8 +23,10 @@ from rest_framework.views import APIView
 from accounts.models import Users
 from payments.models import Penalty
 from properties.models import PropertyTenant
-from utils.custom_pagination import CustomPageNumberPagination
+from utils.custom_pagination import KeysetPagination
+from utils.export import ExportMixin
 from utils.format import format_money_with_currency
+from utils.search import search_filter
 
 from .serializers import (
     PenaltyCreateSerializer,
@@ -73,12 +75,16 @@ class PenaltyFilter(django_filters.FilterSet):
 
     def filter_q(self, queryset, name, value):
         """General search filter"""
-        return queryset.filter(
-            Q(penalty_number__icontains=value)
-            | Q(property_tenant__tenant_user__first_name__icontains=value)
-            | Q(property_tenant__tenant_user__last_name__icontains=value)
-            | Q(property_tenant__tenant_user__email__icontains=value)
-            | Q(notes__icontains=value)
+        return search_filter(
+            queryset,
+            value,
+            [
+                "penalty_number",
+                "property_tenant__tenant_user__first_name",
+                "property_tenant__tenant_user__last_name",
+                "property_tenant__tenant_user__email",
+                "notes",
+            ],
         )
 
     def filter_tenant_name(self, queryset, name, value):
@@ -119,18 +125,18 @@ class PenaltyFilter(django_filters.FilterSet):
 
 @extend_schema(
     tags=["Penalties"],
-    description="List all penalties with filtering and pagination. Supports filtering by type, status, date ranges, tenant name, and property unit.",
+    description="List all penalties with filtering and pagination. Supports filtering by type, status, date ranges, tenant name, and property unit. Supports ?export=csv|xlsx with the same filters (add &background=true for a file in the media bucket). Pass ?cursor= (empty for the first page, then next_cursor) for keyset pagination on creation time.",
 )
 @method_decorator(
     ratelimit(key="ip", rate="20/m", method="GET", block=True),
     name="dispatch",
 )
-class PenaltyListView(ListAPIView):
+class PenaltyListView(ExportMixin, ListAPIView):
     """List penalties with filtering and pagination"""
 
     serializer_class = PenaltyListSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = PenaltyFilter
     ordering_fields = [
@@ -141,6 +147,7 @@ class PenaltyListView(ListAPIView):
         "penalty_number",
     ]
     ordering = ["-created_at"]
+    export_filename = "penalties"
 
     def get_queryset(self):
         """Get penalties queryset with related data"""
@@ -156,6 +163,9 @@ class PenaltyListView(ListAPIView):
 
     def list(self, request, *args, **kwargs):
         """List penalties"""
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         try:
             queryset = self.filter_queryset(self.get_queryset())
             page = self.paginate_queryset(queryset)
@@ -0,0 +1,390 @@
+"""
+Batch reconciliation of gateway transactions against open invoices.
+
+Every unverified ``InstantPaymentNotification`` is matched and allocated in
+one pass over in-memory indexes:
+
+- invoice references (``INV-2025-042``) in the bill reference or invoice
+  number field point at the invoice itself, which is paid first;
+- otherwise the bill reference is matched against unit/house names
+  (case, spaces and punctuation ignored);
+- the amount then pays the node's open invoices oldest first, like
+  ``UpdateBillsFromTransactionView`` does for a single transaction.
+
+Receipts are inserted with one ``bulk_create`` and invoices updated with one
+``bulk_update``. Transactions that cannot be (fully) applied are returned as
+exceptions for the finance team instead of failing the run.
+"""
+
+import logging
+import re
+
+from collections import defaultdict, deque
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.metrics import schedule_refresh
+from payments import financial_facts
+from payments.models import InstantPaymentNotification, Invoice, Receipt
+from payments.numbering import receipt_numbers
+from payments.payouts import recompute as payout_recompute
+from properties.models import LocationNode
+
+logger = logging.getLogger(__name__)
+
+OPEN_INVOICE_STATUSES = ["ISSUED", "PARTIAL"]
+MATCHABLE_NODE_TYPES = ["UNIT", "HOUSE"]
+RECEIPT_NOTE_PREFIX = "Payment from transaction "
+
+PAYMENT_METHOD_CODES = {
+    "mpesa": "63902",
+    "m-pesa": "63902",
+    "airtel_money": "63903",
+    "t_kash": "63907",
+    "bank_transfer": "01",
+    "cash": "00",
+    "online": "00",
+}
+
+# INV-2025-042, INV-25-0042 and INV-2503-0042 as printed on invoices/receipts
+_INVOICE_REFERENCE = re.compile(r"INV-?\d{2,4}-(\d+)", re.IGNORECASE)
+
+
+def normalize_reference(value):
+    return re.sub(r"[^A-Z0-9]", "", str(value or "").upper())
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+
+def invoice_reference_number(*values):
+    for value in values:
+        match = _INVOICE_REFERENCE.search(str(value or ""))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _exception(notification, reason, message, **extra):
+    return {
+        "transaction_id": str(notification.id),
+        "trans_id": notification.trans_id,
+        "amount": notification.trans_amount,
+        "reference": notification.bill_ref_number,
+        "reason": reason,
+        "message": message,
+        **extra,
+    }
+
+
+def _node_index():
+    """Normalized unit/house name -> node id, and the names used by several"""
+    index = {}
+    ambiguous = set()
+    for node_id, name in LocationNode.objects.filter(
+        node_type__in=MATCHABLE_NODE_TYPES, is_deleted=False
+    ).values_list("id", "name"):
+        key = normalize_reference(name)
+        if not key:
+            continue
+        if key in index and index[key] != node_id:
+            ambiguous.add(key)
+        index[key] = node_id
+    return index, ambiguous
+
+
+def _already_applied(notifications):
+    """
+    Transaction references that already have a receipt, e.g. from
+    ``UpdateBillsFromTransactionView``; its notes carry the transaction id
+    """
+    if not notifications:
+        return set()
+    earliest = min(notification.created_at for notification in notifications)
+    notes = Receipt.objects.filter(
+        notes__startswith=RECEIPT_NOTE_PREFIX, created_at__gte=earliest
+    ).values_list("notes", flat=True)
+    return {
+        note[len(RECEIPT_NOTE_PREFIX) :].split(" ", 1)[0]
+        for note in notes
+        if len(note) > len(RECEIPT_NOTE_PREFIX)
+    }
+
+
+def reconcile_transactions(transaction_ids=None, dry_run=False, user=None):
+    """
+    Match and allocate unverified transactions (all of them, or the given
+    ``InstantPaymentNotification`` ids).
+
+    Returns the reconciliation report: totals, one entry per matched
+    transaction with its allocations, and the exceptions list. With
+    ``dry_run`` nothing is written.
+    """
+    with transaction.atomic():
+        notifications = InstantPaymentNotification.objects.filter(is_verified=False)
+        if transaction_ids is not None:
+            notifications = notifications.filter(id__in=transaction_ids)
+        # A concurrent run skips the rows this one is reconciling
+        notifications = list(
+            notifications.select_for_update(skip_locked=True).order_by(
+                "created_at", "id"
+            )
+        )
+
+        report, plans, verified = _allocate(notifications)
+        if not dry_run:
+            _write(plans, verified, user)
+
+    report["dry_run"] = dry_run
+    logger.info(
+        f"🧾 Reconciled {report['matched']} of {report['transactions']} "
+        f"transactions, {len(report['exceptions'])} exceptions"
+        f"{' (dry run)' if dry_run else ''}"
+    )
+    return report
+
+
+def _resolve(notifications):
+    """
+    Match each transaction to ``(notification, amount, node_id, invoice_id)``;
+    ``invoice_id`` is set when the reference names an open invoice
+    """
+    node_index, ambiguous = _node_index()
+    applied_before = _already_applied(notifications)
+
+    references = {
+        notification.id: invoice_reference_number(
+            notification.bill_ref_number, notification.invoice_number
+        )
+        for notification in notifications
+    }
+    referenced = {
+        number: (invoice_id, node_id)
+        for invoice_id, number, node_id in Invoice.objects.filter(
+            invoice_number__in={number for number in references.values() if number},
+            status__in=OPEN_INVOICE_STATUSES,
+            is_deleted=False,
+            property__isnull=False,
+        ).values_list("id", "invoice_number", "property_id")
+    }
+
+    resolved, exceptions, settled = [], [], []
+    for notification in notifications:
+        if {notification.trans_id, str(notification.id)} & applied_before:
+            settled.append(notification)
+            exceptions.append(
+                _exception(
+                    notification,
+                    "already_applied",
+                    "A receipt for this transaction already exists",
+                )
+            )
+            continue
+
+        amount = parse_amount(notification.trans_amount)
+        if amount is None:
+            exceptions.append(
+                _exception(notification, "invalid_amount", "Amount is not valid")
+            )
+            continue
+
+        if references[notification.id] in referenced:
+            invoice_id, node_id = referenced[references[notification.id]]
+            resolved.append((notification, amount, node_id, invoice_id))
+            continue
+
+        key = normalize_reference(notification.bill_ref_number)
+        if key in ambiguous:
+            exceptions.append(
+                _exception(
+                    notification,
+                    "ambiguous_reference",
+                    f"Several units are named {notification.bill_ref_number}",
+                )
+            )
+        elif key in node_index:
+            resolved.append((notification, amount, node_index[key], None))
+        else:
+            exceptions.append(
+                _exception(
+                    notification,
+                    "no_match",
+                    f"No unit or invoice matches {notification.bill_ref_number!r}",
+                )
+            )
+    return resolved, exceptions, settled
+
+
+def _open_invoice_queues(node_ids):
+    """Node id -> its open invoices, oldest first; the invoices are locked"""
+    queues = defaultdict(deque)
+    for invoice in (
+        Invoice.objects.select_for_update(of=("self",))
+        .filter(
+            property_id__in=node_ids,
+            status__in=OPEN_INVOICE_STATUSES,
+            is_deleted=False,
+        )
+        .select_related("property")
+        .order_by("created_at", "id")
+    ):
+        queues[invoice.property_id].append(invoice)
+    return queues
+
+
+def _allocate(notifications):
+    """
+    Allocate the transactions in memory; returns the report, the planned
+    ``(notification, allocations)`` and the ``(notification, invoice)`` pairs
+    to mark verified
+    """
+    resolved, exceptions, settled = _resolve(notifications)
+    queues = _open_invoice_queues({node_id for _, _, node_id, _ in resolved})
+    verified = [(notification, None) for notification in settled]
+
+    plans, matches = [], []
+    total_applied = Decimal("0")
+    total_unallocated = Decimal("0")
+    for notification, amount, node_id, invoice_id in resolved:
+        queue = queues[node_id]
+        if invoice_id is not None:
+            target = next((inv for inv in queue if inv.id == invoice_id), None)
+            if target is not None:
+                # The referenced invoice is paid before the older ones
+                queue.remove(target)
+                queue.appendleft(target)
+
+        remaining = amount
+        allocations = []
+        while remaining > 0 and queue:
+            invoice = queue[0]
+            open_amount = (
+                invoice.balance if invoice.balance > 0 else invoice.total_amount
+            )
+            applied = min(remaining, open_amount)
+            invoice.balance = open_amount - applied
+            invoice.status = "PAID" if invoice.balance <= 0 else "PARTIAL"
+            if invoice.balance <= 0:
+                queue.popleft()
+            remaining -= applied
+            allocations.append((invoice, applied, invoice.balance, invoice.status))
+
+        if not allocations:
+            exceptions.append(
+                _exception(
+                    notification,
+                    "no_open_invoices",
+                    "The matched unit has no unpaid invoices",
+                    node_id=str(node_id),
+                )
+            )
+            continue
+
+        plans.append((notification, allocations))
+        verified.append((notification, allocations[0][0]))
+        total_applied += amount - remaining
+        total_unallocated += remaining
+        matches.append(
+            {
+                "transaction_id": str(notification.id),
+                "trans_id": notification.trans_id,
+                "node_id": str(node_id),
+                "node_name": allocations[0][0].property.name,
+                "amount": str(amount),
+                "applied": str(amount - remaining),
+                "remaining": str(remaining),
+                "allocations": [
+                    {
+                        "invoice_id": str(invoice.id),
+                        "invoice_number": invoice.invoice_number,
+                        "amount_applied": str(applied),
+                        "new_balance": str(balance),
+                        "status": status,
+                    }
+                    for invoice, applied, balance, status in allocations
+                ],
+            }
+        )
+        if remaining > 0:
+            exceptions.append(
+                _exception(
+                    notification,
+                    "overpayment",
+                    f"{remaining} left after paying all open invoices",
+                    node_id=str(node_id),
+                    remaining=str(remaining),
+                )
+            )
+
+    report = {
+        "transactions": len(notifications),
+        "matched": len(matches),
+        "receipts": sum(len(allocations) for _, allocations in plans),
+        "amount_applied": str(total_applied),
+        "amount_unallocated": str(total_unallocated),
+        "matches": matches,
+        "exceptions": exceptions,
+    }
+    return report, plans, verified
+
+
+def _write(plans, verified, user):
+    now = timezone.now()
+
+    receipts = []
+    touched = {}
+    for notification, allocations in plans:
+        payment_method = PAYMENT_METHOD_CODES.get(
+            (notification.payment_method or "").lower(), "00"
+        )
+        for invoice, applied, balance, _ in allocations:
+            receipts.append(
+                Receipt(
+                    invoice=invoice,
+                    paid_amount=applied,
+                    balance=balance,
+                    payment_method=payment_method,
+                    notes=(
+                        f"{RECEIPT_NOTE_PREFIX}{notification.trans_id} "
+                        f"for apartment {invoice.property.name}"
+                    ),
+                )
+            )
+            touched[invoice.id] = invoice
+
+    for receipt, number in zip(receipts, receipt_numbers.allocate(len(receipts))):
+        receipt.receipt_number = number
+    Receipt.objects.bulk_create(receipts, batch_size=1000)
+
+    for invoice in touched.values():
+        invoice.updated_at = now
+    Invoice.objects.bulk_update(
+        list(touched.values()), ["balance", "status", "updated_at"], batch_size=1000
+    )
+
+    for notification, invoice in verified:
+        notification.is_verified = True
+        notification.verified_by = user
+        notification.verified_for_invoice = invoice
+        notification.updated_at = now
+    InstantPaymentNotification.objects.bulk_update(
+        [notification for notification, _ in verified],
+        ["is_verified", "verified_by", "verified_for_invoice", "updated_at"],
+        batch_size=1000,
+    )
+
+    # bulk_create/bulk_update send no signals
+    for invoice in touched.values():
+        financial_facts.mark_dirty(invoice.property_id, invoice.issue_date)
+    payout_recompute.mark_nodes_dirty(
+        invoice.property_id for invoice in touched.values()
+    )
+    if touched:
+        schedule_refresh()
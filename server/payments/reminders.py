@@ -0,0 +1,132 @@
+"""
+Invoice reminder selection.
+
+All unpaid invoices that are due soon, due ``after_due_days`` ago or past due
+are loaded with one query that aggregates their tenant and owner recipients.
+The reminder type is decided in memory and the reminders go to the outbound
+mail queue keyed by (invoice, user, type, day), so a rerun on the same day
+queues nothing twice.
+"""
+
+import datetime
+import logging
+
+from typing import Dict, List, Optional, Tuple
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from accounts.models import Users
+from notifications.outbox import queue_reminder_emails
+from payments.models import Invoice
+
+logger = logging.getLogger(__name__)
+
+REMINDER_INVOICE_STATUSES = ["ISSUED", "PARTIAL", "OVERDUE"]
+
+
+def reminder_candidates(today, upcoming_date, outstanding_date):
+    """
+    Unpaid invoices needing a reminder, each annotated with the ids of its
+    tenant and owner users
+    """
+    return (
+        Invoice.objects.filter(
+            Q(due_date=upcoming_date)
+            | Q(due_date=outstanding_date)
+            | Q(due_date__lt=today),
+            status__in=REMINDER_INVOICE_STATUSES,
+            balance__gt=0,
+        )
+        .annotate(
+            tenant_user_ids=ArrayAgg(
+                "tenants__tenant_user_id",
+                distinct=True,
+                filter=Q(tenants__tenant_user__isnull=False),
+                default=Value([]),
+            ),
+            owner_user_ids=ArrayAgg(
+                "owners__owner_user_id",
+                distinct=True,
+                filter=Q(owners__owner_user__isnull=False),
+                default=Value([]),
+            ),
+        )
+        .only("id", "invoice_number", "due_date", "status", "balance")
+        .order_by("due_date", "id")
+    )
+
+
+def reminder_type(due_date, today, upcoming_date, outstanding_date) -> Optional[str]:
+    if due_date < today:
+        return "overdue"
+    if due_date == upcoming_date:
+        return "upcoming"
+    if due_date == outstanding_date:
+        return "outstanding"
+    return None
+
+
+def plan_reminders(
+    before_due_days: int, after_due_days: int, today: Optional[datetime.date] = None
+) -> Tuple[List, Dict]:
+    """
+    Return the ``(invoice, user, reminder_type)`` triples to send and the
+    selection counts
+    """
+    today = today or timezone.now().date()
+    upcoming_date = today + datetime.timedelta(days=before_due_days)
+    outstanding_date = today - datetime.timedelta(days=after_due_days)
+
+    invoices = list(reminder_candidates(today, upcoming_date, outstanding_date))
+
+    # Tenants are reminded of their invoices, owners only of invoices
+    # without tenants, as before
+    recipient_ids = {
+        invoice.id: invoice.tenant_user_ids or invoice.owner_user_ids
+        for invoice in invoices
+    }
+    users = Users.objects.only("id", "email").in_bulk(
+        {user_id for user_ids in recipient_ids.values() for user_id in user_ids}
+    )
+
+    stats = {
+        "total_found": len(invoices),
+        "tenant_reminders": sum(1 for invoice in invoices if invoice.tenant_user_ids),
+        "owner_reminders": sum(
+            1
+            for invoice in invoices
+            if invoice.owner_user_ids and not invoice.tenant_user_ids
+        ),
+        "skipped": 0,
+    }
+    reminders = []
+    for invoice in invoices:
+        kind = reminder_type(invoice.due_date, today, upcoming_date, outstanding_date)
+        for user_id in recipient_ids[invoice.id]:
+            user = users.get(user_id)
+            if kind is None or user is None or not user.email:
+                stats["skipped"] += 1
+                continue
+            reminders.append((invoice, user, kind))
+    return reminders, stats
+
+
+def send_reminders(
+    before_due_days: int, after_due_days: int, today: Optional[datetime.date] = None
+) -> Dict:
+    """Queue today's reminders on the outbound mail queue"""
+    today = today or timezone.now().date()
+    reminders, stats = plan_reminders(before_due_days, after_due_days, today)
+
+    queued = queue_reminder_emails(reminders, day=today) if reminders else []
+
+    stats["sent"] = len(queued)
+    stats["already_sent"] = len(reminders) - len(queued)
+    logger.info(
+        f"📧 Reminders for {today}: {stats['total_found']} invoices, "
+        f"{stats['sent']} queued, {stats['already_sent']} already sent, "
+        f"{stats['skipped']} skipped"
+    )
+    return stats
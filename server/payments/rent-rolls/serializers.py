@@ -2,6 +2,7 @@ from rest_framework import serializers
 from decimal import Decimal
 
 from .utils import (
+    filter_rent_roll_rows,
     get_rent_roll_summary_stats,
     get_rent_roll_units_data,
     calculate_unit_status,
@@ -116,20 +117,6 @@ def serialize_rent_roll_data(company_id: str, filters: dict = None) -> dict:
     units_data = get_rent_roll_units_data(company_id, filters)
 
     # Apply filters if provided
-    if filters:
-        if filters.get("status"):
-            units_data = [
-                unit for unit in units_data if unit["status"] == filters["status"]
-            ]
-
-        if filters.get("search"):
-            search_term = filters["search"].lower()
-            units_data = [
-                unit
-                for unit in units_data
-                if search_term in unit["property"].lower()
-                or search_term in unit["tenantName"].lower()
-                or search_term in unit["projectName"].lower()
-            ]
+    units_data = list(filter_rent_roll_rows(units_data, filters))
 
     return {"count": len(units_data), "results": units_data, "summary": summary_stats}
@@ -1,14 +1,16 @@
+from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, Tuple
 
-from django.db.models import Sum, Q
+from django.db.models import F, Sum, Q
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
 from properties.models import LocationNode, UnitDetail, PropertyTenant
-from payments.models import Invoice, Receipt
+from payments.models import Invoice, InvoiceItem, Receipt
 from accounts.models import Users
+from utils.currency import get_serialized_default_currency
 from utils.format import format_money_with_currency
 
 
@@ -217,6 +219,59 @@ def get_last_payment_info(invoices: list) -> Tuple[Optional[datetime], Decimal]:
     return latest_receipt.payment_date, latest_receipt.paid_amount
 
 
+ISSUED_INVOICE_STATUSES = ["ISSUED", "PAID", "OVERDUE", "PARTIAL"]
+
+# Units/houses assembled per round of queries by the rent roll engine
+RENT_ROLL_BATCH_SIZE = 500
+
+RENT_ITEM_TYPES = {"RENT", "DEPOSIT", "DEPOSIT_REFUND"}
+PENALTY_ITEM_TYPES = {"LATE_FEE", "PENALTY"}
+
+
+def _full_management_nodes():
+    """Units and houses under FULL_MANAGEMENT, in tree order"""
+    return (
+        LocationNode.objects.filter(node_type__in=["HOUSE", "UNIT"])
+        .filter(
+            Q(unit_detail__management_mode="FULL_MANAGEMENT")
+            | Q(villa_detail__management_mode="FULL_MANAGEMENT")
+        )
+        .order_by("tree_id", "lft")
+    )
+
+
+def _issued_invoices(date_from=None, date_to=None):
+    invoices = Invoice.objects.filter(status__in=ISSUED_INVOICE_STATUSES)
+    if date_from:
+        invoices = invoices.filter(issue_date__gte=date_from)
+    if date_to:
+        invoices = invoices.filter(issue_date__lte=date_to)
+    return invoices
+
+
+def _first_tenant_by_node(tenants):
+    """First tenant (by id, like ``.first()``) of each node, one DISTINCT ON query"""
+    return {
+        tenant.node_id: tenant
+        for tenant in tenants.order_by("node_id", "id").distinct("node_id")
+    }
+
+
+def encode_rent_roll_cursor(node) -> str:
+    return f"{node.tree_id}:{node.lft}"
+
+
+def decode_rent_roll_cursor(cursor: Optional[str]) -> Optional[Q]:
+    """Keyset condition selecting nodes after ``cursor`` in (tree_id, lft) order"""
+    if not cursor:
+        return None
+    try:
+        tree_id, lft = (int(part) for part in cursor.split(":", 1))
+    except ValueError:
+        raise ValueError(f"Invalid rent roll cursor: {cursor}")
+    return Q(tree_id__gt=tree_id) | Q(tree_id=tree_id, lft__gt=lft)
+
+
 def get_rent_roll_summary_stats(company_id: str, filters: dict = None) -> dict:
     """
     Calculate summary statistics for rent roll.
@@ -231,8 +286,7 @@ def get_rent_roll_summary_stats(company_id: str, filters: dict = None) -> dict:
         Dictionary with summary statistics
     """
     current_date = timezone.now().date()
-    current_month = current_date.month
-    current_year = current_date.year
+    currency = get_serialized_default_currency()
 
     # Parse date filters
     date_from = None
@@ -241,111 +295,78 @@ def get_rent_roll_summary_stats(company_id: str, filters: dict = None) -> dict:
         date_from = filters.get("date_from")
         date_to = filters.get("date_to")
 
-    # Get all units and houses with FULL_MANAGEMENT service type
-    # Use the same query as get_rent_roll_units_data
-    company_properties = (
-        LocationNode.objects.filter(node_type__in=["HOUSE", "UNIT"])
-        .filter(
-            Q(unit_detail__management_mode="FULL_MANAGEMENT")
-            | Q(villa_detail__management_mode="FULL_MANAGEMENT")
-        )
-        .select_related("unit_detail", "villa_detail")
+    # Properties count when they have issued invoices in the date range
+    valid_invoices = _issued_invoices(date_from, date_to).filter(
+        property__in=_full_management_nodes().values("id")
     )
+    valid_ids = set(valid_invoices.values_list("property_id", flat=True).distinct())
 
-    # Filter out properties without proper details (same as list logic)
-    valid_properties = []
-    occupied_count = 0
-    total_expected = Decimal("0.00")  # Total expected (rent + services + penalties)
-    rent_expected = Decimal("0.00")  # Rent expected only
-
-    for property_node in company_properties:
-        unit_detail = getattr(property_node, "unit_detail", None)
-        villa_detail = getattr(property_node, "villa_detail", None)
-
-        # Skip properties without proper details (same as list logic)
-        if not unit_detail and not villa_detail:
-            continue
-
-        # Check for active tenant
-        property_tenant = PropertyTenant.objects.filter(
-            node=property_node,
+    # Active tenant per valid property
+    active_tenants = _first_tenant_by_node(
+        PropertyTenant.objects.filter(
+            node_id__in=valid_ids,
             contract_end__gte=current_date,
             contract_start__lte=current_date,
-        ).first()
+        ).only("id", "node", "rent_amount")
+    )
+    occupied_count = len(active_tenants)
+    rent_expected = sum(
+        (tenant.rent_amount for tenant in active_tenants.values()), Decimal("0.00")
+    )
 
-        # Check if this property has issued invoices
-        invoice_filter = {
-            "property": property_node,
-            "status__in": ["ISSUED", "PAID", "OVERDUE", "PARTIAL"],
+    # Expected and collected amounts use the date range, or the current month
+    if date_from and date_to:
+        period = {"issue_date__gte": date_from, "issue_date__lte": date_to}
+    else:
+        period = {
+            "issue_date__month": current_date.month,
+            "issue_date__year": current_date.year,
         }
 
-        # Apply date range filter if provided
-        if date_from:
-            invoice_filter["issue_date__gte"] = date_from
-        if date_to:
-            invoice_filter["issue_date__lte"] = date_to
-
-        has_issued_invoices = Invoice.objects.filter(**invoice_filter).exists()
-
-        if has_issued_invoices:
-            valid_properties.append(property_node)
-
-            if property_tenant:
-                occupied_count += 1
-                # Use contract rent amount for rent expected
-                rent_expected += property_tenant.rent_amount
-
-                # Calculate total expected from invoices in date range
-                if date_from and date_to:
-                    # Use date range
-                    current_month_invoices = Invoice.objects.filter(
-                        property=property_node,
-                        status__in=["ISSUED", "PAID", "OVERDUE", "PARTIAL"],
-                        issue_date__gte=date_from,
-                        issue_date__lte=date_to,
-                    )
-                else:
-                    # Use current month
-                    current_month_invoices = Invoice.objects.filter(
-                        property=property_node,
-                        status__in=["ISSUED", "PAID", "OVERDUE", "PARTIAL"],
-                        issue_date__month=current_month,
-                        issue_date__year=current_year,
-                    )
-
-                for invoice in current_month_invoices:
-                    total_expected += invoice.total_amount
-
-    total_properties = len(valid_properties)
-    vacant_properties = total_properties - occupied_count
+    total_expected = Invoice.objects.filter(
+        property_id__in=list(active_tenants),
+        status__in=ISSUED_INVOICE_STATUSES,
+        **period,
+    ).aggregate(total=Sum("total_amount"))["total"] or Decimal("0.00")
 
     # Calculate collected amount from all invoice types (not just rent)
-    receipt_filter = {
-        "invoice__property__in": valid_properties,
-    }
+    collected = Receipt.objects.filter(
+        invoice__property_id__in=valid_ids,
+        **{f"invoice__{key}": value for key, value in period.items()},
+    ).aggregate(total=Sum("paid_amount"))["total"] or Decimal("0.00")
 
-    # Apply date range filter to receipts
-    if date_from and date_to:
-        receipt_filter["invoice__issue_date__gte"] = date_from
-        receipt_filter["invoice__issue_date__lte"] = date_to
-    else:
-        receipt_filter["invoice__issue_date__month"] = current_month
-        receipt_filter["invoice__issue_date__year"] = current_year
-
-    collected = Receipt.objects.filter(**receipt_filter).aggregate(
-        total=Sum("paid_amount")
-    )["total"] or Decimal("0.00")
+    total_properties = len(valid_ids)
 
     return {
         "total_properties": total_properties,
         "occupied_properties": occupied_count,
-        "vacant_properties": vacant_properties,
-        "rent_expected": format_money_with_currency(rent_expected),
-        "total_expected": format_money_with_currency(total_expected),
-        "collected": format_money_with_currency(collected),
+        "vacant_properties": total_properties - occupied_count,
+        "rent_expected": format_money_with_currency(rent_expected, currency),
+        "total_expected": format_money_with_currency(total_expected, currency),
+        "collected": format_money_with_currency(collected, currency),
     }
 
 
+def filter_rent_roll_rows(rows, filters: dict = None):
+    """Apply the status and search filters to rent roll rows"""
+    if not filters:
+        return rows
+
+    if filters.get("status"):
+        rows = (row for row in rows if row["status"] == filters["status"])
+
+    if filters.get("search"):
+        search_term = filters["search"].lower()
+        rows = (
+            row
+            for row in rows
+            if search_term in row["property"].lower()
+            or search_term in row["tenantName"].lower()
+            or search_term in row["projectName"].lower()
+        )
+    return rows
+
+
 def get_rent_roll_units_data(company_id: str, filters: dict = None) -> list:
     """
     Get rent roll data for all properties (units/houses) with calculations.
@@ -358,7 +379,55 @@ def get_rent_roll_units_data(company_id: str, filters: dict = None) -> list:
     Returns:
         List of rent roll property data
     """
+    return list(iter_rent_roll_units(company_id, filters))
+
+
+def get_rent_roll_page(
+    company_id: str,
+    filters: dict = None,
+    cursor: Optional[str] = None,
+    page_size: int = 20,
+) -> Tuple[list, Optional[str]]:
+    """
+    Keyset page of rent roll rows after ``cursor``, with status/search applied.
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    rows = []
+    for row in filter_rent_roll_rows(
+        iter_rent_roll_units(company_id, filters, cursor=cursor, with_cursor=True),
+        filters,
+    ):
+        rows.append(row)
+        if len(rows) > page_size:
+            break
+
+    next_cursor = rows[page_size - 1]["cursor"] if len(rows) > page_size else None
+    rows = rows[:page_size]
+    for row in rows:
+        row.pop("cursor", None)
+    return rows, next_cursor
+
+
+def iter_rent_roll_units(
+    company_id: str,
+    filters: dict = None,
+    cursor: Optional[str] = None,
+    batch_size: int = RENT_ROLL_BATCH_SIZE,
+    with_cursor: bool = False,
+):
+    """
+    Yield rent roll rows in (tree_id, lft) order.
+
+    Properties are loaded ``batch_size`` at a time; each batch costs a fixed
+    handful of queries (properties, tenants, current invoices, late flags,
+    receipt totals, last receipts, invoice items, ancestors) regardless of how
+    many units or invoices it covers. Only the status/search filters are left
+    to the caller (see ``filter_rent_roll_rows``).
+    """
     current_date = timezone.now().date()
+    currency = get_serialized_default_currency()
 
     # Parse date filters
     date_from = None
@@ -367,204 +436,300 @@ def get_rent_roll_units_data(company_id: str, filters: dict = None) -> list:
         date_from = filters.get("date_from")
         date_to = filters.get("date_to")
 
-    # Get all units and houses with FULL_MANAGEMENT service type
-    company_properties = (
-        LocationNode.objects.filter(node_type__in=["HOUSE", "UNIT"])
-        .filter(
-            Q(unit_detail__management_mode="FULL_MANAGEMENT")
-            | Q(villa_detail__management_mode="FULL_MANAGEMENT")
+    nodes = _full_management_nodes().select_related("unit_detail", "villa_detail")
+    after = decode_rent_roll_cursor(cursor)
+    ancestors_by_tree = {}
+
+    while True:
+        batch_nodes = nodes.filter(after) if after is not None else nodes
+        batch = list(batch_nodes[:batch_size])
+        if not batch:
+            return
+
+        rows = _build_rent_roll_batch(
+            batch, date_from, date_to, current_date, currency, ancestors_by_tree
         )
-        .select_related("unit_detail", "villa_detail")
+        for node, row in rows:
+            if with_cursor:
+                row["cursor"] = encode_rent_roll_cursor(node)
+            yield row
+
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        after = decode_rent_roll_cursor(encode_rent_roll_cursor(last))
+
+
+def _build_rent_roll_batch(
+    nodes, date_from, date_to, current_date, currency, ancestors_by_tree
+):
+    node_ids = [node.id for node in nodes]
+    invoices = _issued_invoices(date_from, date_to).filter(property_id__in=node_ids)
+    invoice_fields = (
+        "id",
+        "property_id",
+        "invoice_number",
+        "issue_date",
+        "due_date",
+        "status",
+        "balance",
+        "total_amount",
     )
 
-    rent_roll_data = []
-
-    for property_node in company_properties:
-        # Get property detail (unit or villa)
-        unit_detail = getattr(property_node, "unit_detail", None)
-        villa_detail = getattr(property_node, "villa_detail", None)
+    def latest_invoice_by_node(queryset):
+        return {
+            invoice.property_id: invoice
+            for invoice in queryset.only(*invoice_fields)
+            .order_by("property_id", "-issue_date")
+            .distinct("property_id")
+        }
 
-        # Skip properties without proper details
-        if not unit_detail and not villa_detail:
-            print(
-                f"Skipping property {property_node.id} - no unit or villa detail found"
-            )
-            continue
+    # Invoice shown on the row: latest in the date range, or this month's
+    this_month = invoices.filter(
+        issue_date__month=current_date.month, issue_date__year=current_date.year
+    )
+    month_invoices = latest_invoice_by_node(this_month)
+    if date_from and date_to:
+        row_invoices = latest_invoice_by_node(invoices)
+    else:
+        row_invoices = month_invoices
+    if not row_invoices:
+        return []
 
-            # Determine property type and identifier
-        property_type = property_node.node_type
+    late_node_ids = set(
+        invoices.filter(due_date__lt=current_date, status__in=["ISSUED", "OVERDUE"])
+        .values_list("property_id", flat=True)
+        .distinct()
+    )
 
-        # Use unique ID-based identifier to avoid duplicates
-        if unit_detail:
-            property_identifier = f"{unit_detail.identifier}-{property_node.id}"
-        elif villa_detail:
-            property_identifier = f"{villa_detail.name}-{property_node.id}"
-        else:
-            property_identifier = f"{property_node.name}-{property_node.id}"
-
-        # Get current tenant assignment
-        property_tenant = (
-            PropertyTenant.objects.filter(
-                node=property_node,
-                # contract_end__gte=current_date,
-                # contract_start__lte=current_date,
-            )
-            .select_related("tenant_user")
-            .first()
+    receipts = Receipt.objects.filter(invoice__in=invoices)
+    paid_by_node = {
+        entry["invoice__property_id"]: entry["total"]
+        for entry in receipts.values("invoice__property_id").annotate(
+            total=Sum("paid_amount")
         )
+    }
+    last_receipt_by_node = {
+        entry["invoice__property_id"]: entry
+        for entry in receipts.order_by("invoice__property_id", "-payment_date")
+        .distinct("invoice__property_id")
+        .values("invoice__property_id", "payment_date", "paid_amount")
+    }
 
-        # Get invoices for this property - only issued invoices (not draft)
-        invoice_filter = {
-            "property": property_node,
-            "status__in": ["ISSUED", "PAID", "OVERDUE", "PARTIAL"],
+    breakdown_by_invoice = defaultdict(
+        lambda: {
+            "rent": Decimal("0.00"),
+            "services": Decimal("0.00"),
+            "penalties": Decimal("0.00"),
         }
+    )
+    for invoice_id, item_type, price in InvoiceItem.objects.filter(
+        invoice_id__in=[invoice.id for invoice in row_invoices.values()]
+    ).values_list("invoice_id", "type", "price"):
+        item_type = item_type.upper()
+        if item_type in RENT_ITEM_TYPES:
+            bucket = "rent"
+        elif item_type in PENALTY_ITEM_TYPES:
+            bucket = "penalties"
+        else:
+            # Services, utilities, fees and any unknown types
+            bucket = "services"
+        breakdown_by_invoice[invoice_id][bucket] += price
+
+    tenants = _first_tenant_by_node(
+        PropertyTenant.objects.filter(
+            node_id__in=[node.id for node in nodes if node.id in row_invoices]
+        ).select_related("tenant_user")
+    )
 
-        # Apply date range filter if provided
-        if date_from:
-            invoice_filter["issue_date__gte"] = date_from
-        if date_to:
-            invoice_filter["issue_date__lte"] = date_to
-
-        invoices = Invoice.objects.filter(**invoice_filter).order_by("-issue_date")
+    paths = _hierarchy_paths(
+        [node for node in nodes if node.id in row_invoices], ancestors_by_tree
+    )
 
-        # Skip units that don't have any issued invoices
-        if not invoices.exists():
-            print(f"Skipping property {property_identifier} - no issued invoices found")
+    rows = []
+    for node in nodes:
+        current_month_invoice = row_invoices.get(node.id)
+        if not current_month_invoice:
+            # No issued invoice in the range / current month
             continue
 
-        # Get current month invoice (or use date range if specified)
-        if date_from and date_to:
-            # Use the first invoice from the filtered invoices (by due_date)
-            current_month_invoice = invoices.first()
+        unit_detail = getattr(node, "unit_detail", None)
+        villa_detail = getattr(node, "villa_detail", None)
+
+        # Use unique ID-based identifier to avoid duplicates
+        if unit_detail:
+            property_identifier = f"{unit_detail.identifier}-{node.id}"
+        elif villa_detail:
+            property_identifier = f"{villa_detail.name}-{node.id}"
         else:
-            # Use current month
-            current_month_invoice = next(
-                (
-                    inv
-                    for inv in invoices
-                    if inv.issue_date.month == current_date.month
-                    and inv.issue_date.year == current_date.year
-                ),
-                None,
-            )
+            property_identifier = f"{node.name}-{node.id}"
+
+        property_tenant = tenants.get(node.id)
+
+        # Same rules as calculate_unit_status
+        month_invoice = month_invoices.get(node.id)
+        if not property_tenant:
+            status = "vacant"
+        elif node.id in late_node_ids:
+            status = "late"
+        elif not month_invoice:
+            status = "unpaid"
+        elif month_invoice.status == "PAID":
+            status = "paid"
+        elif month_invoice.balance > 0:
+            status = "partial"
+        else:
+            status = "unpaid"
 
-        # If no current month invoice, skip this unit
-        if not current_month_invoice:
-            print(f"Skipping property {property_identifier} - no current month invoice")
-            continue
+        # Receipts of every issued invoice of the property count as paid
+        total_paid = paid_by_node.get(node.id) or Decimal("0.00")
+        total_amount = current_month_invoice.total_amount
+        if total_amount == 0:
+            progress = 100
+        else:
+            progress = min(int((total_paid / total_amount) * 100), 100)
+        balance = total_amount - total_paid
+        breakdown = breakdown_by_invoice[current_month_invoice.id]
+
+        last_receipt = last_receipt_by_node.get(node.id)
+        last_payment_date = last_receipt["payment_date"] if last_receipt else None
+        last_payment_amount = (
+            last_receipt["paid_amount"] if last_receipt else Decimal("0.00")
+        )
 
-        # Get receipts for all invoices
-        all_receipts = []
-        for invoice in invoices:
-            all_receipts.extend(invoice.receipts.all())
+        next_due_date = calculate_next_due_date(property_tenant, current_month_invoice)
 
-        # Calculate status
-        property_detail = unit_detail or villa_detail
-        status = calculate_unit_status(property_detail, property_tenant, list(invoices))
+        # Get monthly rent from tenant contract (this is the expected rent)
+        monthly_rent = float(property_tenant.rent_amount) if property_tenant else 0
 
-        # Calculate payment progress
-        progress = calculate_payment_progress(current_month_invoice, all_receipts)
+        rows.append(
+            (
+                node,
+                {
+                    "id": str(node.id),
+                    "property": property_identifier,
+                    "propertyType": node.node_type,
+                    "projectName": paths[node.id],
+                    "invoiceId": str(current_month_invoice.id),
+                    "invoiceNumber": current_month_invoice.invoice_number,
+                    "tenantName": (
+                        property_tenant.tenant_user.get_full_name()
+                        if property_tenant
+                        else "Vacant"
+                    ),
+                    "tenantContact": (
+                        property_tenant.tenant_user.email if property_tenant else ""
+                    ),
+                    "leaseStart": (
+                        property_tenant.contract_start.isoformat()
+                        if property_tenant
+                        else ""
+                    ),
+                    "leaseEnd": (
+                        property_tenant.contract_end.isoformat()
+                        if property_tenant and property_tenant.contract_end
+                        else ""
+                    ),
+                    "monthlyRent": format_money_with_currency(monthly_rent, currency),
+                    "issueDate": (
+                        current_month_invoice.issue_date.isoformat()
+                        if current_month_invoice.issue_date
+                        else ""
+                    ),
+                    "dueDate": (
+                        current_month_invoice.due_date.isoformat()
+                        if current_month_invoice.due_date
+                        else ""
+                    ),
+                    "nextDueDate": (next_due_date.isoformat() if next_due_date else ""),
+                    "lastPayment": {
+                        "date": (
+                            last_payment_date.isoformat() if last_payment_date else ""
+                        ),
+                        "amount": format_money_with_currency(
+                            last_payment_amount, currency
+                        ),
+                    },
+                    # Total outstanding balance
+                    "balance": format_money_with_currency(balance, currency),
+                    "status": status,
+                    "paymentProgress": progress,
+                    # Actual rent billed (includes deposits)
+                    "rentAmount": format_money_with_currency(
+                        float(breakdown["rent"]), currency
+                    ),
+                    "servicesAmount": format_money_with_currency(
+                        breakdown["services"], currency
+                    ),
+                    "penaltiesAmount": format_money_with_currency(
+                        breakdown["penalties"], currency
+                    ),
+                    "totalPaid": format_money_with_currency(total_paid, currency),
+                },
+            )
+        )
 
-        # Calculate outstanding balance
-        balance = calculate_outstanding_balance(current_month_invoice, all_receipts)
+    return rows
 
-        # Calculate balance breakdown
-        balance_breakdown = calculate_balance_breakdown(
-            current_month_invoice, all_receipts
-        )
 
-        # Get last payment info
-        last_payment_date, last_payment_amount = get_last_payment_info(list(invoices))
+def _hierarchy_paths(nodes, ancestors_by_tree) -> dict:
+    """
+    "Project > Block > House > Unit X" path of every node.
 
-        # Get next due date
-        next_due_date = calculate_next_due_date(property_tenant, current_month_invoice)
+    Ancestors are the inner nodes of each tree, loaded once per tree and
+    walked through ``parent_id`` in memory instead of ``get_ancestors()``.
+    """
+    missing_trees = {node.tree_id for node in nodes} - ancestors_by_tree.keys()
+    for tree_id in missing_trees:
+        ancestors_by_tree[tree_id] = {}
+    if missing_trees:
+        for entry in (
+            LocationNode.objects.filter(tree_id__in=missing_trees)
+            .exclude(rght=F("lft") + 1)
+            .values(
+                "id",
+                "tree_id",
+                "parent_id",
+                "node_type",
+                "name",
+                "unit_detail__identifier",
+            )
+        ):
+            ancestors_by_tree[entry["tree_id"]][entry["id"]] = entry
+
+    paths = {}
+    for node in nodes:
+        unit_detail = getattr(node, "unit_detail", None)
+        chain = [
+            {
+                "node_type": node.node_type,
+                "name": node.name,
+                "unit_detail__identifier": (
+                    unit_detail.identifier if unit_detail else None
+                ),
+            }
+        ]
+        tree = ancestors_by_tree.get(node.tree_id, {})
+        parent = tree.get(node.parent_id)
+        while parent:
+            chain.append(parent)
+            parent = tree.get(parent["parent_id"])
 
-        # Build full project hierarchy path
-        ancestors = list(property_node.get_ancestors(include_self=True))
         hierarchy_parts = []
-
-        for ancestor in ancestors:
-            if ancestor.node_type == "PROJECT":
-                hierarchy_parts.append(ancestor.name)
-            elif ancestor.node_type == "BLOCK":
-                hierarchy_parts.append(ancestor.name)
-            elif ancestor.node_type == "HOUSE":
-                hierarchy_parts.append(ancestor.name)
-            elif ancestor.node_type == "UNIT":
+        for ancestor in reversed(chain):
+            if ancestor["node_type"] in ("PROJECT", "BLOCK", "HOUSE"):
+                hierarchy_parts.append(ancestor["name"])
+            elif ancestor["node_type"] == "UNIT":
                 # Add unit identifier
-                unit_detail = getattr(ancestor, "unit_detail", None)
-                if unit_detail:
-                    hierarchy_parts.append(f"Unit {unit_detail.identifier}")
+                if ancestor["unit_detail__identifier"]:
+                    hierarchy_parts.append(
+                        f"Unit {ancestor['unit_detail__identifier']}"
+                    )
                 else:
-                    hierarchy_parts.append(ancestor.name)
-
-        project_name = " > ".join(hierarchy_parts)
-
-        # Get monthly rent from tenant contract (this is the expected rent)
-        monthly_rent = float(property_tenant.rent_amount) if property_tenant else 0
-
-        # Get actual rent amount from invoice (this is what was actually billed)
-        actual_rent_amount = float(balance_breakdown["rent_amount"])
-
-        # Build property data
-        property_data = {
-            "id": str(property_node.id),
-            "property": property_identifier,
-            "propertyType": property_type,
-            "projectName": project_name,
-            "invoiceId": str(current_month_invoice.id),
-            "invoiceNumber": current_month_invoice.invoice_number,
-            "tenantName": (
-                property_tenant.tenant_user.get_full_name()
-                if property_tenant
-                else "Vacant"
-            ),
-            "tenantContact": (
-                property_tenant.tenant_user.email if property_tenant else ""
-            ),
-            "leaseStart": (
-                property_tenant.contract_start.isoformat() if property_tenant else ""
-            ),
-            "leaseEnd": (
-                property_tenant.contract_end.isoformat() if property_tenant else ""
-            ),
-            "monthlyRent": format_money_with_currency(
-                monthly_rent
-            ),  # Contract rent amount
-            "issueDate": (
-                current_month_invoice.issue_date.isoformat()
-                if current_month_invoice and current_month_invoice.issue_date
-                else ""
-            ),
-            "dueDate": (
-                current_month_invoice.due_date.isoformat()
-                if current_month_invoice and current_month_invoice.due_date
-                else ""
-            ),
-            "nextDueDate": (next_due_date.isoformat() if next_due_date else ""),
-            "lastPayment": {
-                "date": last_payment_date.isoformat() if last_payment_date else "",
-                "amount": format_money_with_currency(last_payment_amount),
-            },
-            "balance": format_money_with_currency(balance),  # Total outstanding balance
-            "status": status,
-            "paymentProgress": progress,
-            # Balance breakdown components
-            "rentAmount": format_money_with_currency(
-                actual_rent_amount
-            ),  # Actual rent billed (includes deposits)
-            "servicesAmount": format_money_with_currency(
-                balance_breakdown["services_amount"]
-            ),
-            "penaltiesAmount": format_money_with_currency(
-                balance_breakdown["penalties_amount"]
-            ),
-            "totalPaid": format_money_with_currency(balance_breakdown["total_paid"]),
-        }
-
-        rent_roll_data.append(property_data)
+                    hierarchy_parts.append(ancestor["name"])
 
-    return rent_roll_data
+        paths[node.id] = " > ".join(hierarchy_parts)
+    return paths
 
 
 def get_unit_ledger_data(company_id: str, unit_id: str) -> list:
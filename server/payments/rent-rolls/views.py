@@ -1,22 +1,31 @@
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.utils import timezone
 from django.db.models import Q
 
 from company.models import Owner
+from utils.export import ExportMixin, aiter_lines
 
 from .serializers import (
     RentRollListSerializer,
+    RentRollPropertySerializer,
     RentRollSummarySerializer,
     RentRollFilterSerializer,
     serialize_rent_roll_data,
 )
 from .utils import (
+    filter_rent_roll_rows,
+    get_rent_roll_page,
     get_rent_roll_summary_stats,
     get_rent_roll_units_data,
     get_unit_ledger_data,
+    iter_rent_roll_units,
 )
 
 
@@ -34,6 +43,8 @@ def rent_roll_list(request):
     - search: Search in unit name or tenant name
     - page: Page number for pagination
     - page_size: Number of items per page
+    - cursor: Keyset pagination; pass an empty value for the first page and
+      ``next_cursor`` from the response for the following ones
     """
     try:
         # Get company ID from user (assuming user is associated with a company)
@@ -57,6 +68,11 @@ def rent_roll_list(request):
         page = int(request.query_params.get("page", 1))
         page_size = int(request.query_params.get("page_size", 20))
 
+        if "cursor" in request.query_params:
+            return _rent_roll_keyset_page(
+                company_id, filters, request.query_params.get("cursor"), page_size
+            )
+
         # Get rent roll data
         rent_roll_data = serialize_rent_roll_data(company_id, filters)
 
@@ -105,6 +121,101 @@ def rent_roll_list(request):
         )
 
 
+def _rent_roll_keyset_page(company_id, filters, cursor, page_size):
+    """Rent roll page after ``cursor``; only the rows of this page are built"""
+    try:
+        results, next_cursor = get_rent_roll_page(
+            company_id, filters, cursor=cursor or None, page_size=page_size
+        )
+    except ValueError as e:
+        return Response(
+            {"error": True, "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = RentRollPropertySerializer(data=results, many=True)
+    if not serializer.is_valid():
+        print(f"Validation errors: {serializer.errors}")
+        return Response(
+            {
+                "error": True,
+                "message": "Data validation failed",
+                "details": serializer.errors,
+            },
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    return Response(
+        {
+            "error": False,
+            "data": {
+                "results": serializer.data,
+                "summary": get_rent_roll_summary_stats(company_id, filters),
+                "pagination": {"page_size": page_size, "next_cursor": next_cursor},
+            },
+        }
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def rent_roll_stream(request):
+    """
+    Stream every rent roll row as newline-delimited JSON.
+
+    Accepts the same filters as the list endpoint. Rows are sent through an
+    async iterator as each batch of properties is assembled, so under ASGI
+    large portfolios never sit in memory.
+    """
+    try:
+        company_id = Owner.objects.get(user=request.user).company.id
+    except Owner.DoesNotExist:
+        return Response(
+            {"error": True, "message": "Company not found for user"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    rows = _rent_roll_rows(company_id, request)
+    response = StreamingHttpResponse(
+        aiter_lines(json.dumps(row) + "\n" for row in rows),
+        content_type="application/x-ndjson",
+    )
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def _rent_roll_rows(company_id, request):
+    """Every rent roll row matching the request's filters, lazily"""
+    filter_serializer = RentRollFilterSerializer(data=request.query_params)
+    filters = filter_serializer.validated_data if filter_serializer.is_valid() else {}
+    return filter_rent_roll_rows(iter_rent_roll_units(company_id, filters), filters)
+
+
+class RentRollExportView(ExportMixin, APIView):
+    """
+    Download every rent roll row as CSV, or XLSX with ``?export=xlsx``.
+
+    Accepts the same filters as the list endpoint; with ``&background=true``
+    the file is written to the media bucket (see ``reports/exports/<id>/``).
+    """
+
+    permission_classes = [IsAuthenticated]
+    export_filename = "rent-roll"
+    default_export_format = "csv"
+
+    def get(self, request):
+        if not Owner.objects.filter(user=request.user).exists():
+            return Response(
+                {"error": True, "message": "Company not found for user"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self.export(request)
+
+    def export_rows(self):
+        company_id = Owner.objects.get(user=self.request.user).company.id
+        return _rent_roll_rows(company_id, self.request)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def rent_roll_summary(request):
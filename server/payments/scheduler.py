@@ -280,6 +280,27 @@ def update_celery_schedule():
                 "schedule": crontab(minute="*/1"),  # Keep as is
                 "args": [],
             },
+            "requeue-stale-outbound-emails": {
+                "task": "notifications.tasks.requeue_stale_outbound_emails",
+                "schedule": crontab(minute="*/15"),
+                "args": [],
+            },
+            "refresh-dashboard-metrics": {
+                "task": "dashboard.tasks.refresh_dashboard_metrics",
+                "schedule": crontab(minute="*/2"),
+                "args": [],
+            },
+            "requeue-stale-payment-callbacks": {
+                "task": "payments.tasks.requeue_stale_payment_callbacks",
+                "schedule": crontab(minute="*/5"),
+                "args": [],
+            },
+            # Safety net for dirty payouts whose debounced run was never queued
+            "recompute-dirty-payouts": {
+                "task": "payments.tasks.recompute_dirty_payouts",
+                "schedule": crontab(minute="*/5"),
+                "args": [],
+            },
         }
 
         # Merge original schedule with dynamic schedule
@@ -289,7 +310,7 @@ def update_celery_schedule():
         current_app.conf.beat_schedule = updated_schedule
 
         logger.info(
-            f"Updated Celery Beat schedule with {len(dynamic_schedule)} dynamic tasks + 1 static task"
+            f"Updated Celery Beat schedule with {len(dynamic_schedule)} dynamic tasks + {len(original_schedule)} static tasks"
         )
 
     except Exception as e:
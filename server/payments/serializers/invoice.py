@@ -8,7 +8,7 @@ from properties.models import (
     PropertyOwner,
     PropertyTenant,
 )
-from utils.invoice import get_missing_invoice_items
+from utils.invoice import BillingSnapshot, get_missing_invoice_items
 from utils.format import format_money_with_currency
 
 now = datetime.date.today()
@@ -30,14 +30,22 @@ class RecipientUserSerializer(serializers.ModelSerializer):
         if obj.type != "tenant":
             return []
         year, month = now.year, now.month
-        qs = PropertyTenant.objects.filter(
-            tenant_user=obj, is_deleted=False
-        ).select_related("node", "currency")
+        qs = list(
+            PropertyTenant.objects.filter(
+                tenant_user=obj, is_deleted=False
+            ).select_related("node", "currency")
+        )
+        snapshot = BillingSnapshot.for_nodes([pt.node for pt in qs], year, month)
         result = []
         for pt in qs:
             node = pt.node
             items = get_missing_invoice_items(
-                user=obj, node=node, year=year, month=month, user_type="tenant"
+                user=obj,
+                node=node,
+                year=year,
+                month=month,
+                user_type="tenant",
+                snapshot=snapshot,
             )
             if items:
                 ancestors = node.get_ancestors(include_self=True)
@@ -64,14 +72,22 @@ class RecipientUserSerializer(serializers.ModelSerializer):
         if obj.type != "owner":
             return []
         year, month = now.year, now.month
-        qs = PropertyOwner.objects.filter(
-            owner_user=obj, is_deleted=False
-        ).select_related("node")
+        qs = list(
+            PropertyOwner.objects.filter(
+                owner_user=obj, is_deleted=False
+            ).select_related("node")
+        )
+        snapshot = BillingSnapshot.for_nodes([po.node for po in qs], year, month)
         result = []
         for po in qs:
             node = po.node
             items = get_missing_invoice_items(
-                user=obj, node=node, year=year, month=month, user_type="owner"
+                user=obj,
+                node=node,
+                year=year,
+                month=month,
+                user_type="owner",
+                snapshot=snapshot,
             )
             if items:
                 ancestors = node.get_ancestors(include_self=True)
@@ -1,64 +1,24 @@
-import datetime
-
 from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django_celery_beat.models import CrontabSchedule
 
-from payments.models import Invoice, Receipt, TaskConfiguration
-from payments.payouts.utils import (
-    calculate_owner_payout,
-)
+from payments import financial_facts
+from payments.models import Expense, Invoice, InvoiceItem, Receipt, TaskConfiguration
+from payments.payouts import recompute as payout_recompute
 from properties.models import PropertyOwner, PropertyService, PropertyTenant
 
-# Import your payout calculation service (to be implemented)
-# from payments.payouts.utils import calculate_owner_payout
-
 
-def get_affected_payout_context(instance):
-    """
-    Extract owner, property_node, month, year from the changed instance.
-    Returns a list of (owner, property_node, month, year) tuples to recalculate.
-    """
-    now = datetime.date.today()
-    month = now.month
-    year = now.year
-    context = []
+def _payout_node_id(instance):
+    """The property whose owners' payouts ``instance`` affects"""
     if isinstance(instance, Invoice):
-        # Invoice: get all owners for the property
-        property_node = instance.property
-        owners = PropertyOwner.objects.filter(node=property_node)
-        for owner in owners:
-            context.append((owner.owner_user, property_node, month, year))
-    elif isinstance(instance, Receipt):
-        # Receipt: get invoice, then property and owners
-        invoice = instance.invoice
-        property_node = invoice.property
-        owners = PropertyOwner.objects.filter(node=property_node)
-        for owner in owners:
-            context.append((owner.owner_user, property_node, month, year))
-    elif isinstance(instance, PropertyTenant):
-        # PropertyTenant: get property and owners
-        property_node = instance.node
-        owners = PropertyOwner.objects.filter(node=property_node)
-        for owner in owners:
-            context.append((owner.owner_user, property_node, month, year))
-    elif isinstance(instance, PropertyOwner):
-        # PropertyOwner: get property and owner
-        property_node = instance.node
-        context.append((instance.owner_user, property_node, month, year))
-    elif isinstance(instance, PropertyService):
-        # PropertyService: get property and owners
-        property_node = instance.property_node
-        owners = PropertyOwner.objects.filter(node=property_node)
-        for owner in owners:
-            context.append((owner.owner_user, property_node, month, year))
-    return context
-
-
-def recalculate_owner_payout_for_instance(instance, **kwargs):
-    context_list = get_affected_payout_context(instance)
-    for owner, property_node, month, year in context_list:
-        calculate_owner_payout(owner, property_node, month, year)
+        return instance.property_id
+    if isinstance(instance, Receipt):
+        return instance.invoice.property_id if instance.invoice_id else None
+    if isinstance(instance, PropertyTenant):
+        return instance.node_id
+    if isinstance(instance, PropertyService):
+        return instance.property_node_id
+    return None
 
 
 @receiver([post_save, post_delete], sender=Invoice)
@@ -67,7 +27,58 @@ def recalculate_owner_payout_for_instance(instance, **kwargs):
 @receiver([post_save, post_delete], sender=PropertyOwner)
 @receiver([post_save, post_delete], sender=PropertyService)
 def payout_related_model_changed(sender, instance, **kwargs):
-    recalculate_owner_payout_for_instance(instance, **kwargs)
+    """
+    Mark the affected owners' payouts for this month dirty; they are
+    recomputed shortly after the transaction commits
+    """
+    if isinstance(instance, PropertyOwner):
+        payout_recompute.mark_dirty(instance.owner_user_id, instance.node_id)
+    else:
+        payout_recompute.mark_nodes_dirty([_payout_node_id(instance)])
+
+
+@receiver(pre_save, sender=Invoice)
+@receiver(pre_save, sender=Expense)
+def remember_financial_fact_slice(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember the slice an invoice/expense is moving out of, if it can move
+    """
+    node_field, date_field = _fact_slice_fields(sender)
+    if not instance.pk or (
+        update_fields is not None
+        and node_field not in update_fields
+        and date_field not in update_fields
+    ):
+        return
+    instance._previous_fact_slice = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(f"{node_field}_id", date_field)
+        .first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Expense)
+def financial_fact_source_changed(sender, instance, **kwargs):
+    node_field, date_field = _fact_slice_fields(sender)
+    financial_facts.mark_dirty(
+        getattr(instance, f"{node_field}_id"), getattr(instance, date_field)
+    )
+    previous = getattr(instance, "_previous_fact_slice", None)
+    if previous:
+        financial_facts.mark_dirty(*previous)
+
+
+@receiver([post_save, post_delete], sender=InvoiceItem)
+@receiver([post_save, post_delete], sender=Receipt)
+def financial_fact_detail_changed(sender, instance, **kwargs):
+    financial_facts.mark_invoice_dirty(instance.invoice_id)
+
+
+def _fact_slice_fields(sender):
+    if sender is Expense:
+        return "location_node", "invoice_date"
+    return "property", "issue_date"
 
 
 @receiver(pre_save, sender=TaskConfiguration)
@@ -1,3 +1,272 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import Users
+from payments.callbacks import (
+    apply_payment_callback,
+    apply_receipts,
+    record_payment_callback,
+)
+from payments.models import (
+    InstantPaymentNotification,
+    Invoice,
+    PaymentCallback,
+    PaymentRequestTransactions,
+    Receipt,
+)
+from payments.reconciliation import RECEIPT_NOTE_PREFIX, reconcile_transactions
+from properties.models import LocationNode
+from utils.export import export_response
+
+
+def make_invoice(node, total, status="ISSUED", days_ago=0):
+    invoice = Invoice.objects.create(
+        property=node,
+        due_date=timezone.now().date(),
+        total_amount=Decimal(total),
+        balance=Decimal(total) if status != "PAID" else Decimal("0"),
+        status=status,
+    )
+    # Allocation order follows created_at
+    created_at = timezone.now() - datetime.timedelta(days=days_ago)
+    Invoice.objects.filter(id=invoice.id).update(created_at=created_at)
+    return invoice
+
+
+class ReconcileTransactionsTestCase(TestCase):
+    def setUp(self):
+        self.node = LocationNode.objects.create(name="A1", node_type="UNIT")
+        self.older = make_invoice(self.node, "1000.00", days_ago=60)
+        self.newer = make_invoice(self.node, "1000.00", days_ago=30)
+
+    def notify(self, amount, reference="A-1", trans_id="TX1"):
+        return InstantPaymentNotification.objects.create(
+            trans_id=trans_id,
+            trans_amount=amount,
+            bill_ref_number=reference,
+            payment_method="mpesa",
+        )
+
+    def test_pays_open_invoices_oldest_first(self):
+        notification = self.notify("1500")
+
+        report = reconcile_transactions()
+
+        self.older.refresh_from_db()
+        self.newer.refresh_from_db()
+        self.assertEqual(self.older.status, "PAID")
+        self.assertEqual(self.older.balance, Decimal("0"))
+        self.assertEqual(self.newer.status, "PARTIAL")
+        self.assertEqual(self.newer.balance, Decimal("500"))
+        self.assertEqual(report["matched"], 1)
+        self.assertEqual(report["receipts"], 2)
+        self.assertEqual(report["exceptions"], [])
+        self.assertEqual(
+            sorted(Receipt.objects.values_list("paid_amount", flat=True)),
+            [Decimal("500"), Decimal("1000")],
+        )
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_verified)
+        self.assertEqual(notification.verified_for_invoice_id, self.older.id)
+
+    def test_referenced_invoice_is_paid_before_older_ones(self):
+        self.notify("1000", reference=f"INV-2025-{self.newer.invoice_number}")
+
+        reconcile_transactions()
+
+        self.older.refresh_from_db()
+        self.newer.refresh_from_db()
+        self.assertEqual(self.newer.status, "PAID")
+        self.assertEqual(self.older.status, "ISSUED")
+        self.assertEqual(self.older.balance, Decimal("1000"))
+
+    def test_overpayment_is_reported(self):
+        notification = self.notify("2500")
+
+        report = reconcile_transactions()
+
+        self.assertEqual(
+            set(Invoice.objects.values_list("status", flat=True)), {"PAID"}
+        )
+        (exception,) = report["exceptions"]
+        self.assertEqual(exception["reason"], "overpayment")
+        self.assertEqual(Decimal(exception["remaining"]), Decimal("500"))
+        self.assertEqual(Decimal(report["amount_unallocated"]), Decimal("500"))
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_verified)
+
+    def test_unit_without_open_invoices_is_reported(self):
+        Invoice.objects.update(status="PAID", balance=0)
+        notification = self.notify("1000")
+
+        report = reconcile_transactions()
+
+        (exception,) = report["exceptions"]
+        self.assertEqual(exception["reason"], "no_open_invoices")
+        self.assertFalse(Receipt.objects.exists())
+        notification.refresh_from_db()
+        self.assertFalse(notification.is_verified)
+
+    def test_already_applied_transaction_is_skipped(self):
+        notification = self.notify("1000")
+        Receipt.objects.create(
+            invoice=self.older,
+            paid_amount=Decimal("1000"),
+            notes=f"{RECEIPT_NOTE_PREFIX}TX1 for apartment A1",
+        )
+
+        report = reconcile_transactions()
+
+        (exception,) = report["exceptions"]
+        self.assertEqual(exception["reason"], "already_applied")
+        self.assertEqual(report["matched"], 0)
+        self.assertEqual(Receipt.objects.count(), 1)
+        self.newer.refresh_from_db()
+        self.assertEqual(self.newer.balance, Decimal("1000"))
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_verified)
+
+    def test_dry_run_writes_nothing(self):
+        notification = self.notify("1500")
+
+        report = reconcile_transactions(dry_run=True)
+
+        self.assertEqual(report["receipts"], 2)
+        self.assertFalse(Receipt.objects.exists())
+        self.older.refresh_from_db()
+        self.assertEqual(self.older.balance, Decimal("1000"))
+        notification.refresh_from_db()
+        self.assertFalse(notification.is_verified)
+
+
+class PaymentCallbackTestCase(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(
+            username="payer", email="payer@example.com", type="tenant"
+        )
+        self.node = LocationNode.objects.create(name="B2", node_type="UNIT")
+        self.invoice = make_invoice(self.node, "1000.00")
+        self.payment_request = PaymentRequestTransactions.objects.create(
+            user_id=self.user,
+            invoice=self.invoice,
+            checkout_request_id="ws_CO_1",
+            merchant_request_id="MR-1",
+            pay_status="Pending",
+        )
+
+    def payload(self, amount="400.00", **extra):
+        return {
+            "CheckoutRequestID": "ws_CO_1",
+            "MerchantRequestID": "MR-1",
+            "ResultCode": "0",
+            "ResultDesc": "Transaction processed successfully.",
+            "TransAmount": amount,
+            "TransactionCode": "TC1",
+            **extra,
+        }
+
+    def apply(self, payload, key="ws_CO_1"):
+        callback = PaymentCallback.objects.create(idempotency_key=key, payload=payload)
+        return apply_payment_callback(callback.id)
+
+    def test_successful_callback_applies_receipt(self):
+        callback = self.apply(self.payload())
+
+        self.assertEqual(callback.status, "APPLIED")
+        self.assertEqual(callback.attempts, 1)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal("600"))
+        self.assertEqual(self.invoice.status, "PARTIAL")
+        self.payment_request.refresh_from_db()
+        self.assertEqual(self.payment_request.pay_status, "Paid")
+        self.assertEqual(Receipt.objects.get().paid_amount, Decimal("400"))
+
+    def test_retried_callback_is_ignored(self):
+        self.apply(self.payload())
+
+        retry = self.apply(self.payload(), key="ws_CO_1-retry")
+
+        self.assertEqual(retry.status, "IGNORED")
+        self.assertEqual(Receipt.objects.count(), 1)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal("600"))
+
+    def test_callback_is_stored_once_per_key(self):
+        callback, created = record_payment_callback(self.payload())
+        duplicate, created_again = record_payment_callback(self.payload())
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(duplicate.id, callback.id)
+        self.assertEqual(PaymentCallback.objects.count(), 1)
+
+    def test_applied_callback_is_not_applied_again(self):
+        callback = self.apply(self.payload())
+
+        self.assertIsNone(apply_payment_callback(callback.id))
+        self.assertEqual(Receipt.objects.count(), 1)
+
+    def test_multiple_invoice_amount_mismatch_is_rejected(self):
+        second = make_invoice(self.node, "500.00")
+        self.payment_request.is_multiple_invoices = True
+        self.payment_request.invoices_data = [
+            {"invoice_id": str(self.invoice.id), "applied_amount": "1000.00"},
+            {"invoice_id": str(second.id), "applied_amount": "500.00"},
+        ]
+        self.payment_request.expected_total_amount = Decimal("1500.00")
+        self.payment_request.save()
+
+        callback = self.apply(self.payload(amount="1200.00"))
+
+        self.assertEqual(callback.status, "REJECTED")
+        self.assertIn("Amount mismatch", callback.last_error)
+        self.payment_request.refresh_from_db()
+        self.assertEqual(self.payment_request.pay_status, "Failed")
+        self.assertFalse(Receipt.objects.exists())
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal("1000"))
+
+    def test_failed_payment_creates_no_receipt(self):
+        callback = self.apply(self.payload(ResultCode="1032"))
+
+        self.assertEqual(callback.status, "APPLIED")
+        self.payment_request.refresh_from_db()
+        self.assertEqual(self.payment_request.pay_status, "Failed")
+        self.assertFalse(Receipt.objects.exists())
+
+    def test_receipts_move_the_running_balance(self):
+        receipts = apply_receipts(
+            [
+                (str(self.invoice.id), Decimal("300")),
+                (str(self.invoice.id), Decimal("700")),
+            ]
+        )
+
+        self.assertEqual(
+            [receipt.balance for receipt in receipts], [Decimal("700"), Decimal("0")]
+        )
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal("0"))
+        self.assertEqual(self.invoice.status, "PAID")
+
+
+class ExportStreamingTestCase(SimpleTestCase):
+    def test_csv_export_streams_asynchronously(self):
+        rows = ({"unit": f"A{i}", "rent": i} for i in range(3))
+
+        response = export_response(rows, "csv", name="rent-roll")
+
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return [chunk async for chunk in response.streaming_content]
+
+        content = b"".join(async_to_sync(read)()).decode("utf-8")
+        self.assertEqual(
+            content.splitlines(), ["\ufeffunit,rent", "A0,0", "A1,1", "A2,2"]
+        )
@@ -0,0 +1,290 @@
+"""
+Bulk import of gateway transactions (InstantPaymentNotification rows).
+
+Rows are handled in chunks: one ``trans_id IN (...)`` query finds the rows
+already imported, the rest go in with one ``bulk_create``. Each row still gets
+its own result, so the caller can report row-level errors.
+
+Uploaded CSV/XLSX files are read as a stream by a background task
+(``payments.tasks.import_transaction_file``), which records progress in a
+batch hash (``utils.batch_progress``) and the failed rows in a Redis list.
+"""
+
+import codecs
+import csv
+import json
+import logging
+import os
+
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from payments.models import InstantPaymentNotification
+from utils.batch_progress import BATCH_PROGRESS_TIMEOUT, get_batch_progress
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_FILE_EXTENSIONS = (".csv", ".xlsx")
+
+REQUIRED_FIELDS = ["trans_id", "trans_amount", "payment_method", "trans_time"]
+OPTIONAL_FIELDS = {
+    "merchant_code": "",
+    "business_short_code": "",
+    "invoice_number": "",
+    "third_party_trans_id": "",
+    "full_name": "",
+    "first_name": "",
+    "middle_name": "",
+    "last_name": "",
+    "transaction_type": "payment",
+    "msisdn": "",
+    "org_account_balance": "",
+    "bill_ref_number": "",
+}
+
+
+def import_batch_key(import_id):
+    return f"transaction_import:{import_id}"
+
+
+def _errors_key(batch_key):
+    return f"{batch_key}:errors"
+
+
+def _error(row_number, message, data):
+    return {"row": row_number, "success": False, "error": message, "data": data}
+
+
+def _is_true(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def _build_transaction(data):
+    fields = {
+        name: data.get(name) or default for name, default in OPTIONAL_FIELDS.items()
+    }
+    return InstantPaymentNotification(
+        payment_method=data["payment_method"],
+        trans_id=str(data["trans_id"]),
+        trans_amount=data["trans_amount"],
+        trans_time=data["trans_time"],
+        is_verified=_is_true(data.get("is_verified", False)),
+        **fields,
+    )
+
+
+def _created(row_number, created):
+    return {
+        "row": row_number,
+        "success": True,
+        "message": f"Transaction {created.trans_id} created successfully",
+        "data": {
+            "transaction_id": str(created.id),
+            "trans_id": created.trans_id,
+            "amount": created.trans_amount,
+            "account_ref": created.bill_ref_number,
+            "phone": created.msisdn,
+        },
+    }
+
+
+def _import_chunk(chunk, seen):
+    """Import ``(row_number, data)`` pairs; returns the per-row results"""
+    results = []
+    candidates = []
+    for row_number, data in chunk:
+        missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+        if missing:
+            results.append(
+                _error(
+                    row_number, f"Missing required fields: {', '.join(missing)}", data
+                )
+            )
+        else:
+            candidates.append((row_number, data))
+
+    trans_ids = {str(data["trans_id"]) for _, data in candidates}
+    existing = (
+        set(
+            InstantPaymentNotification.objects.filter(
+                trans_id__in=trans_ids
+            ).values_list("trans_id", flat=True)
+        )
+        if trans_ids
+        else set()
+    )
+
+    to_create = []
+    for row_number, data in candidates:
+        trans_id = str(data["trans_id"])
+        # Repeats within the upload count as existing, like in the row-by-row view
+        if trans_id in existing or trans_id in seen:
+            results.append(
+                _error(row_number, f"Transaction ID {trans_id} already exists", data)
+            )
+            continue
+        try:
+            to_create.append((row_number, data, _build_transaction(data)))
+            seen.add(trans_id)
+        except Exception as e:
+            results.append(
+                _error(row_number, f"Error creating transaction: {str(e)}", data)
+            )
+
+    try:
+        with transaction.atomic():
+            InstantPaymentNotification.objects.bulk_create(
+                [created for _, _, created in to_create]
+            )
+        results.extend(
+            _created(row_number, created) for row_number, _, created in to_create
+        )
+    except Exception:
+        # One bad row fails the whole INSERT; find it by saving row by row
+        for row_number, data, created in to_create:
+            try:
+                with transaction.atomic():
+                    created.save(force_insert=True)
+                results.append(_created(row_number, created))
+            except Exception as e:
+                seen.discard(created.trans_id)
+                results.append(
+                    _error(row_number, f"Error creating transaction: {str(e)}", data)
+                )
+
+    results.sort(key=lambda result: result["row"])
+    return results
+
+
+def import_transactions(
+    rows, chunk_size=IMPORT_CHUNK_SIZE, include_successes=True, on_chunk=None
+):
+    """
+    Import an iterable of transaction dicts.
+
+    ``on_chunk(processed, success_count, errors)`` is called after every chunk.
+    With ``include_successes=False`` only failed rows are kept in the results.
+    """
+    summary = {
+        "total_processed": 0,
+        "success_count": 0,
+        "error_count": 0,
+        "results": [],
+    }
+    seen = set()
+
+    chunk = []
+    for row_number, data in enumerate(rows, start=1):
+        chunk.append((row_number, data))
+        if len(chunk) >= chunk_size:
+            results = _import_chunk(chunk, seen)
+            _record_chunk(summary, results, include_successes, on_chunk)
+            chunk = []
+    if chunk:
+        results = _import_chunk(chunk, seen)
+        _record_chunk(summary, results, include_successes, on_chunk)
+    return summary
+
+
+def _record_chunk(summary, results, include_successes, on_chunk):
+    errors = [result for result in results if not result["success"]]
+    success_count = len(results) - len(errors)
+
+    summary["total_processed"] += len(results)
+    summary["success_count"] += success_count
+    summary["error_count"] += len(errors)
+    summary["results"].extend(results if include_successes else errors)
+
+    if on_chunk:
+        on_chunk(len(results), success_count, errors)
+
+
+def _normalize_header(name):
+    return str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _row_dict(headers, values):
+    return {
+        header: value
+        for header, value in zip(headers, values)
+        if header and value not in (None, "")
+    }
+
+
+def iter_upload_rows(file, file_name):
+    """
+    Yield one dict per data row of a CSV or XLSX file, keyed by the
+    normalized header row ("Trans ID" -> "trans_id"); the file is streamed
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+
+    if extension == ".csv":
+        reader = csv.reader(codecs.getreader("utf-8-sig")(file, errors="replace"))
+        headers = [_normalize_header(name) for name in next(reader, [])]
+        for values in reader:
+            row = _row_dict(headers, [value.strip() for value in values])
+            if row:
+                yield row
+        return
+
+    if extension == ".xlsx":
+        # Only needed for spreadsheet uploads
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [_normalize_header(name) for name in next(rows, ())]
+            for values in rows:
+                row = _row_dict(
+                    headers,
+                    [
+                        value.isoformat() if hasattr(value, "isoformat") else value
+                        for value in values
+                    ],
+                )
+                if row:
+                    yield {
+                        key: value if isinstance(value, (str, bool)) else str(value)
+                        for key, value in row.items()
+                    }
+        finally:
+            workbook.close()
+        return
+
+    raise ValueError(f"Unsupported file type: {extension or file_name}")
+
+
+def record_import_errors(batch_key, errors):
+    """Append failed rows to the import's error list"""
+    if not errors:
+        return
+    try:
+        redis_client = get_redis_connection("default")
+        pipe = redis_client.pipeline()
+        pipe.rpush(
+            _errors_key(batch_key),
+            *[json.dumps(error, default=str) for error in errors],
+        )
+        pipe.expire(_errors_key(batch_key), BATCH_PROGRESS_TIMEOUT)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record import errors for {batch_key}: {e}")
+
+
+def get_import_progress(import_id, errors_offset=0, errors_limit=500):
+    """Progress counters of a file import plus a page of its failed rows"""
+    batch_key = import_batch_key(import_id)
+    progress = get_batch_progress(batch_key)
+    if progress is None:
+        return None
+
+    redis_client = get_redis_connection("default")
+    errors = redis_client.lrange(
+        _errors_key(batch_key), errors_offset, errors_offset + errors_limit - 1
+    )
+    progress["results"] = [json.loads(error) for error in errors]
+    return progress
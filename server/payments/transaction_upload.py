@@ -2,21 +2,36 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from datetime import datetime
-from decimal import Decimal
-import json
+from django.core.files.storage import default_storage
+import os
+import uuid
 
-from payments.models import InstantPaymentNotification
+from payments.transaction_import import (
+    IMPORT_FILE_EXTENSIONS,
+    get_import_progress,
+    import_batch_key,
+    import_transactions,
+)
+from utils.batch_progress import start_batch
 
 
 class BulkTransactionUploadView(APIView):
+    """
+    JSON ``transactions`` lists are imported in the request. A ``file``
+    (CSV or XLSX) is imported in the background; poll
+    ``transactions/bulk-upload/<import_id>`` for progress and failed rows.
+    """
+
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                return self._queue_file_import(upload)
+
             transactions_data = request.data.get('transactions', [])
-            
+
             if not transactions_data:
                 return Response({
                     'error': True,
@@ -24,94 +39,12 @@ class BulkTransactionUploadView(APIView):
                     'data': None
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            results = []
-            success_count = 0
-            error_count = 0
-
-            for i, transaction_data in enumerate(transactions_data):
-                try:
-                    # Validate required fields (msisdn is optional for Excel uploads)
-                    required_fields = ['trans_id', 'trans_amount', 'payment_method', 'trans_time']
-                    missing_fields = [field for field in required_fields if not transaction_data.get(field)]
-                    
-                    if missing_fields:
-                        results.append({
-                            'row': i + 1,
-                            'success': False,
-                            'error': f'Missing required fields: {", ".join(missing_fields)}',
-                            'data': transaction_data
-                        })
-                        error_count += 1
-                        continue
-
-                    # Check if transaction already exists
-                    existing_transaction = InstantPaymentNotification.objects.filter(
-                        trans_id=transaction_data['trans_id']
-                    ).first()
-
-                    if existing_transaction:
-                        results.append({
-                            'row': i + 1,
-                            'success': False,
-                            'error': f'Transaction ID {transaction_data["trans_id"]} already exists',
-                            'data': transaction_data
-                        })
-                        error_count += 1
-                        continue
-
-                    # Create transaction
-                    transaction = InstantPaymentNotification.objects.create(
-                        merchant_code=transaction_data.get('merchant_code', ''),
-                        business_short_code=transaction_data.get('business_short_code', ''),
-                        invoice_number=transaction_data.get('invoice_number', ''),
-                        payment_method=transaction_data['payment_method'],
-                        trans_id=transaction_data['trans_id'],
-                        third_party_trans_id=transaction_data.get('third_party_trans_id', ''),
-                        full_name=transaction_data.get('full_name', ''),
-                        first_name=transaction_data.get('first_name', ''),
-                        middle_name=transaction_data.get('middle_name', ''),
-                        last_name=transaction_data.get('last_name', ''),
-                        transaction_type=transaction_data.get('transaction_type', 'payment'),
-                        msisdn=transaction_data.get('msisdn', ''),
-                        org_account_balance=transaction_data.get('org_account_balance', ''),
-                        trans_amount=transaction_data['trans_amount'],
-                        trans_time=transaction_data['trans_time'],
-                        bill_ref_number=transaction_data.get('bill_ref_number', ''),
-                        is_verified=transaction_data.get('is_verified', False),
-                    )
-
-                    results.append({
-                        'row': i + 1,
-                        'success': True,
-                        'message': f'Transaction {transaction_data["trans_id"]} created successfully',
-                        'data': {
-                            'transaction_id': str(transaction.id),
-                            'trans_id': transaction.trans_id,
-                            'amount': transaction.trans_amount,
-                            'account_ref': transaction.bill_ref_number,
-                            'phone': transaction.msisdn
-                        }
-                    })
-                    success_count += 1
-
-                except Exception as e:
-                    results.append({
-                        'row': i + 1,
-                        'success': False,
-                        'error': f'Error creating transaction: {str(e)}',
-                        'data': transaction_data
-                    })
-                    error_count += 1
+            summary = import_transactions(transactions_data)
 
             return Response({
                 'error': False,
-                'message': f'Bulk upload completed. {success_count} successful, {error_count} failed',
-                'data': {
-                    'total_processed': len(transactions_data),
-                    'success_count': success_count,
-                    'error_count': error_count,
-                    'results': results
-                }
+                'message': f'Bulk upload completed. {summary["success_count"]} successful, {summary["error_count"]} failed',
+                'data': summary
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -120,3 +53,66 @@ class BulkTransactionUploadView(APIView):
                 'message': f'Error processing bulk upload: {str(e)}',
                 'data': None
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _queue_file_import(self, upload):
+        from payments.tasks import import_transaction_file
+
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in IMPORT_FILE_EXTENSIONS:
+            return Response({
+                'error': True,
+                'message': f'Unsupported file type. Upload one of: {", ".join(IMPORT_FILE_EXTENSIONS)}',
+                'data': None
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        import_id = uuid.uuid4()
+        file_name = default_storage.save(
+            f'imports/transactions/{import_id}{extension}', upload
+        )
+        batch_key = import_batch_key(import_id)
+        start_batch(
+            batch_key, 0, success=0, errors=0, status='running', file=upload.name
+        )
+        import_transaction_file.delay(file_name, batch_key)
+
+        return Response({
+            'error': False,
+            'message': 'Upload accepted. Transactions are being imported',
+            'data': {'import_id': str(import_id), 'status': 'running'}
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkTransactionUploadStatusView(APIView):
+    """Progress of a file import and a page of its failed rows"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, import_id):
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 500)), 1), 5000)
+        except ValueError:
+            offset, limit = 0, 500
+
+        progress = get_import_progress(
+            import_id, errors_offset=offset, errors_limit=limit
+        )
+        if progress is None:
+            return Response({
+                'error': True,
+                'message': 'Import not found or expired',
+                'data': None
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'error': False,
+            'message': f'Import {progress.get("status", "running")}',
+            'data': {
+                'import_id': str(import_id),
+                'status': progress.get('status'),
+                'total_processed': progress.get('completed', 0),
+                'success_count': progress.get('success', 0),
+                'error_count': progress.get('errors', 0),
+                'results': progress['results'],
+            }
+        }, status=status.HTTP_200_OK)
@@ -3,12 +3,16 @@ from django.urls import path
 from payments.payment import (
     PaymentStatsSummaryView,
     PaymentTableListView,
+    ReconcileTransactionsView,
     RecordPaymentView,
     TransactionsListView,
     UnpaidInvoicesForUserView,
     UpdateBillsFromTransactionView,
 )
-from payments.transaction_upload import BulkTransactionUploadView
+from payments.transaction_upload import (
+    BulkTransactionUploadStatusView,
+    BulkTransactionUploadView,
+)
 
 urlpatterns = [
     path(
@@ -36,6 +40,11 @@ urlpatterns = [
         UpdateBillsFromTransactionView.as_view(),
         name="update-bills",
     ),
+    path(
+        "transactions/reconcile",
+        ReconcileTransactionsView.as_view(),
+        name="reconcile-transactions",
+    ),
     path(
         "transactions",
         TransactionsListView.as_view(),
@@ -46,4 +55,9 @@ urlpatterns = [
         BulkTransactionUploadView.as_view(),
         name="bulk-transaction-upload",
     ),
+    path(
+        "transactions/bulk-upload/<uuid:import_id>",
+        BulkTransactionUploadStatusView.as_view(),
+        name="bulk-transaction-upload-status",
+    ),
 ]
@@ -1 +1,9 @@
 from django.apps import AppConfig
+
+
+class PropertiesConfig(AppConfig):
+    name = "properties"
+
+    def ready(self):
+        # Import signals to register them
+        from . import signals  # noqa: F401
@@ -0,0 +1,384 @@
+"""
+Bulk structure upload.
+
+``BulkStructureUploadView`` rows (block/house name, floor, unit count) are
+turned into a plan against the project's current tree: blocks and houses to
+create, floors to add to existing ones and floors that already exist.
+
+Names still held by soft-deleted blocks, houses or floors cannot be reused
+(``unique_together`` on parent, name and type); those rows are reported as
+conflicts and left out of the plan.
+
+The plan is either returned as a diff (dry run) or applied in one go: the new
+nodes are built in memory, the project's MPTT fields (``lft``/``rght``/
+``level``) are recomputed in memory for the whole tree, and nodes, details and
+the shifted existing nodes are written with ``bulk_create``/``bulk_update``
+instead of one MPTT insert (and tree shift) per node.
+"""
+
+import heapq
+import logging
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from properties import location_tree
+from properties.models import (
+    BlockDetail,
+    FloorDetail,
+    LocationNode,
+    UnitDetail,
+    VillaDetail,
+)
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 1000
+
+
+def unit_count(value):
+    """Units on a floor; "-" (or nothing) means a floor without units"""
+    if value in (None, "", "-"):
+        return 0
+    return max(int(value), 0)
+
+
+def unit_names(name, floor_num, units):
+    # "Block A" -> "A"
+    block_letter = name.split(" ")[-1] if " " in name else name[0]
+    return [
+        f"{block_letter}{floor_num}{unit_num:02d}" for unit_num in range(1, units + 1)
+    ]
+
+
+def floor_name(number):
+    return f"Floor {number}"
+
+
+def plan_structure(parent_node, structure_data):
+    """
+    Compare ``{name: [{"floor": n, "units": count}, ...]}`` with the
+    project's blocks and houses.
+
+    Returns ``{"blocks": [...], "houses": [...], "floors": [...],
+    "existing_floors": [...], "conflicts": [...]}``; block and house entries
+    carry the floors to create, ``floors`` are new floors for existing
+    blocks/houses and ``conflicts`` are names held by soft-deleted nodes.
+    """
+    existing, deleted = {}, set()
+    for node in LocationNode.objects.filter(
+        parent=parent_node, node_type__in=["BLOCK", "HOUSE"]
+    ):
+        if node.is_deleted:
+            deleted.add((node.node_type, node.name))
+        else:
+            existing[(node.node_type, node.name)] = node
+
+    existing_floors = defaultdict(set)
+    for parent_id, number in FloorDetail.objects.filter(
+        node__parent_id__in=[node.id for node in existing.values()],
+        node__node_type="FLOOR",
+        node__is_deleted=False,
+    ).values_list("node__parent_id", "number"):
+        existing_floors[parent_id].add(number)
+    deleted_floors = defaultdict(set)
+    for parent_id, name in LocationNode.objects.filter(
+        parent_id__in=[node.id for node in existing.values()],
+        node_type="FLOOR",
+        is_deleted=True,
+    ).values_list("parent_id", "name"):
+        deleted_floors[parent_id].add(name)
+
+    plan = {
+        "blocks": [],
+        "houses": [],
+        "floors": [],
+        "existing_floors": [],
+        "conflicts": [],
+    }
+    for name, floors_data in structure_data.items():
+        node = existing.get(("BLOCK", name)) or existing.get(("HOUSE", name))
+
+        if node is None:
+            has_units = any(floor_data["units"] != "-" for floor_data in floors_data)
+            kind = "blocks" if has_units else "houses"
+            node_type = "BLOCK" if has_units else "HOUSE"
+            if (node_type, name) in deleted:
+                plan["conflicts"].append(
+                    {"parent": parent_node, "name": name, "node_type": node_type}
+                )
+                continue
+            plan[kind].append(
+                {
+                    "name": name,
+                    "floors": [
+                        _floor(name, floor_data, with_units=has_units)
+                        for floor_data in floors_data
+                    ],
+                }
+            )
+            continue
+
+        for floor_data in floors_data:
+            if floor_data["floor"] in existing_floors[node.id]:
+                plan["existing_floors"].append(
+                    {"parent": node, "number": floor_data["floor"]}
+                )
+                continue
+            if floor_name(floor_data["floor"]) in deleted_floors[node.id]:
+                plan["conflicts"].append(
+                    {
+                        "parent": node,
+                        "name": floor_name(floor_data["floor"]),
+                        "node_type": "FLOOR",
+                    }
+                )
+                continue
+            floor = _floor(name, floor_data, with_units=node.node_type == "BLOCK")
+            floor["parent"] = node
+            plan["floors"].append(floor)
+    return plan
+
+
+def _floor(name, floor_data, with_units):
+    units = unit_count(floor_data["units"]) if with_units else 0
+    return {
+        "number": floor_data["floor"],
+        "units": unit_names(name, floor_data["floor"], units),
+    }
+
+
+def structure_diff(plan):
+    """JSON-friendly summary of what applying ``plan`` would change"""
+
+    def floors(items):
+        return [{"floor": item["number"], "units": item["units"]} for item in items]
+
+    floor_count = len(plan["floors"]) + sum(
+        len(entry["floors"]) for entry in plan["blocks"] + plan["houses"]
+    )
+    unit_total = sum(len(floor["units"]) for floor in plan["floors"]) + sum(
+        len(floor["units"]) for entry in plan["blocks"] for floor in entry["floors"]
+    )
+    return {
+        "blocks_to_create": [
+            {"name": entry["name"], "floors": floors(entry["floors"])}
+            for entry in plan["blocks"]
+        ],
+        "houses_to_create": [
+            {"name": entry["name"], "floors": floors(entry["floors"])}
+            for entry in plan["houses"]
+        ],
+        "floors_to_add": [
+            {
+                "parent": floor["parent"].name,
+                "parent_type": floor["parent"].node_type,
+                "floor": floor["number"],
+                "units": floor["units"],
+            }
+            for floor in plan["floors"]
+        ],
+        "existing_floors": [
+            {
+                "parent": floor["parent"].name,
+                "parent_type": floor["parent"].node_type,
+                "floor": floor["number"],
+            }
+            for floor in plan["existing_floors"]
+        ],
+        "conflicts": [
+            {
+                "parent": conflict["parent"].name,
+                "name": conflict["name"],
+                "node_type": conflict["node_type"],
+                "reason": "Name is used by a deleted node",
+            }
+            for conflict in plan["conflicts"]
+        ],
+        "counts": {
+            "blocks": len(plan["blocks"]),
+            "houses": len(plan["houses"]),
+            "floors": floor_count,
+            "units": unit_total,
+            "conflicts": len(plan["conflicts"]),
+            "nodes": (
+                len(plan["blocks"]) + len(plan["houses"]) + floor_count + unit_total
+            ),
+        },
+    }
+
+
+class _Builder:
+    """Collects the nodes and detail rows of a plan"""
+
+    def __init__(self, tree_id):
+        self.tree_id = tree_id
+        self.nodes = []
+        self.details = defaultdict(list)
+
+    def node(self, name, node_type, parent):
+        # lft/rght/level are set once the whole tree is laid out
+        node = LocationNode(
+            name=name,
+            node_type=node_type,
+            parent=parent,
+            tree_id=self.tree_id,
+            lft=0,
+            rght=0,
+            level=0,
+        )
+        self.nodes.append(node)
+        return node
+
+    def floor(self, parent, floor):
+        floor_node = self.node(floor_name(floor["number"]), "FLOOR", parent)
+        self.details[FloorDetail].append(
+            FloorDetail(node=floor_node, number=floor["number"], description="")
+        )
+        for identifier in floor["units"]:
+            unit_node = self.node(identifier, "UNIT", floor_node)
+            self.details[UnitDetail].append(
+                UnitDetail(
+                    node=unit_node,
+                    management_mode="SERVICE_ONLY",  # Default, can be edited later
+                    status="available",
+                    identifier=identifier,
+                    size="",
+                    sale_price=None,
+                    rental_price=None,
+                    description="",
+                    management_status="for_rent",
+                    currency=None,
+                    unit_type=None,
+                    service_charge=None,
+                )
+            )
+
+
+def apply_structure(parent_node, structure_data):
+    """
+    Plan ``structure_data`` against the current tree and create it under
+    ``parent_node``; returns the plan and the number of nodes created
+    """
+    with transaction.atomic():
+        # One bulk structure write per project tree at a time, planned
+        # against the tree as it is once the lock is held
+        root = (
+            LocationNode.objects.select_for_update()
+            .filter(tree_id=parent_node.tree_id, parent__isnull=True)
+            .first()
+        )
+        plan = plan_structure(parent_node, structure_data)
+        builder = _Builder(parent_node.tree_id)
+
+        for entry in plan["blocks"]:
+            block_node = builder.node(entry["name"], "BLOCK", parent_node)
+            builder.details[BlockDetail].append(
+                BlockDetail(node=block_node, name=entry["name"], description="")
+            )
+            for floor in entry["floors"]:
+                builder.floor(block_node, floor)
+
+        for entry in plan["houses"]:
+            house_node = builder.node(entry["name"], "HOUSE", parent_node)
+            builder.details[VillaDetail].append(
+                VillaDetail(
+                    node=house_node,
+                    name=entry["name"],
+                    management_mode="SERVICE_ONLY",  # Default, can be edited later
+                    service_charge=None,
+                )
+            )
+            for floor in entry["floors"]:
+                builder.floor(house_node, floor)
+
+        for floor in plan["floors"]:
+            builder.floor(floor["parent"], floor)
+
+        if not builder.nodes:
+            return plan, 0
+
+        moved = _layout_tree(root, builder.nodes)
+        LocationNode.objects.bulk_create(builder.nodes, batch_size=BULK_BATCH_SIZE)
+        for model in (BlockDetail, VillaDetail, FloorDetail, UnitDetail):
+            model.objects.bulk_create(
+                builder.details[model], batch_size=BULK_BATCH_SIZE
+            )
+        LocationNode.objects.bulk_update(
+            moved, ["lft", "rght", "level"], batch_size=BULK_BATCH_SIZE
+        )
+
+        # bulk_create/bulk_update send no signals
+        location_tree.invalidate_tree(parent_node.tree_id)
+
+    logger.info(
+        f"🏗️ Bulk structure upload created {len(builder.nodes)} nodes "
+        f"in tree {parent_node.tree_id}"
+    )
+    return plan, len(builder.nodes)
+
+
+def _layout_tree(root, new_nodes):
+    """
+    Lay out the tree rooted at ``root`` with ``new_nodes`` added: set the
+    MPTT fields of the new nodes and return the existing nodes whose fields
+    change.
+
+    Siblings keep their current order and new nodes are merged in by name,
+    matching ``order_insertion_by = ["name"]``.
+    """
+    existing = {
+        row["id"]: row
+        for row in LocationNode.objects.filter(tree_id=root.tree_id)
+        .order_by("lft")
+        .values("id", "parent_id", "name", "lft", "rght", "level")
+    }
+    children = defaultdict(list)
+    for row in existing.values():
+        if row["parent_id"] is not None:
+            children[row["parent_id"]].append((row["name"], 0, row["id"]))
+
+    new_by_id = {node.id: node for node in new_nodes}
+    new_children = defaultdict(list)
+    for node in new_nodes:
+        new_children[node.parent_id].append((node.name, 1, node.id))
+
+    # Iterative DFS; each stack entry is (node id, level, children iterator)
+    fields = {}
+    counter = 1
+    fields[root.id] = [counter, None, 0]
+    stack = [(root.id, 0, _merged(children, new_children, root.id))]
+    while stack:
+        node_id, level, remaining = stack[-1]
+        child = next(remaining, None)
+        if child is None:
+            counter += 1
+            fields[node_id][1] = counter
+            stack.pop()
+            continue
+        counter += 1
+        child_id = child[2]
+        fields[child_id] = [counter, None, level + 1]
+        stack.append(
+            (child_id, level + 1, _merged(children, new_children, child_id))
+        )
+
+    for node_id, node in new_by_id.items():
+        node.lft, node.rght, node.level = fields[node_id]
+
+    moved = []
+    for node_id, row in existing.items():
+        current = (row["lft"], row["rght"], row["level"])
+        lft, rght, level = fields.get(node_id, current)
+        if (lft, rght, level) != current:
+            moved.append(LocationNode(id=node_id, lft=lft, rght=rght, level=level))
+    return moved
+
+
+def _merged(children, new_children, node_id):
+    existing = children.get(node_id, [])
+    added = sorted(new_children.get(node_id, []))
+    if not added:
+        return iter(existing)
+    return heapq.merge(existing, added, key=lambda child: (child[0], child[1]))
@@ -3,7 +3,6 @@ import json
 import django_filters
 
 from django.db import transaction
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
@@ -24,6 +23,7 @@ from rest_framework.views import APIView
 from accounts.models import Users
 from utils.currency import get_serialized_default_currency
 from utils.custom_pagination import CustomPageNumberPagination
+from utils.search import USER_SEARCH_FIELDS, search_filter
 from utils.serilaizer import flatten_errors
 
 from .models import LocationNode, PropertyOwner
@@ -42,6 +42,7 @@ from .serializers.clients import (
 
 
 class TenantOwnerFilters(django_filters.FilterSet):
+    q = django_filters.CharFilter(method="filter_q")
     email = django_filters.CharFilter(field_name="email", lookup_expr="icontains")
     first_name = django_filters.CharFilter(
         field_name="first_name", lookup_expr="icontains"
@@ -53,7 +54,11 @@ class TenantOwnerFilters(django_filters.FilterSet):
 
     class Meta:
         model = Users
-        fields = ["email", "first_name", "last_name", "is_active"]
+        fields = ["q", "email", "first_name", "last_name", "is_active"]
+
+    def filter_q(self, queryset, name, value):
+        """Search in first_name, last_name, email, and phone fields"""
+        return search_filter(queryset, value, USER_SEARCH_FIELDS)
 
 
 @extend_schema(
@@ -561,12 +566,7 @@ class ProjectOwnerSearchView(RetrieveAPIView):
 
         if search_term:
             # Search by name (first_name, last_name, or full name) or phone
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_term)
-                | Q(last_name__icontains=search_term)
-                | Q(phone__icontains=search_term)
-                | Q(email__icontains=search_term)
-            )
+            queryset = search_filter(queryset, search_term, USER_SEARCH_FIELDS)
 
         return queryset
 
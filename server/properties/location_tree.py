@@ -0,0 +1,155 @@
+"""
+Serialized location trees.
+
+A tree is loaded with one MPTT range query (``tree_id`` + ``lft``/``rght``,
+soft-deleted nodes left out) with the unit, villa and room details joined in,
+then nested in memory.
+
+Trees read by ``LocationNodeTreeView`` are cached per project. Each project
+tree has a version number in the cache; any LocationNode or detail write
+bumps it once the transaction commits, which retires every cached
+serialization of that tree at once.
+"""
+
+import logging
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+from properties.models import LocationNode
+from properties.serializers.common import LocationNodeTreeSerializer
+from utils.currency import get_serialized_default_currency
+
+logger = logging.getLogger(__name__)
+
+LOCATION_TREE_CACHE_TIMEOUT = 60 * 60 * 6  # 6 hours
+
+_pending = threading.local()
+
+
+def _version_key(tree_id):
+    return f"location_tree:{tree_id}:version"
+
+
+def tree_version(tree_id) -> int:
+    version = cache.get(_version_key(tree_id))
+    if version is None:
+        # Start from a timestamp so a lost version key can never bring
+        # back entries cached under an earlier number
+        cache.add(_version_key(tree_id), int(time.time() * 1000), timeout=None)
+        version = cache.get(_version_key(tree_id))
+    return version
+
+
+def bump_tree_version(tree_id):
+    """Retire every cached serialization of a tree"""
+    try:
+        cache.incr(_version_key(tree_id))
+    except ValueError:
+        # Nothing was cached for this tree yet
+        tree_version(tree_id)
+
+
+def build_location_tree(parent_node):
+    """
+    Serialize the children of ``parent_node`` (and their subtrees) from a
+    single range query, bypassing the cache
+    """
+    # Bounds come from the database: the caller's instance may predate
+    # inserts made in the same request
+    bounds = LocationNode.objects.filter(id=parent_node.id).values(
+        "tree_id", "lft", "rght"
+    )[0]
+    nodes = (
+        LocationNode.objects.filter(
+            tree_id=bounds["tree_id"],
+            lft__gt=bounds["lft"],
+            rght__lt=bounds["rght"],
+            is_deleted=False,
+        )
+        .select_related("unit_detail", "villa_detail", "room_detail")
+        .order_by("lft")
+    )
+
+    children_by_parent = defaultdict(list)
+    for node in nodes:
+        children_by_parent[node.parent_id].append(node)
+
+    context = {
+        "children_by_parent": children_by_parent,
+        "currency": get_serialized_default_currency(),
+    }
+    return LocationNodeTreeSerializer(
+        children_by_parent.get(parent_node.id, []), many=True, context=context
+    ).data
+
+
+def get_location_tree(parent_node):
+    """
+    Serialized children of ``parent_node``, served from the cache while the
+    tree is unchanged
+    """
+    version = tree_version(parent_node.tree_id)
+    key = f"location_tree:{parent_node.tree_id}:v{version}:{parent_node.id}"
+
+    tree = cache.get(key)
+    if tree is None:
+        tree = list(build_location_tree(parent_node))
+        cache.set(key, tree, timeout=LOCATION_TREE_CACHE_TIMEOUT)
+    return tree
+
+
+@contextmanager
+def invalidation_suspended():
+    """
+    Ignore per-row invalidations inside the block, for bulk writes that
+    invalidate the tree themselves afterwards
+    """
+    previous = getattr(_pending, "suspended", False)
+    _pending.suspended = True
+    try:
+        yield
+    finally:
+        _pending.suspended = previous
+
+
+def invalidate_tree(tree_id):
+    """Bump the tree's version after the current transaction commits"""
+    if tree_id is None or getattr(_pending, "suspended", False):
+        return
+    _pending_trees().add(tree_id)
+    transaction.on_commit(_flush_invalidations)
+
+
+def invalidate_node_tree(node_id):
+    """Invalidate the tree a node belongs to"""
+    if getattr(_pending, "suspended", False):
+        return
+    tree_id = (
+        LocationNode.objects.filter(id=node_id)
+        .values_list("tree_id", flat=True)
+        .first()
+    )
+    invalidate_tree(tree_id)
+
+
+def _flush_invalidations():
+    pending = _pending_trees()
+    tree_ids = set(pending)
+    pending.clear()
+    for tree_id in tree_ids:
+        try:
+            bump_tree_version(tree_id)
+        except Exception as e:
+            logger.error(f"❌ Failed to invalidate location tree {tree_id}: {e}")
+
+
+def _pending_trees():
+    if not hasattr(_pending, "tree_ids"):
+        _pending.tree_ids = set()
+    return _pending.tree_ids
@@ -10,6 +10,7 @@ from mptt.models import MPTTModel, TreeForeignKey
 
 from accounts.models import City, Users
 from company.models import Branch, Company
+from utils.search import trigram_indexes
 from django.conf import settings
 
 
@@ -157,6 +158,7 @@ class LocationNode(TimeStampedUUIDModel, MPTTModel):
         indexes = [
             models.Index(fields=["node_type", "property_type"]),
             models.Index(fields=["parent"]),
+            *trigram_indexes("location_node", "name"),
         ]
         unique_together = [("parent", "name", "node_type")]
 
@@ -252,7 +254,10 @@ class ProjectDetail(TimeStampedUUIDModel):
         db_table = "project_detail"
         verbose_name = "Project Detail"
         verbose_name_plural = "Project Details"
-        indexes = [models.Index(fields=["status", "project_type"])]
+        indexes = [
+            models.Index(fields=["status", "project_type"]),
+            *trigram_indexes("project", "project_code"),
+        ]
 
     def __str__(self):
         return f"ProjectDetail for {self.node.name}"
@@ -65,16 +65,24 @@ class LocationNodeTreeSerializer(serializers.ModelSerializer):
         ]
 
     def get_children(self, obj):
-        children = list(obj.children.all())
+        # Trees built by properties.location_tree pass every node's children
+        # in the context instead of querying them node by node
+        children_by_parent = self.context.get("children_by_parent")
+        if children_by_parent is not None:
+            children = list(children_by_parent.get(obj.id, []))
+        else:
+            children = [child for child in obj.children.all() if not child.is_deleted]
         children.sort(key=lambda x: natural_keys(x.name))
-        return LocationNodeTreeSerializer(children, many=True).data
+        return LocationNodeTreeSerializer(
+            children, many=True, context=self.context
+        ).data
 
     def get_apartment_details(self, obj):
         """Include ApartmentDetail information when node_type is UNIT"""
         if obj.node_type == "UNIT":
             try:
                 unit_detail = obj.unit_detail
-                return ApartmentDetailSerializer(unit_detail).data
+                return ApartmentDetailSerializer(unit_detail, context=self.context).data
             except UnitDetail.DoesNotExist:
                 return None
         return None
@@ -84,7 +92,7 @@ class LocationNodeTreeSerializer(serializers.ModelSerializer):
         if obj.node_type == "HOUSE":
             try:
                 villa_detail = obj.villa_detail
-                return VillaDetailSerializer(villa_detail).data
+                return VillaDetailSerializer(villa_detail, context=self.context).data
             except VillaDetail.DoesNotExist:
                 return None
         return None
@@ -94,7 +102,7 @@ class LocationNodeTreeSerializer(serializers.ModelSerializer):
         if obj.node_type == "ROOM":
             try:
                 room_detail = obj.room_detail
-                return RoomDetailSerializer(room_detail).data
+                return RoomDetailSerializer(room_detail, context=self.context).data
             except RoomDetail.DoesNotExist:
                 return None
         return None
@@ -185,7 +193,9 @@ class ApartmentDetailSerializer(serializers.ModelSerializer):
         return data
 
     def get_custom_service_charge(self, obj):
-        return format_money_with_currency(obj.service_charge)
+        return format_money_with_currency(
+            obj.service_charge, self.context.get("currency")
+        )
 
 
 class ApartmentCreateSerializer(serializers.Serializer):
@@ -238,7 +248,9 @@ class VillaEditSerializer(serializers.Serializer):
     custom_service_charge = serializers.SerializerMethodField()
 
     def get_custom_service_charge(self, obj):
-        return format_money_with_currency(obj.service_charge)
+        return format_money_with_currency(
+            obj.service_charge, self.context.get("currency")
+        )
 
 
 class ApartmentEditSerializer(serializers.Serializer):
@@ -275,4 +287,6 @@ class VillaDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_custom_service_charge(self, obj):
-        return format_money_with_currency(obj.service_charge)
+        return format_money_with_currency(
+            obj.service_charge, self.context.get("currency")
+        )
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from properties import location_tree
+from properties.models import LocationNode, RoomDetail, UnitDetail, VillaDetail
+
+
+@receiver(post_save, sender=LocationNode)
+@receiver(post_delete, sender=LocationNode)
+def location_node_changed(sender, instance, **kwargs):
+    location_tree.invalidate_tree(instance.tree_id)
+
+
+@receiver(post_save, sender=UnitDetail)
+@receiver(post_delete, sender=UnitDetail)
+@receiver(post_save, sender=VillaDetail)
+@receiver(post_delete, sender=VillaDetail)
+@receiver(post_save, sender=RoomDetail)
+@receiver(post_delete, sender=RoomDetail)
+def location_detail_changed(sender, instance, **kwargs):
+    location_tree.invalidate_node_tree(instance.node_id)
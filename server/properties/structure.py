@@ -9,6 +9,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from properties.bulk_structure import (
+    apply_structure,
+    plan_structure,
+    structure_diff,
+    unit_count,
+)
+from properties.location_tree import build_location_tree, get_location_tree
 from properties.models import (
     BasementDetail,
     BlockDetail,
@@ -34,10 +41,16 @@ from properties.serializers.common import (
     RoomEditSerializer,
     VillaEditSerializer,
 )
+from properties.subtree import delete_subtree, is_in_subtree
 
 CACHE_TIMEOUT = 600  # 10 minutes
 
 
+def is_soft_delete(request):
+    """``?soft=true`` marks the subtree deleted instead of removing it"""
+    return str(request.query_params.get("soft", "")).lower() in ("1", "true")
+
+
 def check_floor_safety(floor_node):
     """
     Check if a floor can be safely deleted (no units or rooms)
@@ -285,9 +298,7 @@ class BlockCreateView(CreateAPIView):
                 created_blocks.append(block_node)
 
             # Instead of returning only created blocks, return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                parent_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(parent_node)
             return Response(
                 {
                     "error": False,
@@ -315,8 +326,7 @@ class LocationNodeTreeView(APIView):
         project = get_object_or_404(ProjectDetail, id=project_id)
         root_node = project.node
         # Instead of serializing the root node, serialize its direct children as the tree root
-        children = root_node.children.all()
-        tree = LocationNodeTreeSerializer(children, many=True).data
+        tree = get_location_tree(root_node)
         return Response(
             {"error": False, "data": {"count": 0, "results": tree}},
             status=status.HTTP_200_OK,
@@ -326,6 +336,15 @@ class LocationNodeTreeView(APIView):
 @extend_schema(
     tags=["Structure"],
     description="Delete all location nodes and their details under a project (except the project node itself). Clears the location tree cache.",
+    parameters=[
+        OpenApiParameter(
+            name="soft",
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            description="Mark the nodes deleted instead of removing them",
+            required=False,
+        ),
+    ],
     responses={200: dict},
 )
 @method_decorator(
@@ -338,15 +357,9 @@ class DeleteLocationTreeView(APIView):
     def delete(self, request, *args, **kwargs):
         project_id = kwargs.get("pk")
         project = get_object_or_404(ProjectDetail, id=project_id)
-        root_node = project.node
-        descendants = root_node.get_descendants()
-        for node in descendants:
-            if node.node_type == "BLOCK":
-                BlockDetail.objects.filter(node=node).delete()
-            elif node.node_type == "FLOOR":
-                FloorDetail.objects.filter(node=node).delete()
-            # Add more detail deletions as needed
-            node.delete()
+        delete_subtree(
+            project.node, include_self=False, soft=is_soft_delete(request)
+        )
         return Response(
             {
                 "error": False,
@@ -450,9 +463,7 @@ class HouseCreateView(CreateAPIView):
                     )
 
             # Return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                parent_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(parent_node)
             return Response(
                 {
                     "error": False,
@@ -552,9 +563,7 @@ class BasementCreateView(CreateAPIView):
                 created_basements.append(basement_node)
 
             # Instead of returning only created basements, return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                parent_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(parent_node)
             return Response(
                 {
                     "error": False,
@@ -646,9 +655,7 @@ class ApartmentCreateView(APIView):
             UnitDetail.objects.create(node=unit_node, **unit_data)
 
             # Return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                project_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(project_node)
             return Response(
                 {
                     "error": False,
@@ -750,9 +757,7 @@ class ApartmentEditView(UpdateAPIView):
             unit_detail.save()
 
             # Return the full tree after update
-            tree = LocationNodeTreeSerializer(
-                project_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(project_node)
             return Response(
                 {
                     "error": False,
@@ -929,9 +934,7 @@ class RoomCreateView(APIView):
             RoomDetail.objects.create(node=room_node, **room_data)
 
             # Return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                project_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(project_node)
             message = f"Room created successfully under {scenario}."
             return Response(
                 {
@@ -1078,9 +1081,7 @@ class RoomEditView(UpdateAPIView):
             room_detail.save()
 
             # Return the full tree after update
-            tree = LocationNodeTreeSerializer(
-                project_node.children.all(), many=True
-            ).data
+            tree = build_location_tree(project_node)
             return Response(
                 {
                     "error": False,
@@ -1160,9 +1161,7 @@ class BlockEditView(UpdateAPIView):
                 if messages:
                     success_message += f" {', '.join(messages)}."
 
-                tree = LocationNodeTreeSerializer(
-                    project_node.children.all(), many=True
-                ).data
+                tree = build_location_tree(project_node)
                 return Response(
                     {
                         "error": False,
@@ -1266,9 +1265,7 @@ class VillaEditView(UpdateAPIView):
                 if messages:
                     success_message += f" {', '.join(messages)}."
 
-                tree = LocationNodeTreeSerializer(
-                    project_node.children.all(), many=True
-                ).data
+                tree = build_location_tree(project_node)
                 return Response(
                     {
                         "error": False,
@@ -1292,6 +1289,15 @@ class VillaEditView(UpdateAPIView):
 @extend_schema(
     tags=["Structure"],
     description="Delete any node (block, unit/apartment, room, house, floor, etc.) and all its descendants. Accepts node_type and id in the request body.",
+    parameters=[
+        OpenApiParameter(
+            name="soft",
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            description="Mark the nodes deleted instead of removing them",
+            required=False,
+        ),
+    ],
     request=NodeDeleteSerializer,
     responses={200: LocationNodeTreeSerializer(many=True)},
 )
@@ -1323,14 +1329,7 @@ class NodeDeleteView(APIView):
             )
 
         # Ensure node is a descendant of the project node
-        current = node
-        is_descendant = False
-        while current.parent is not None:
-            if current.parent == project_node:
-                is_descendant = True
-                break
-            current = current.parent
-        if not is_descendant and node != project_node:
+        if not is_in_subtree(node, project_node):
             return Response(
                 {
                     "error": True,
@@ -1340,29 +1339,9 @@ class NodeDeleteView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        def delete_node_and_descendants(node):
-            # Recursively delete all descendants and their details
-            for child in node.children.all():
-                delete_node_and_descendants(child)
-            # Delete details for this node type
-            if node.node_type == "BLOCK":
-                BlockDetail.objects.filter(node=node).delete()
-            elif node.node_type == "FLOOR":
-                FloorDetail.objects.filter(node=node).delete()
-            elif node.node_type == "UNIT":
-                UnitDetail.objects.filter(node=node).delete()
-            elif node.node_type == "HOUSE":
-                VillaDetail.objects.filter(node=node).delete()
-            elif node.node_type == "ROOM":
-                RoomDetail.objects.filter(node=node).delete()
-            # Delete the node itself
-            node.delete()
-
         with transaction.atomic():
-            delete_node_and_descendants(node)
-            tree = LocationNodeTreeSerializer(
-                project_node.children.all(), many=True
-            ).data
+            delete_subtree(node, soft=is_soft_delete(request))
+            tree = build_location_tree(project_node)
             return Response(
                 {
                     "error": False,
@@ -1376,6 +1355,15 @@ class NodeDeleteView(APIView):
 @extend_schema(
     tags=["Structure"],
     description="Bulk upload structure from Excel format. Creates blocks, floors, and units in one atomic transaction.",
+    parameters=[
+        OpenApiParameter(
+            name="dry_run",
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            description="Return what would be created against the current tree without writing",
+            required=False,
+        ),
+    ],
     request=dict,
     responses={201: LocationNodeTreeSerializer(many=True)},
 )
@@ -1452,6 +1440,18 @@ class BulkStructureUploadView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
+            try:
+                unit_count(row["units"])
+            except (TypeError, ValueError):
+                return Response(
+                    {
+                        "error": True,
+                        "message": f"Row {i + 1} units must be a number or '-'",
+                        "data": None,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
         # Get project and validate it exists
         try:
             project = get_object_or_404(
@@ -1468,20 +1468,6 @@ class BulkStructureUploadView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Check for existing blocks/houses in DB and collect them for potential floor additions
-        existing_blocks = {
-            node.name: node
-            for node in LocationNode.objects.filter(
-                parent=parent_node, node_type="BLOCK", is_deleted=False
-            )
-        }
-        existing_houses = {
-            node.name: node
-            for node in LocationNode.objects.filter(
-                parent=parent_node, node_type="HOUSE", is_deleted=False
-            )
-        }
-
         # Group data by block/house name for processing
         structure_data = {}
         for row in request.data:
@@ -1527,244 +1513,54 @@ class BulkStructureUploadView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        with transaction.atomic():
-            created_blocks = []
-            created_houses = []
-            updated_blocks = []
-            updated_houses = []
-
-            for name, floors_data in structure_data.items():
-                # Check if this structure already exists
-                existing_block = existing_blocks.get(name)
-                existing_house = existing_houses.get(name)
-
-                if existing_block:
-                    # Add floors to existing block
-                    for floor_data in floors_data:
-                        floor_num = floor_data["floor"]
-                        units_count = floor_data["units"]
-
-                        # Check if floor already exists
-                        existing_floor = LocationNode.objects.filter(
-                            parent=existing_block,
-                            node_type="FLOOR",
-                            floor_detail__number=floor_num,
-                            is_deleted=False,
-                        ).first()
-
-                        if existing_floor:
-                            continue
-
-                        # Create new floor under existing block
-                        floor_node = LocationNode.objects.create(
-                            name=f"Floor {floor_num}",
-                            node_type="FLOOR",
-                            parent=existing_block,
-                        )
-                        FloorDetail.objects.create(
-                            node=floor_node,
-                            number=floor_num,
-                            description="",  # Empty string instead of None
-                        )
-
-                        # Create units if specified
-                        if units_count != "-" and units_count > 0:
-                            for unit_num in range(1, units_count + 1):
-                                # Extract letter after "Block " (e.g., "Block A" -> "A")
-                                block_letter = (
-                                    name.split(" ")[-1] if " " in name else name[0]
-                                )
-                                unit_identifier = (
-                                    f"{block_letter}{floor_num}{unit_num:02d}"
-                                )
-
-                                # Create unit node
-                                unit_node = LocationNode.objects.create(
-                                    name=unit_identifier,
-                                    node_type="UNIT",
-                                    parent=floor_node,
-                                )
-
-                                # Create unit detail with default values
-                                UnitDetail.objects.create(
-                                    node=unit_node,
-                                    management_mode="SERVICE_ONLY",  # Default, can be edited later
-                                    status="available",
-                                    identifier=unit_identifier,
-                                    size="",  # Can be edited later
-                                    sale_price=None,
-                                    rental_price=None,
-                                    description="",  # Empty string instead of None
-                                    management_status="for_rent",
-                                    currency=None,
-                                    unit_type=None,
-                                    service_charge=None,
-                                )
-
-                    updated_blocks.append(existing_block)
-
-                elif existing_house:
-                    # Add floors to existing house
-                    for floor_data in floors_data:
-                        floor_num = floor_data["floor"]
-
-                        # Check if floor already exists
-                        existing_floor = LocationNode.objects.filter(
-                            parent=existing_house,
-                            node_type="FLOOR",
-                            floor_detail__number=floor_num,
-                            is_deleted=False,
-                        ).first()
-
-                        if existing_floor:
-                            continue
-
-                        # Create new floor under existing house
-                        floor_node = LocationNode.objects.create(
-                            name=f"Floor {floor_num}",
-                            node_type="FLOOR",
-                            parent=existing_house,
-                        )
-                        FloorDetail.objects.create(
-                            node=floor_node,
-                            number=floor_num,
-                            description="",  # Empty string instead of None
-                        )
-
-                    updated_houses.append(existing_house)
-
-                else:
-                    # Create new structure (block or house)
-                    # Determine if this is a block or house based on units
-                    has_units = any(
-                        floors_data[i]["units"] != "-" for i in range(len(floors_data))
-                    )
-
-                    if has_units:
-                        # This is a BLOCK - create block with floors and units
-                        block_node = LocationNode.objects.create(
-                            name=name,
-                            node_type="BLOCK",
-                            parent=parent_node,
-                        )
-                        BlockDetail.objects.create(
-                            node=block_node,
-                            name=name,
-                            description="",  # Empty string instead of None
-                        )
-                        created_blocks.append(block_node)
-
-                        # Create floors and units
-                        for floor_data in floors_data:
-                            floor_num = floor_data["floor"]
-                            units_count = floor_data["units"]
-
-                            # Create floor
-                            floor_node = LocationNode.objects.create(
-                                name=f"Floor {floor_num}",
-                                node_type="FLOOR",
-                                parent=block_node,
-                            )
-                            FloorDetail.objects.create(
-                                node=floor_node,
-                                number=floor_num,
-                                description="",  # Empty string instead of None
-                            )
-
-                            # Create units if specified
-                            if units_count != "-" and units_count > 0:
-                                for unit_num in range(1, units_count + 1):
-                                    # Extract letter after "Block " (e.g., "Block A" -> "A")
-                                    block_letter = (
-                                        name.split(" ")[-1] if " " in name else name[0]
-                                    )
-                                    unit_identifier = (
-                                        f"{block_letter}{floor_num}{unit_num:02d}"
-                                    )
-
-                                    # Create unit node
-                                    unit_node = LocationNode.objects.create(
-                                        name=unit_identifier,
-                                        node_type="UNIT",
-                                        parent=floor_node,
-                                    )
-
-                                    # Create unit detail with default values
-                                    UnitDetail.objects.create(
-                                        node=unit_node,
-                                        management_mode="SERVICE_ONLY",  # Default, can be edited later
-                                        status="available",
-                                        identifier=unit_identifier,
-                                        size="",  # Can be edited later
-                                        sale_price=None,
-                                        rental_price=None,
-                                        description="",  # Empty string instead of None
-                                        management_status="for_rent",
-                                        currency=None,
-                                        unit_type=None,
-                                        service_charge=None,
-                                    )
-
-                        created_blocks.append(block_node)
-
-                    else:
-                        # This is a HOUSE - create house with floors only
-                        house_node = LocationNode.objects.create(
-                            name=name,
-                            node_type="HOUSE",
-                            parent=parent_node,
-                        )
-                        VillaDetail.objects.create(
-                            node=house_node,
-                            name=name,
-                            management_mode="SERVICE_ONLY",  # Default, can be edited later
-                            service_charge=None,
-                        )
-                        created_houses.append(house_node)
-
-                        # Create floors only (no units)
-                        for floor_data in floors_data:
-                            floor_num = floor_data["floor"]
-
-                            floor_node = LocationNode.objects.create(
-                                name=f"Floor {floor_num}",
-                                node_type="FLOOR",
-                                parent=house_node,
-                            )
-                            FloorDetail.objects.create(
-                                node=floor_node,
-                                number=floor_num,
-                                description="",  # Empty string instead of None
-                            )
-
-            # Return the full tree after creation
-            tree = LocationNodeTreeSerializer(
-                parent_node.children.all(), many=True
-            ).data
-
-            # Build success message
-            success_message = "Bulk structure operation completed successfully. "
-            if created_blocks:
-                success_message += f"Created {len(created_blocks)} new blocks. "
-            if created_houses:
-                success_message += f"Created {len(created_houses)} new houses. "
-            if updated_blocks:
-                success_message += (
-                    f"Added floors to {len(updated_blocks)} existing blocks. "
-                )
-            if updated_houses:
-                success_message += (
-                    f"Added floors to {len(updated_houses)} existing houses. "
-                )
-
+        if str(request.query_params.get("dry_run", "")).lower() in ("1", "true"):
+            diff = structure_diff(plan_structure(parent_node, structure_data))
             return Response(
                 {
                     "error": False,
-                    "message": success_message,
-                    "data": {"count": len(tree), "results": tree},
+                    "message": f"Dry run: {diff['counts']['nodes']} nodes would be created.",
+                    "data": diff,
                 },
-                status=status.HTTP_201_CREATED,
+                status=status.HTTP_200_OK,
+            )
+
+        plan, _ = apply_structure(parent_node, structure_data)
+
+        # Return the full tree after creation
+        tree = build_location_tree(parent_node)
+
+        # Build success message
+        updated = {floor["parent"].id: floor["parent"] for floor in plan["floors"]}
+        updated_blocks = [node for node in updated.values() if node.node_type == "BLOCK"]
+        updated_houses = [node for node in updated.values() if node.node_type == "HOUSE"]
+        success_message = "Bulk structure operation completed successfully. "
+        if plan["blocks"]:
+            success_message += f"Created {len(plan['blocks'])} new blocks. "
+        if plan["houses"]:
+            success_message += f"Created {len(plan['houses'])} new houses. "
+        if updated_blocks:
+            success_message += (
+                f"Added floors to {len(updated_blocks)} existing blocks. "
+            )
+        if updated_houses:
+            success_message += (
+                f"Added floors to {len(updated_houses)} existing houses. "
+            )
+        if plan["conflicts"]:
+            skipped = ", ".join(
+                f"{conflict['node_type'].title()} '{conflict['name']}'"
+                for conflict in plan["conflicts"]
             )
+            success_message += f"Skipped names used by deleted nodes: {skipped}. "
+
+        return Response(
+            {
+                "error": False,
+                "message": success_message,
+                "data": {"count": len(tree), "results": tree},
+            },
+            status=status.HTTP_201_CREATED,
+        )
 
 
 # check apartment number:
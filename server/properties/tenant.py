@@ -6,7 +6,7 @@ from decimal import Decimal, InvalidOperation
 
 from django.core.files.base import ContentFile
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import Sum
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 from drf_spectacular.utils import extend_schema
@@ -37,6 +37,7 @@ from properties.models import (
     UnitDetail,
 )
 from utils.format import format_money_with_currency
+from utils.search import USER_SEARCH_FIELDS, search
 from utils.serilaizer import flatten_errors
 
 from .serializers.tenant import (
@@ -453,16 +454,11 @@ class TenantUserSearchView(APIView):
                 status=status.HTTP_200_OK,
             )
 
-        users = (
-            Users.objects.filter(type=user_type, is_deleted=False)
-            .filter(
-                Q(phone__icontains=q)
-                | Q(email__icontains=q)
-                | Q(first_name__icontains=q)
-                | Q(last_name__icontains=q)
-            )
-            .order_by("first_name", "last_name")[:20]
-        )
+        users = search(
+            Users.objects.filter(type=user_type, is_deleted=False),
+            q,
+            USER_SEARCH_FIELDS,
+        ).order_by("-search_rank", "first_name", "last_name")[:20]
 
         data = TenantUserSerializer(users, many=True).data
         return Response(
@@ -4,6 +4,10 @@ from rest_framework.test import APITestCase, APIClient
 from accounts.models import Users
 from rest_framework import status
 
+from properties.bulk_structure import apply_structure, plan_structure
+from properties.models import FloorDetail, LocationNode
+from properties.subtree import delete_subtree
+
 # Create your tests here.
 
 class TenantOwnerAPITestCase(APITestCase):
@@ -59,3 +63,57 @@ class TenantOwnerAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['isError'], False)
+
+
+class BulkStructureLayoutTestCase(TestCase):
+    def setUp(self):
+        self.project = LocationNode.objects.create(
+            name="Palm Court", node_type="PROJECT"
+        )
+        block = LocationNode.objects.create(
+            name="Block B", node_type="BLOCK", parent=self.project
+        )
+        floor = LocationNode.objects.create(
+            name="Floor 1", node_type="FLOOR", parent=block
+        )
+        FloorDetail.objects.create(node=floor, number=1, description="")
+        LocationNode.objects.create(name="B101", node_type="UNIT", parent=floor)
+
+    def layout(self):
+        return {
+            node_id: (lft, rght, level)
+            for node_id, lft, rght, level in LocationNode.objects.filter(
+                tree_id=self.project.tree_id
+            ).values_list("id", "lft", "rght", "level")
+        }
+
+    def test_layout_matches_mptt_rebuild(self):
+        _, created = apply_structure(
+            self.project,
+            {
+                # New block sorting before the existing one
+                "Block A": [{"floor": 1, "units": 2}, {"floor": 2, "units": 1}],
+                # Existing floor 1 is kept, floor 2 is added after it
+                "Block B": [{"floor": 1, "units": 3}, {"floor": 2, "units": 2}],
+                "Villa C": [{"floor": 1, "units": "-"}],
+            },
+        )
+        self.assertEqual(created, 11)
+
+        applied = self.layout()
+        LocationNode.objects.partial_rebuild(self.project.tree_id)
+        self.assertEqual(applied, self.layout())
+
+        root = LocationNode.objects.get(id=self.project.id)
+        self.assertEqual((root.lft, root.rght), (1, 2 * len(applied)))
+
+    def test_names_of_soft_deleted_nodes_are_conflicts(self):
+        block = LocationNode.objects.get(name="Block B")
+        delete_subtree(block, soft=True)
+
+        plan = plan_structure(self.project, {"Block B": [{"floor": 1, "units": 2}]})
+
+        self.assertEqual(plan["blocks"], [])
+        (conflict,) = plan["conflicts"]
+        self.assertEqual(conflict["name"], "Block B")
+        self.assertEqual(conflict["node_type"], "BLOCK")
@@ -5,6 +5,7 @@ from .views import (
     ProfitLossReportView,
     CashFlowReportView,
     BalanceSheetReportView,
+    ExportStatusView,
 )
 
 urlpatterns = [
@@ -18,4 +19,8 @@ urlpatterns = [
     path("profit-loss/", ProfitLossReportView.as_view(), name="profit-loss-report"),
     path("cash-flow/", CashFlowReportView.as_view(), name="cash-flow-report"),
     path("balance-sheet/", BalanceSheetReportView.as_view(), name="balance-sheet-report"),
+    # Background CSV/XLSX exports (?export=csv|xlsx&background=true)
+    path(
+        "exports/<uuid:export_id>/", ExportStatusView.as_view(), name="export-status"
+    ),
 ]
@@ -1,11 +1,19 @@
 from django.db.models import Sum, Q, Count
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 from collections import defaultdict
 import re
 
-from payments.models import Receipt, Payout, Expense, Invoice, InvoiceItem
+from payments.financial_facts import month_start
+from payments.models import (
+    Receipt,
+    Payout,
+    Expense,
+    FinancialFact,
+    Invoice,
+    InvoiceItem,
+)
 from properties.models import (
     PropertyService,
     LocationNode,
@@ -16,6 +24,7 @@ from properties.models import (
     UnitDetail,
     VillaDetail,
 )
+from utils.currency import get_serialized_default_currency
 from utils.format import format_money_with_currency
 
 
@@ -155,6 +164,31 @@ def get_date_range_from_request(request):
     return parsed_date_from, parsed_date_to
 
 
+def facts_cover(date_from, date_to):
+    """
+    Check whether a date range can be answered from the monthly fact table.
+
+    Facts hold whole months, so the range must start on the first of a month
+    and end on the last day of a month, or run up to today within the
+    current month.
+    """
+    if not date_from or not date_to or date_from > date_to or date_from.day != 1:
+        return False
+    today = timezone.now().date()
+    if date_to >= today and month_start(date_to) == month_start(today):
+        return True
+    return (date_to + timedelta(days=1)).day == 1
+
+
+def financial_facts(date_from, date_to):
+    """
+    Fact rows for the months of a range accepted by ``facts_cover``
+    """
+    return FinancialFact.objects.filter(
+        month__gte=month_start(date_from), month__lte=date_to
+    )
+
+
 def calculate_project_total_collections(project, date_from=None, date_to=None):
     """
     Calculate total collections for a project from service invoices
@@ -325,6 +359,118 @@ def calculate_project_expenditures_by_service(project, date_from=None, date_to=N
     return service_expenditures
 
 
+def _project_service_collections(project, service, current_year, date_from, date_to):
+    """
+    Monthly totals of a service billed to the project's owners, from invoices
+    """
+    # Get all owners for this project (including owners of units, houses, and the project itself)
+    all_project_nodes = project.get_descendants(include_self=True)
+    all_owners = PropertyOwner.objects.filter(node__in=all_project_nodes)
+
+    # Get only invoices that are BILLED TO OWNERS (not invoices for properties they own)
+    # This filters to only show expenses that are charged to owners
+    owner_invoices = Invoice.objects.filter(
+        owners__in=all_owners  # Only invoices where owners are being billed
+    ).distinct()
+
+    # Apply date filters to invoices
+    if date_from:
+        owner_invoices = owner_invoices.filter(created_at__date__gte=date_from)
+    if date_to:
+        owner_invoices = owner_invoices.filter(created_at__date__lte=date_to)
+
+    # Get service items from these invoices that are linked to this specific Service
+    # We filter by the Service (not PropertyService) and the service's pricing type
+    service_items = InvoiceItem.objects.filter(
+        invoice__in=owner_invoices,
+        service__service=service,  # Link to the Service through PropertyService
+        type=service.pricing_type,  # Filter by the service's pricing type (FIXED, VARIABLE, PERCENTAGE)
+    ).select_related("invoice")
+
+    # Group by month using invoice created_at
+    monthly_totals = defaultdict(float)
+    for item in service_items:
+        invoice_month = item.invoice.created_at.month
+        invoice_year = item.invoice.created_at.year
+
+        # Only include current year data
+        if invoice_year == current_year:
+            monthly_totals[invoice_month] += float(item.price)
+
+    return monthly_totals
+
+
+def _owner_service_facts(current_year):
+    """
+    Owner-billed service collections and paid service expenses per project,
+    in two grouped queries over the fact table.
+
+    Returns:
+        tuple: ({(tree_id, service_id, category): {month: amount}},
+                {(tree_id, service_id): {month_date: amount}})
+    """
+    collections = defaultdict(lambda: defaultdict(float))
+    for row in (
+        FinancialFact.objects.filter(billed_to="OWNER", month__year=current_year)
+        .exclude(category=FinancialFact.EXPENSE_CATEGORY)
+        .values("node__tree_id", "service_id", "category", "month")
+        .annotate(total=Sum("billed_amount"))
+    ):
+        key = (row["node__tree_id"], row["service_id"], row["category"])
+        collections[key][row["month"].month] += float(row["total"] or 0)
+
+    expenses = defaultdict(lambda: defaultdict(float))
+    for row in (
+        FinancialFact.objects.filter(
+            category=FinancialFact.EXPENSE_CATEGORY, service__isnull=False
+        )
+        .values("node__tree_id", "service_id", "month")
+        .annotate(total=Sum("expense_paid_amount"))
+    ):
+        key = (row["node__tree_id"], row["service_id"])
+        expenses[key][row["month"]] += float(row["total"] or 0)
+
+    return collections, expenses
+
+
+def _project_expenditures_from_facts(project, owner_expenses):
+    """
+    Same shape as ``calculate_project_expenditures_by_service``, built from
+    the paid expense facts of the project's owner-billed services
+    """
+    project_units = LocationNode.objects.filter(
+        node_type="UNIT",
+        tree_id=project.tree_id,
+        lft__gt=project.lft,
+        rght__lt=project.rght,
+    )
+    owner_billed_services = {
+        property_service.service_id: property_service.service
+        for property_service in PropertyService.objects.filter(
+            property_node__in=project_units,
+            status="ACTIVE",
+            service__billed_to="OWNER",
+        ).select_related("service")
+    }
+
+    current_year = datetime.now().year
+    service_expenditures = {}
+    for service_id, service in owner_billed_services.items():
+        months = owner_expenses.get((project.tree_id, service_id))
+        if not months:
+            continue
+        monthly_breakdown = defaultdict(float)
+        for month, amount in months.items():
+            if month.year == current_year:
+                monthly_breakdown[month.month] += amount
+        service_expenditures[str(service_id)] = {
+            "service": service,
+            "total_amount": sum(months.values()),
+            "monthly_breakdown": monthly_breakdown,
+        }
+    return service_expenditures
+
+
 def get_project_summary_data(date_from=None, date_to=None):
     """
     Get project summary data for ProjectSummaryReport component
@@ -357,6 +503,13 @@ def get_project_summary_data(date_from=None, date_to=None):
         for i in range(1, 13)
     ]
 
+    # Without date filters every project reads the current year from the
+    # monthly fact table instead of querying invoice items per service
+    owner_collections = None
+    owner_expenses = None
+    if not date_from and not date_to:
+        owner_collections, owner_expenses = _owner_service_facts(current_year)
+
     for project in projects:
         # Get all units under this project for unit count
         units_count = LocationNode.objects.filter(
@@ -409,40 +562,14 @@ def get_project_summary_data(date_from=None, date_to=None):
                     "monthly_breakdown": monthly_data,
                 }
 
-            # Calculate cost based on actual invoice collections
-            # Get all owners for this project (including owners of units, houses, and the project itself)
-            all_project_nodes = project.get_descendants(include_self=True)
-            all_owners = PropertyOwner.objects.filter(node__in=all_project_nodes)
-
-            # Get only invoices that are BILLED TO OWNERS (not invoices for properties they own)
-            # This filters to only show expenses that are charged to owners
-            owner_invoices = Invoice.objects.filter(
-                owners__in=all_owners  # Only invoices where owners are being billed
-            ).distinct()
-
-            # Apply date filters to invoices
-            if date_from:
-                owner_invoices = owner_invoices.filter(created_at__date__gte=date_from)
-            if date_to:
-                owner_invoices = owner_invoices.filter(created_at__date__lte=date_to)
-
-            # Get service items from these invoices that are linked to this specific Service
-            # We filter by the Service (not PropertyService) and the service's pricing type
-            service_items = InvoiceItem.objects.filter(
-                invoice__in=owner_invoices,
-                service__service=service,  # Link to the Service through PropertyService
-                type=service.pricing_type,  # Filter by the service's pricing type (FIXED, VARIABLE, PERCENTAGE)
-            ).select_related("invoice")
-
-            # Group by month using invoice created_at
-            monthly_totals = defaultdict(float)
-            for item in service_items:
-                invoice_month = item.invoice.created_at.month
-                invoice_year = item.invoice.created_at.year
-
-                # Only include current year data
-                if invoice_year == current_year:
-                    monthly_totals[invoice_month] += float(item.price)
+            if owner_collections is not None:
+                monthly_totals = owner_collections.get(
+                    (project.tree_id, service.id, service.pricing_type), {}
+                )
+            else:
+                monthly_totals = _project_service_collections(
+                    project, service, current_year, date_from, date_to
+                )
 
             # Update monthly breakdown
             total_cost = 0
@@ -538,9 +665,21 @@ def get_project_summary_data(date_from=None, date_to=None):
                     )
                     total_collections += numeric_value
 
-        total_expenditures = calculate_project_total_expenditures(
-            project, date_from, date_to
-        )
+        if owner_expenses is not None:
+            service_expenditures = _project_expenditures_from_facts(
+                project, owner_expenses
+            )
+            total_expenditures = sum(
+                data["total_amount"] for data in service_expenditures.values()
+            )
+        else:
+            total_expenditures = calculate_project_total_expenditures(
+                project, date_from, date_to
+            )
+            # Get expenditure breakdown by service
+            service_expenditures = calculate_project_expenditures_by_service(
+                project, date_from, date_to
+            )
         # Convert both to float for consistent calculation
         total_collections = float(total_collections)
         total_expenditures = float(total_expenditures)
@@ -552,11 +691,6 @@ def get_project_summary_data(date_from=None, date_to=None):
         print(f"Total Expenditures: {total_expenditures}")
         print(f"Balance: {balance}")
 
-        # Get expenditure breakdown by service
-        service_expenditures = calculate_project_expenditures_by_service(
-            project, date_from, date_to
-        )
-
         # Add financial summary to the project data
         project_data[-1]["financial_summary"] = {
             "totalCollections": format_money_with_currency(total_collections),
@@ -697,7 +831,11 @@ def get_unit_tenant_info(unit, date_from, date_to):
         is_deleted=False,
     )
 
-    if not active_tenants.exists():
+    return _tenant_info(active_tenants.first())
+
+
+def _tenant_info(tenant):
+    if not tenant:
         return {
             "tenant_name": None,
             "tenant_email": None,
@@ -706,7 +844,6 @@ def get_unit_tenant_info(unit, date_from, date_to):
             "lease_end_date": None,
         }
 
-    tenant = active_tenants.first()
     return {
         "tenant_name": tenant.tenant_user.get_full_name() if tenant else None,
         "tenant_email": tenant.tenant_user.email if tenant else None,
@@ -724,6 +861,10 @@ def get_unit_owner_info(unit):
     """
     owner = PropertyOwner.objects.filter(node=unit, is_deleted=False).first()
 
+    return _owner_info(owner)
+
+
+def _owner_info(owner):
     return {
         "owner_name": (
             owner.owner_user.get_full_name() if owner and owner.owner_user else None
@@ -787,25 +928,92 @@ def get_unit_attached_services(unit, date_from, date_to):
     return attached_services
 
 
+def _unit_billing(unit_ids, date_from, date_to):
+    """
+    Billed rent per unit and billed amount per (unit, service) for a range,
+    read from the monthly fact table when the range covers whole months
+    """
+    if facts_cover(date_from, date_to):
+        rows = (
+            financial_facts(date_from, date_to)
+            .filter(node_id__in=unit_ids)
+            .exclude(category=FinancialFact.EXPENSE_CATEGORY)
+            .values_list("node_id", "category", "service_id")
+            .annotate(total=Sum("billed_amount"))
+        )
+    else:
+        rows = (
+            InvoiceItem.objects.filter(
+                invoice__property_id__in=unit_ids,
+                invoice__issue_date__range=[date_from, date_to],
+                invoice__is_deleted=False,
+            )
+            .values_list("invoice__property_id", "type", "service__service_id")
+            .annotate(total=Sum("price"))
+        )
+
+    rent_by_unit = defaultdict(Decimal)
+    billed_by_service = defaultdict(Decimal)
+    for node_id, category, service_id, total in rows:
+        total = total or Decimal("0")
+        if category == "RENT":
+            rent_by_unit[node_id] += total
+        if service_id:
+            billed_by_service[(node_id, service_id)] += total
+    return rent_by_unit, billed_by_service
+
+
 def get_per_unit_summary_data(date_from=None, date_to=None):
     """
     Get per unit and house summary data for PerUnitSummaryReport component
     """
+    currency = get_serialized_default_currency()
+
     # Get all projects
-    projects = LocationNode.objects.filter(node_type="PROJECT", is_deleted=False)
+    projects = list(LocationNode.objects.filter(node_type="PROJECT", is_deleted=False))
+
+    # Projects are tree roots, so their units and houses share the tree_id
+    units_by_tree = defaultdict(list)
+    for unit in LocationNode.objects.filter(
+        node_type__in=["UNIT", "HOUSE"],
+        tree_id__in=[project.tree_id for project in projects],
+        is_deleted=False,
+    ).select_related("unit_detail", "villa_detail"):
+        units_by_tree[unit.tree_id].append(unit)
+    unit_ids = [unit.id for units in units_by_tree.values() for unit in units]
+
+    # First active tenant per unit; units without one are vacant
+    tenants = {
+        tenant.node_id: tenant
+        for tenant in PropertyTenant.objects.filter(
+            node_id__in=unit_ids,
+            contract_start__lte=date_to,
+            contract_end__gte=date_from,
+            is_deleted=False,
+        )
+        .select_related("tenant_user")
+        .order_by("node_id", "id")
+        .distinct("node_id")
+    }
+    owners = {
+        owner.node_id: owner
+        for owner in PropertyOwner.objects.filter(
+            node_id__in=unit_ids, is_deleted=False
+        ).select_related("owner_user")
+    }
+    services_by_unit = defaultdict(list)
+    for property_service in PropertyService.objects.filter(
+        property_node_id__in=unit_ids, status="ACTIVE", is_deleted=False
+    ).select_related("service"):
+        services_by_unit[property_service.property_node_id].append(property_service)
+
+    rent_by_unit, billed_by_service = _unit_billing(unit_ids, date_from, date_to)
 
     units_data = []
     projects_data = []
 
     for project in projects:
-        # Get all units and houses under this project
-        project_units = LocationNode.objects.filter(
-            node_type__in=["UNIT", "HOUSE"],
-            tree_id=project.tree_id,
-            lft__gte=project.lft,
-            rght__lte=project.rght,
-            is_deleted=False,
-        )
+        project_units = units_by_tree.get(project.tree_id, [])
 
         # Project totals for summary
         project_total_rent = Decimal("0")
@@ -813,53 +1021,58 @@ def get_per_unit_summary_data(date_from=None, date_to=None):
         project_total_services = Decimal("0")
 
         for unit in project_units:
-            # Check if unit is vacant
-            is_vacant = is_unit_vacant(unit, date_from, date_to)
-
-            if is_vacant:
-                collected_rent = Decimal("0")
-                services_fee = Decimal("0")
-                occupancy_status = "VACANT"
-                tenant_info = {
-                    "tenant_name": None,
-                    "tenant_email": None,
-                    "tenant_phone": None,
-                    "lease_start_date": None,
-                    "lease_end_date": None,
-                }
-            else:
-                # Get collected rent
-                collected_rent = get_unit_collected_rent(unit, date_from, date_to)
+            tenant = tenants.get(unit.id)
+
+            attached_services = []
+            services_fee = Decimal("0")
+            for property_service in services_by_unit.get(unit.id, []):
+                service = property_service.service
+                if service.pricing_type == "FIXED":
+                    service_cost = service.base_price or Decimal("0")
+                else:
+                    # For variable services, use what was invoiced
+                    service_cost = billed_by_service.get(
+                        (unit.id, service.id), Decimal("0")
+                    )
 
-                # Get services fee
-                services_fee = get_unit_services_fee(unit, date_from, date_to)
+                # Services fee only counts tenant-billed services of occupied units
+                if tenant and service.billed_to == "TENANT":
+                    services_fee += service_cost
+
+                attached_services.append(
+                    {
+                        "id": str(property_service.id),
+                        "name": service.name,
+                        "cost": format_money_with_currency(service_cost, currency),
+                        "description": service.description,
+                    }
+                )
 
+            if tenant:
+                collected_rent = rent_by_unit.get(unit.id, Decimal("0"))
                 occupancy_status = "OCCUPIED"
-
-                # Get tenant information
-                tenant_info = get_unit_tenant_info(unit, date_from, date_to)
+            else:
+                collected_rent = Decimal("0")
+                occupancy_status = "VACANT"
+            tenant_info = _tenant_info(tenant)
 
             # Get service charge directly from unit/house
             service_charge = get_unit_service_charge(unit)
 
-            # Get owner information
-            owner_info = get_unit_owner_info(unit)
-
-            # Get attached services
-            attached_services = get_unit_attached_services(unit, date_from, date_to)
+            owner_info = _owner_info(owners.get(unit.id))
 
             unit_data = {
                 "id": str(unit.id),
                 "name": unit.name,
                 "projectId": str(project.id),
                 "projectName": project.name,
-                "rentFee": format_money_with_currency(collected_rent),
-                "serviceCharge": format_money_with_currency(service_charge),
-                "serviceFee": format_money_with_currency(services_fee),
-                "totalIncome": format_money_with_currency(collected_rent),
-                "totalExpenses": format_money_with_currency(services_fee),
+                "rentFee": format_money_with_currency(collected_rent, currency),
+                "serviceCharge": format_money_with_currency(service_charge, currency),
+                "serviceFee": format_money_with_currency(services_fee, currency),
+                "totalIncome": format_money_with_currency(collected_rent, currency),
+                "totalExpenses": format_money_with_currency(services_fee, currency),
                 "netIncome": format_money_with_currency(
-                    collected_rent + service_charge + services_fee
+                    collected_rent + service_charge + services_fee, currency
                 ),
                 "occupancyStatus": occupancy_status,
                 "tenantName": tenant_info["tenant_name"],
@@ -886,17 +1099,22 @@ def get_per_unit_summary_data(date_from=None, date_to=None):
                 "id": str(project.id),
                 "name": project.name,
                 "summary": {
-                    "collectedRent": format_money_with_currency(project_total_rent),
+                    "collectedRent": format_money_with_currency(
+                        project_total_rent, currency
+                    ),
                     "serviceCharge": format_money_with_currency(
-                        project_total_service_charge
+                        project_total_service_charge, currency
+                    ),
+                    "servicesFee": format_money_with_currency(
+                        project_total_services, currency
                     ),
-                    "servicesFee": format_money_with_currency(project_total_services),
                     "net": format_money_with_currency(
                         project_total_rent
                         + project_total_service_charge
-                        + project_total_services
+                        + project_total_services,
+                        currency,
                     ),
-                    "unitsCount": project_units.count(),
+                    "unitsCount": len(project_units),
                 },
             }
         )
@@ -1491,25 +1709,38 @@ def get_profit_loss_data(date_from=None, date_to=None):
     if not date_to:
         date_to = timezone.now().date()
 
-    # Calculate Revenue (from invoices)
-    revenue_items = InvoiceItem.objects.filter(
-        invoice__issue_date__range=[date_from, date_to],
-        invoice__is_deleted=False,
-        type__in=["RENT", "SERVICE_CHARGE", "UTILITY", "PENALTY"]
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # Calculate Expenses
-    expenses = Expense.objects.filter(
-        invoice_date__range=[date_from, date_to],
-        is_deleted=False
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    revenue_types = ["RENT", "SERVICE_CHARGE", "UTILITY", "PENALTY"]
 
-    # Calculate Management Fees (from service charges)
-    management_fees = InvoiceItem.objects.filter(
-        invoice__issue_date__range=[date_from, date_to],
-        invoice__is_deleted=False,
-        type="SERVICE_CHARGE"
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    if facts_cover(date_from, date_to):
+        # Whole months: one aggregate over the monthly fact table
+        totals = financial_facts(date_from, date_to).aggregate(
+            revenue=Sum('billed_item_amount', filter=Q(category__in=revenue_types)),
+            expenses=Sum('expense_amount'),
+            management_fees=Sum('management_fee_amount'),
+        )
+        revenue_items = totals['revenue'] or Decimal('0')
+        expenses = totals['expenses'] or Decimal('0')
+        management_fees = totals['management_fees'] or Decimal('0')
+    else:
+        # Calculate Revenue (from invoices)
+        revenue_items = InvoiceItem.objects.filter(
+            invoice__issue_date__range=[date_from, date_to],
+            invoice__is_deleted=False,
+            type__in=revenue_types
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        # Calculate Expenses
+        expenses = Expense.objects.filter(
+            invoice_date__range=[date_from, date_to],
+            is_deleted=False
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        # Calculate Management Fees (from service charges)
+        management_fees = InvoiceItem.objects.filter(
+            invoice__issue_date__range=[date_from, date_to],
+            invoice__is_deleted=False,
+            type="SERVICE_CHARGE"
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
 
     # Calculate Net Income
     net_income = revenue_items - expenses
@@ -1549,24 +1780,34 @@ def get_cash_flow_data(date_from=None, date_to=None):
     if not date_to:
         date_to = timezone.now().date()
 
-    # Operating Activities
-    cash_from_rent = InvoiceItem.objects.filter(
-        invoice__issue_date__range=[date_from, date_to],
-        invoice__is_deleted=False,
-        type="RENT"
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    cash_from_services = InvoiceItem.objects.filter(
-        invoice__issue_date__range=[date_from, date_to],
-        invoice__is_deleted=False,
-        type="SERVICE_CHARGE"
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # Operating Expenses
-    operating_expenses = Expense.objects.filter(
-        invoice_date__range=[date_from, date_to],
-        is_deleted=False
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    if facts_cover(date_from, date_to):
+        totals = financial_facts(date_from, date_to).aggregate(
+            rent=Sum('billed_item_amount', filter=Q(category="RENT")),
+            services=Sum('billed_item_amount', filter=Q(category="SERVICE_CHARGE")),
+            expenses=Sum('expense_amount'),
+        )
+        cash_from_rent = totals['rent'] or Decimal('0')
+        cash_from_services = totals['services'] or Decimal('0')
+        operating_expenses = totals['expenses'] or Decimal('0')
+    else:
+        # Operating Activities
+        cash_from_rent = InvoiceItem.objects.filter(
+            invoice__issue_date__range=[date_from, date_to],
+            invoice__is_deleted=False,
+            type="RENT"
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        cash_from_services = InvoiceItem.objects.filter(
+            invoice__issue_date__range=[date_from, date_to],
+            invoice__is_deleted=False,
+            type="SERVICE_CHARGE"
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        # Operating Expenses
+        operating_expenses = Expense.objects.filter(
+            invoice_date__range=[date_from, date_to],
+            is_deleted=False
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
 
     # Net Operating Cash Flow
     net_operating_cash = (cash_from_rent + cash_from_services) - operating_expenses
@@ -1631,10 +1872,15 @@ def get_balance_sheet_data(date_from=None, date_to=None):
 
     # Liabilities
     # Current Liabilities
-    total_payables = Expense.objects.filter(
-        invoice_date__range=[date_from, date_to],
-        is_deleted=False
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    if facts_cover(date_from, date_to):
+        total_payables = financial_facts(date_from, date_to).aggregate(
+            total=Sum('expense_amount')
+        )['total'] or Decimal('0')
+    else:
+        total_payables = Expense.objects.filter(
+            invoice_date__range=[date_from, date_to],
+            is_deleted=False
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
 
     # Long-term Liabilities (placeholder)
     long_term_liabilities = Decimal('500000')  # Placeholder value
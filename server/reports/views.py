@@ -1,3 +1,4 @@
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.generics import RetrieveAPIView, ListAPIView
 from rest_framework.views import APIView
@@ -5,6 +6,8 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from datetime import datetime
 
+from utils.export import ExportMixin, get_export_status
+
 from .serializer import (
     ServicesReportResponseSerializer,
     ServiceSummaryReportResponseSerializer,
@@ -95,17 +98,22 @@ from .utils import (
 #                 },
 #                 status=500,
 #             )
-class PerUnitSummaryReportView(APIView):
+class PerUnitSummaryReportView(ExportMixin, APIView):
     """
     DRF Generic View for PerUnitSummaryReport component
     """
 
     permission_classes = [IsAuthenticated]
+    export_filename = "per-unit-summary"
+    export_results_key = "data.units"
 
     def get(self, request):
         """
         Get per unit summary report for the specified date range
         """
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from request
             date_from_str = request.query_params.get("date_from")
@@ -145,17 +153,22 @@ class PerUnitSummaryReportView(APIView):
             )
 
 
-class ServicesReportView(APIView):
+class ServicesReportView(ExportMixin, APIView):
     """
     DRF Generic View for ServicesReport component and Service Summary Report
     """
 
     permission_classes = [IsAuthenticated]
+    export_filename = "services-report"
+    export_results_key = "data.services"
 
     def get(self, request):
         """
         Get services report or service summary report based on request parameters
         """
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Check if this is a service summary report request
             report_type = request.query_params.get("report_type", "services")
@@ -238,17 +251,22 @@ class ServicesReportView(APIView):
         )
 
 
-class ProfitLossReportView(APIView):
+class ProfitLossReportView(ExportMixin, APIView):
     """
     DRF View for Profit and Loss Report
     """
 
     permission_classes = [IsAuthenticated]
+    export_filename = "profit-loss"
+    export_results_key = "data"
 
     def get(self, request):
         """
         Get Profit and Loss report data
         """
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from request
             date_from_str = request.query_params.get("date_from")
@@ -288,17 +306,22 @@ class ProfitLossReportView(APIView):
             )
 
 
-class CashFlowReportView(APIView):
+class CashFlowReportView(ExportMixin, APIView):
     """
     DRF View for Cash Flow Report
     """
 
     permission_classes = [IsAuthenticated]
+    export_filename = "cash-flow"
+    export_results_key = "data"
 
     def get(self, request):
         """
         Get Cash Flow report data
         """
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from request
             date_from_str = request.query_params.get("date_from")
@@ -338,17 +361,22 @@ class CashFlowReportView(APIView):
             )
 
 
-class BalanceSheetReportView(APIView):
+class BalanceSheetReportView(ExportMixin, APIView):
     """
     DRF View for Balance Sheet Report
     """
 
     permission_classes = [IsAuthenticated]
+    export_filename = "balance-sheet"
+    export_results_key = "data"
 
     def get(self, request):
         """
         Get Balance Sheet report data
         """
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from request
             date_from_str = request.query_params.get("date_from")
@@ -386,3 +414,36 @@ class BalanceSheetReportView(APIView):
                 },
                 status=500,
             )
+
+
+class ExportStatusView(APIView):
+    """Progress of a background export and, once done, its download URL"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, export_id):
+        progress = get_export_status(export_id, user=request.user)
+        if progress is None:
+            return Response(
+                {
+                    "error": True,
+                    "message": "Export not found or expired",
+                    "data": None,
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return Response(
+            {
+                "error": False,
+                "message": f"Export {progress.get('status', 'running')}",
+                "data": {
+                    "export_id": str(export_id),
+                    "status": progress.get("status"),
+                    "format": progress.get("format"),
+                    "rows": progress.get("completed", 0),
+                    "url": progress.get("url"),
+                    "message": progress.get("message"),
+                },
+            }
+        )
@@ -11,6 +11,7 @@ from properties.models import LocationNode
 from accounts.models import Users
 from sales.models import PaymentPlanTemplate
 from utils.custom_pagination import CustomPageNumberPagination
+from utils.search import USER_SEARCH_FIELDS, search
 from .search_serializer import (
     ProjectSearchSerializer,
     ProjectStructureSerializer,
@@ -79,11 +80,10 @@ class ProjectSearchView(ListAPIView):
             "children__children__unit_detail",
         )
 
-        # Apply search filters
-        queryset = queryset.filter(
-            Q(name__icontains=search_query)
-            | Q(project_detail__project_code__icontains=search_query)
-        )
+        # Apply search filters, best matches first
+        queryset = search(
+            queryset, search_query, ["name", "project_detail__project_code"]
+        ).order_by("-search_rank", "name")
 
         # Filter to include projects that have units OR houses (OR both)
         print(f"DEBUG: Queryset: {queryset.count()}")
@@ -379,16 +379,11 @@ class OwnerSearchView(ListAPIView):
             # For owners and agents, just prefetch city
             queryset = queryset.prefetch_related("city")
 
-        # Apply search filters
-        queryset = queryset.filter(
-            Q(first_name__icontains=search_query)
-            | Q(last_name__icontains=search_query)
-            | Q(email__icontains=search_query)
-            | Q(phone__icontains=search_query)
+        # Apply search filters, best matches first
+        return search(queryset, search_query, USER_SEARCH_FIELDS).order_by(
+            "-search_rank", "first_name", "last_name"
         )
 
-        return queryset
-
     def list(self, request, *args, **kwargs):
         """
         Override list method to provide custom response format.
@@ -443,6 +438,13 @@ class OwnerSearchView(ListAPIView):
     tags=["PaymentPlanTemplates"],
     description="Get payment plan templates for the wizard with optional filtering.",
     parameters=[
+        OpenApiParameter(
+            name="q",
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description="Search template name and description (best matches first)",
+            required=False,
+        ),
         OpenApiParameter(
             name="category",
             type=str,
@@ -495,6 +497,7 @@ class PaymentPlanTemplateView(ListAPIView):
         """
         Get queryset with filters applied.
         """
+        search_query = self.request.query_params.get("q", "").strip()
         category = self.request.query_params.get("category", "").strip()
         property_price = self.request.query_params.get("property_price")
         featured = self.request.query_params.get("featured", "false").lower() == "true"
@@ -524,6 +527,11 @@ class PaymentPlanTemplateView(ListAPIView):
                 # If property_price is invalid, ignore the filter
                 pass
 
+        if search_query:
+            return search(queryset, search_query, ["name", "description"]).order_by(
+                "-search_rank", "sort_order", "name"
+            )
+
         return queryset.order_by("sort_order", "category", "name")
 
     def list(self, request, *args, **kwargs):
@@ -6,6 +6,7 @@ from django.utils import timezone
 from accounts.models import Users
 from company.models import TimeStampedUUIDModel
 from properties.models import LocationNode
+from utils.search import trigram_indexes
 
 
 class PaymentPlanTemplate(TimeStampedUUIDModel):
@@ -122,6 +123,7 @@ class PaymentPlanTemplate(TimeStampedUUIDModel):
             models.Index(fields=["frequency", "is_active"]),
             models.Index(fields=["deposit_percentage"]),
             models.Index(fields=["is_featured", "is_active"]),
+            *trigram_indexes("payment_plan", "name", "description"),
         ]
 
     def __str__(self):
@@ -6,20 +6,26 @@ from django.utils import timezone
 
 from sales.models import SaleCommission
 from payments.models import Expense
+from utils.export import ExportMixin
 from .agent_payouts_serializers import (
     AgentPayoutsReportSerializer,
     AgentPayoutsQuerySerializer,
 )
 
 
-class AgentPayoutsReportView(ListAPIView):
+class AgentPayoutsReportView(ExportMixin, ListAPIView):
     serializer_class = AgentPayoutsReportSerializer
     query_serializer = AgentPayoutsQuerySerializer
+    export_filename = "agent-payouts"
+    export_results_key = "data.agentPayouts"
 
     def get_queryset(self):
         return SaleCommission.objects.all()
 
     def list(self, request, *args, **kwargs):
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         try:
             query_serializer = self.query_serializer(data=request.query_params)
             query_serializer.is_valid(raise_exception=True)
@@ -6,13 +6,14 @@ from django.utils import timezone
 from django.db.models.functions import TruncMonth
 
 from sales.models import PaymentSchedule
+from utils.export import ExportMixin
 from .financial_collections_serializers import (
     FinancialCollectionsReportSerializer,
     FinancialCollectionsQuerySerializer,
 )
 
 
-class FinancialCollectionsReportView(ListAPIView):
+class FinancialCollectionsReportView(ExportMixin, ListAPIView):
     """
     View for Financial Collections Summary report.
     Returns expected vs collected amounts by month within a date range.
@@ -20,6 +21,8 @@ class FinancialCollectionsReportView(ListAPIView):
 
     serializer_class = FinancialCollectionsReportSerializer
     query_serializer = FinancialCollectionsQuerySerializer
+    export_filename = "financial-collections"
+    export_results_key = "data.monthlyData"
 
     def get_queryset(self):
         """Get queryset for payment schedules"""
@@ -27,6 +30,9 @@ class FinancialCollectionsReportView(ListAPIView):
 
     def list(self, request, *args, **kwargs):
         """Generate Financial Collections Summary report"""
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         try:
             # Validate query parameters
             query_serializer = self.query_serializer(data=request.query_params)
@@ -5,13 +5,14 @@ from django.db.models import Sum
 from django.utils import timezone
 
 from sales.models import PaymentSchedule
+from utils.export import EXPORT_CHUNK_SIZE, ExportMixin
 from .outstanding_payments_serializers import (
     OutstandingPaymentsReportSerializer,
     OutstandingPaymentsQuerySerializer,
 )
 
 
-class OutstandingPaymentsReportView(ListAPIView):
+class OutstandingPaymentsReportView(ExportMixin, ListAPIView):
     """
     View for Outstanding Payments & Follow-ups report.
     Returns outstanding payment installments within a date range.
@@ -19,46 +20,55 @@ class OutstandingPaymentsReportView(ListAPIView):
 
     serializer_class = OutstandingPaymentsReportSerializer
     query_serializer = OutstandingPaymentsQuerySerializer
+    export_filename = "outstanding-payments"
 
     def get_queryset(self):
         """Get queryset for payment schedules"""
         return PaymentSchedule.objects.all()
 
+    def _outstanding_queryset(self, request):
+        """Outstanding (not paid) installments due in the requested range"""
+        query_serializer = self.query_serializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        from_date = query_serializer.validated_data.get("from_date")
+        to_date = query_serializer.validated_data.get("to_date")
+        project_id = query_serializer.validated_data.get("project_id")
+
+        # If no date range provided, use current month
+        if not from_date or not to_date:
+            today = timezone.now().date()
+            from_date = today.replace(day=1)
+            to_date = today
+
+        print("=== OUTSTANDING PAYMENTS DEBUG ===")
+        print(f"Date range: {from_date} to {to_date}")
+        print(f"Project ID: {project_id}")
+        print("=====================================")
+
+        # Get outstanding payments (not paid) within date range
+        queryset = PaymentSchedule.objects.filter(
+            due_date__range=[from_date, to_date], status__in=["pending", "overdue"]
+        ).select_related(
+            "payment_plan__sale_item__buyer",
+            "payment_plan__sale_item__property_node",
+            "payment_plan__sale_item__sale__assigned_sales_person__user",
+        )
+
+        if project_id:
+            # Filter by project if specified
+            # This is a placeholder - implement proper project filtering
+            pass
+
+        return queryset
+
     def list(self, request, *args, **kwargs):
         """Generate Outstanding Payments report"""
-        try:
-            # Validate query parameters
-            query_serializer = self.query_serializer(data=request.query_params)
-            query_serializer.is_valid(raise_exception=True)
-
-            from_date = query_serializer.validated_data.get("from_date")
-            to_date = query_serializer.validated_data.get("to_date")
-            project_id = query_serializer.validated_data.get("project_id")
-
-            # If no date range provided, use current month
-            if not from_date or not to_date:
-                today = timezone.now().date()
-                from_date = today.replace(day=1)
-                to_date = today
-
-            print("=== OUTSTANDING PAYMENTS DEBUG ===")
-            print(f"Date range: {from_date} to {to_date}")
-            print(f"Project ID: {project_id}")
-            print("=====================================")
-
-            # Get outstanding payments (not paid) within date range
-            queryset = PaymentSchedule.objects.filter(
-                due_date__range=[from_date, to_date], status__in=["pending", "overdue"]
-            ).select_related(
-                "payment_plan__sale_item__buyer",
-                "payment_plan__sale_item__property_node",
-                "payment_plan__sale_item__sale__assigned_sales_person__user",
-            )
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
 
-            if project_id:
-                # Filter by project if specified
-                # This is a placeholder - implement proper project filtering
-                pass
+        try:
+            queryset = self._outstanding_queryset(request)
 
             if not queryset.exists():
                 # Return empty response if no data
@@ -145,68 +155,68 @@ class OutstandingPaymentsReportView(ListAPIView):
             "leadsWithoutFollowup": leads_without_followup,
         }
 
+    def export_rows(self):
+        queryset = self._outstanding_queryset(self.request).order_by("due_date", "id")
+        for payment in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self._outstanding_payment(payment)
+
     def _get_outstanding_payments(self, queryset):
         """Get outstanding payments data for the table"""
-        payments_data = []
+        return [self._outstanding_payment(payment) for payment in queryset]
 
-        for payment in queryset:
-            # Calculate days overdue
-            days_overdue = 0
-            if payment.due_date < timezone.now().date() and payment.status != "paid":
-                days_overdue = (timezone.now().date() - payment.due_date).days
+    def _outstanding_payment(self, payment):
+        """Table row of one outstanding installment"""
+        # Calculate days overdue
+        days_overdue = 0
+        if payment.due_date < timezone.now().date() and payment.status != "paid":
+            days_overdue = (timezone.now().date() - payment.due_date).days
 
-                # Just use the current node name as project name
-            project_name = payment.payment_plan.sale_item.property_node.name
+        # Just use the current node name as project name
+        project_name = payment.payment_plan.sale_item.property_node.name
 
-            # Just use the current node name as property info (no parent traversal)
-            node = payment.payment_plan.sale_item.property_node
-            property_info = node.name
+        # Just use the current node name as property info (no parent traversal)
+        node = payment.payment_plan.sale_item.property_node
+        property_info = node.name
 
-            # Check if this is linked to an invoice (rental) or sales installment
-            invoice_number = "N/A"  # Default for sales installments
+        # Check if this is linked to an invoice (rental) or sales installment
+        invoice_number = "N/A"  # Default for sales installments
 
-            # For sales installments, show payment number instead of invoice
-            total_payments = payment.payment_plan.installment_count or 1
-            payment_display = f"Payment {payment.payment_number} of {total_payments}"
+        # For sales installments, show payment number instead of invoice
+        total_payments = payment.payment_plan.installment_count or 1
+        payment_display = f"Payment {payment.payment_number} of {total_payments}"
 
-            payments_data.append(
-                {
-                    "id": payment.id,
-                    "invoiceNumber": invoice_number,
-                    "paymentNumber": payment_display,
-                    "buyer": payment.payment_plan.sale_item.buyer.get_full_name(),
-                    "buyerPhone": getattr(
-                        payment.payment_plan.sale_item.buyer, "phone", ""
-                    ),
-                    "buyerEmail": payment.payment_plan.sale_item.buyer.email,
-                    "projectName": project_name,
-                    "propertyInfo": property_info,
-                    "salesperson": (
-                        payment.payment_plan.sale_item.sale.assigned_sales_person.user.get_full_name()
-                        if payment.payment_plan.sale_item.sale.assigned_sales_person
-                        else "Unassigned"
-                    ),
-                    "salespersonPhone": (
-                        getattr(
-                            payment.payment_plan.sale_item.sale.assigned_sales_person.user,
-                            "phone",
-                            "",
-                        )
-                        if payment.payment_plan.sale_item.sale.assigned_sales_person
-                        else ""
-                    ),
-                    "salespersonEmail": (
-                        payment.payment_plan.sale_item.sale.assigned_sales_person.user.email
-                        if payment.payment_plan.sale_item.sale.assigned_sales_person
-                        else ""
-                    ),
-                    "dueDate": payment.due_date,
-                    "daysOverdue": days_overdue,
-                    "amount": float(payment.amount),
-                    "status": payment.status,
-                    "lastFollowUpDate": None,  # Placeholder
-                    "followUpStatus": None,  # Placeholder
-                }
-            )
-
-        return payments_data
+        return {
+            "id": payment.id,
+            "invoiceNumber": invoice_number,
+            "paymentNumber": payment_display,
+            "buyer": payment.payment_plan.sale_item.buyer.get_full_name(),
+            "buyerPhone": getattr(payment.payment_plan.sale_item.buyer, "phone", ""),
+            "buyerEmail": payment.payment_plan.sale_item.buyer.email,
+            "projectName": project_name,
+            "propertyInfo": property_info,
+            "salesperson": (
+                payment.payment_plan.sale_item.sale.assigned_sales_person.user.get_full_name()
+                if payment.payment_plan.sale_item.sale.assigned_sales_person
+                else "Unassigned"
+            ),
+            "salespersonPhone": (
+                getattr(
+                    payment.payment_plan.sale_item.sale.assigned_sales_person.user,
+                    "phone",
+                    "",
+                )
+                if payment.payment_plan.sale_item.sale.assigned_sales_person
+                else ""
+            ),
+            "salespersonEmail": (
+                payment.payment_plan.sale_item.sale.assigned_sales_person.user.email
+                if payment.payment_plan.sale_item.sale.assigned_sales_person
+                else ""
+            ),
+            "dueDate": payment.due_date,
+            "daysOverdue": days_overdue,
+            "amount": float(payment.amount),
+            "status": payment.status,
+            "lastFollowUpDate": None,  # Placeholder
+            "followUpStatus": None,  # Placeholder
+        }
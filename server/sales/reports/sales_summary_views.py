@@ -7,15 +7,21 @@ from rest_framework.permissions import IsAuthenticated
 
 from properties.models import LocationNode, UnitDetail
 from sales.models import PropertySale, PropertySaleItem, PropertyReservation
+from utils.export import ExportMixin
 
 
-class SalesSummaryReportView(APIView):
+class SalesSummaryReportView(ExportMixin, APIView):
     """
     Sales summary report showing apartment status counts and financial statements
     """
     permission_classes = [IsAuthenticated]
+    export_filename = "sales-summary"
+    export_results_key = "data"
 
     def get(self, request):
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from query parameters
             date_from_str = getattr(request, 'query_params', {}).get("date_from") or request.GET.get("date_from")
@@ -130,13 +136,18 @@ class SalesSummaryReportView(APIView):
             }, status=500)
 
 
-class SalesFinancialStatementView(APIView):
+class SalesFinancialStatementView(ExportMixin, APIView):
     """
     Detailed financial statement for sales
     """
     permission_classes = [IsAuthenticated]
+    export_filename = "sales-financial-statement"
+    export_results_key = "data"
 
     def get(self, request):
+        if self.export_requested(request):
+            return self.export(request)
+
         try:
             # Get date range from query parameters
             date_from_str = getattr(request, 'query_params', {}).get("date_from") or request.GET.get("date_from")
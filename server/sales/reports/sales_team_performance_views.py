@@ -5,13 +5,14 @@ from django.db.models import Sum, Q
 from django.utils import timezone
 
 from sales.models import SalesPerson, PropertySale, AssignedDocument
+from utils.export import ExportMixin
 from .sales_team_performance_serializers import (
     SalesTeamPerformanceReportSerializer,
     SalesTeamPerformanceQuerySerializer,
 )
 
 
-class SalesTeamPerformanceReportView(ListAPIView):
+class SalesTeamPerformanceReportView(ExportMixin, ListAPIView):
     """
     View for Sales Team Performance report.
     Returns performance metrics for all sales people within a date range.
@@ -19,6 +20,8 @@ class SalesTeamPerformanceReportView(ListAPIView):
 
     serializer_class = SalesTeamPerformanceReportSerializer
     query_serializer = SalesTeamPerformanceQuerySerializer
+    export_filename = "sales-team-performance"
+    export_results_key = "data.salespeople"
 
     def get_queryset(self):
         """Get queryset for sales people"""
@@ -26,6 +29,9 @@ class SalesTeamPerformanceReportView(ListAPIView):
 
     def list(self, request, *args, **kwargs):
         """Generate Sales Team Performance report"""
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         try:
             # Validate query parameters
             query_serializer = self.query_serializer(data=request.query_params)
@@ -6,20 +6,23 @@ from django.db.models.functions import TruncMonth
 
 from ..models import PropertySaleItem
 from properties.models import LocationNode
+from utils.export import EXPORT_CHUNK_SIZE, ExportMixin
 from .serializers import (
     PropertySalesPerformanceReportSerializer,
     PropertySalesPerformanceReportQuerySerializer,
 )
 
 
-class PropertySalesPerformanceReportView(ListAPIView):
+class PropertySalesPerformanceReportView(ExportMixin, ListAPIView):
     """
     Generic class-based view for Property Sales Performance reports.
     Returns KPIs, monthly data, and sales records with optional filtering.
+    ``?export=csv|xlsx`` exports every sales record, not just the latest 10.
     """
 
     serializer_class = PropertySalesPerformanceReportSerializer
     queryset = PropertySaleItem.objects.none()  # We'll override get_queryset
+    export_filename = "property-sales"
 
     def get_queryset(self):
         """Override to return filtered queryset"""
@@ -71,6 +74,9 @@ class PropertySalesPerformanceReportView(ListAPIView):
 
     def list(self, request, *args, **kwargs):
         """Override list method to return custom response format"""
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
         try:
             queryset = self.get_queryset()
 
@@ -266,45 +272,48 @@ class PropertySalesPerformanceReportView(ListAPIView):
 
         return monthly_data
 
+    def export_rows(self):
+        queryset = self.get_queryset().order_by("created_at", "id")
+        for item in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self._sales_record(item)
+
     def _get_sales_records(self, queryset):
         """Get detailed sales records"""
-
-        sales_records = []
-        for item in queryset.select_related("sale", "property_node", "buyer")[
-            :10
-        ]:  # Limit to 10 records for performance
-
-            # Get project name
-            project_name = "Unknown Project"
-            try:
-                project_ancestor = (
-                    item.property_node.get_ancestors(include_self=True)
-                    .filter(node_type="PROJECT")
-                    .first()
-                )
-                if project_ancestor:
-                    project_name = project_ancestor.name
-            except Exception:
-                pass
-
-            # Calculate time to close
-            time_to_close = 0
-            if item.sale.sale_date and item.sale.created_at:
-                sale_date = item.sale.sale_date
-                created_date = item.sale.created_at.date()
-                time_to_close = (sale_date - created_date).days
-                if time_to_close < 0:
-                    time_to_close = 0
-
-            sales_records.append(
-                {
-                    "id": str(item.id),
-                    "propertyName": item.property_node.name,
-                    "salePrice": float(item.sale_price),
-                    "soldDate": item.sale.sale_date,
-                    "timeToClose": time_to_close,
-                    "project": project_name,
-                }
+        return [
+            self._sales_record(item)
+            for item in queryset.select_related("sale", "property_node", "buyer")[
+                :10
+            ]  # Limit to 10 records for performance
+        ]
+
+    def _sales_record(self, item):
+        # Get project name
+        project_name = "Unknown Project"
+        try:
+            project_ancestor = (
+                item.property_node.get_ancestors(include_self=True)
+                .filter(node_type="PROJECT")
+                .first()
             )
+            if project_ancestor:
+                project_name = project_ancestor.name
+        except Exception:
+            pass
+
+        # Calculate time to close
+        time_to_close = 0
+        if item.sale.sale_date and item.sale.created_at:
+            sale_date = item.sale.sale_date
+            created_date = item.sale.created_at.date()
+            time_to_close = (sale_date - created_date).days
+            if time_to_close < 0:
+                time_to_close = 0
 
-        return sales_records
+        return {
+            "id": str(item.id),
+            "propertyName": item.property_node.name,
+            "salePrice": float(item.sale_price),
+            "soldDate": item.sale.sale_date,
+            "timeToClose": time_to_close,
+            "project": project_name,
+        }
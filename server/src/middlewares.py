@@ -3,7 +3,7 @@ from django.utils.deprecation import MiddlewareMixin
 from ipware import get_client_ip
 from rest_framework import status
 
-from accounts.models import BlockedIP
+from utils.ip_blocklist import blocklist, is_ip_blocked
 
 
 class IPBlockMiddleware(MiddlewareMixin):
@@ -13,6 +13,11 @@ class IPBlockMiddleware(MiddlewareMixin):
     Otherwise, the request proceeds as normal.
     """  # noqa: E501
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Load the blocklist once per process instead of querying per request
+        blocklist.start()
+
     def process_request(self, request):
         # 1. Get the client IP
         request_ip, _ = get_client_ip(request)
@@ -26,8 +31,8 @@ class IPBlockMiddleware(MiddlewareMixin):
             )
 
         # 2. Check if the IP is blocked
-        # Use .exists() if you only need to know if a record is present
-        is_blocked = BlockedIP.objects.filter(blocked_ip=request_ip, is_unblocked=True).exists()  # noqa: E501
+        # In-memory lookup (single addresses and CIDR ranges)
+        is_blocked = is_ip_blocked(request_ip)
 
         if is_blocked:
             # 3. Block immediately with a generic message
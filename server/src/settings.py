@@ -112,6 +112,7 @@ INSTALLED_APPS = [
     "sales",
     "documents",
     "menupermissions",
+    "dashboard",
 ]
 
 # Middleware
@@ -345,8 +346,8 @@ REST_FRAMEWORK = {
         "rest_framework.renderers.JSONRenderer",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "utils.throttling.RedisAnonRateThrottle",
+        "utils.throttling.RedisUserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day" if ENVIRONMENT == "production" else "1000/day",
@@ -461,6 +462,14 @@ CELERY_TASK_QUEUES = {
         "exchange": "reminder_queue",
         "routing_key": "reminder_queue",
     },
+    "email_queue": {
+        "exchange": "email_queue",
+        "routing_key": "email_queue",
+    },
+    "callback_queue": {
+        "exchange": "callback_queue",
+        "routing_key": "callback_queue",
+    },
 }
 
 # Worker configuration - FIXED to match service
@@ -475,6 +484,8 @@ CELERY_WORKER_QUEUES = {
     "management_queue": {"concurrency": 1},
     "invoice_queue": {"concurrency": 2},
     "reminder_queue": {"concurrency": 1},
+    "email_queue": {"concurrency": 4},
+    "callback_queue": {"concurrency": 4},
 }
 
 # Worker process settings
@@ -489,11 +500,24 @@ CELERY_TASK_ROUTES = {
     "payments.tasks.calculate_all_owner_payouts_for_period": {
         "queue": "management_queue"
     },
+    "payments.tasks.recompute_dirty_payouts": {"queue": "payout_queue"},
     "payments.tasks.generate_monthly_invoices": {"queue": "invoice_queue"},
+    "payments.tasks.generate_invoices_for_partition": {"queue": "invoice_queue"},
+    "payments.tasks.finalize_monthly_invoices": {"queue": "invoice_queue"},
     "payments.tasks.send_invoice_reminders": {"queue": "reminder_queue"},
+    "notifications.tasks.send_outbound_emails": {"queue": "email_queue"},
+    "notifications.tasks.requeue_stale_outbound_emails": {"queue": "email_queue"},
+    "payments.tasks.process_payment_callback": {"queue": "callback_queue"},
+    "payments.tasks.requeue_stale_payment_callbacks": {"queue": "callback_queue"},
     "*": {"queue": "default"},
 }
 
+# Invoices written per transaction by the monthly bulk invoice run
+# (None writes the whole run in a single transaction)
+INVOICE_GENERATION_CHUNK_SIZE = int(os.getenv("INVOICE_GENERATION_CHUNK_SIZE", 500))
+# Projects (LocationNode trees) billed by each worker task of the invoice chord
+INVOICE_PROJECTS_PER_PARTITION = int(os.getenv("INVOICE_PROJECTS_PER_PARTITION", 1))
+
 # Use django-celery-beat database scheduler for dynamic tasks
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
@@ -0,0 +1,66 @@
+"""
+Progress tracking for fan-out Celery batches.
+
+Each batch is a Redis hash so workers can bump counters with HINCRBY instead
+of a read-modify-write on a cached dict.
+"""
+
+import logging
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROGRESS_TIMEOUT = 60 * 60 * 6
+
+
+def start_batch(batch_key, total, timeout=BATCH_PROGRESS_TIMEOUT, **fields):
+    """Create (or reset) the progress hash for a batch"""
+    try:
+        redis_client = get_redis_connection("default")
+        pipe = redis_client.pipeline()
+        pipe.delete(batch_key)
+        pipe.hset(batch_key, mapping={"total": total, "completed": 0, **fields})
+        pipe.expire(batch_key, timeout)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not start batch progress {batch_key}: {e}")
+
+
+def increment_batch(batch_key, **counters):
+    """Atomically add to one or more counters of a batch"""
+    try:
+        redis_client = get_redis_connection("default")
+        pipe = redis_client.pipeline()
+        for name, amount in counters.items():
+            pipe.hincrby(batch_key, name, int(amount or 0))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not update batch progress {batch_key}: {e}")
+
+
+def update_batch(batch_key, **fields):
+    """Overwrite non-counter fields of a batch, e.g. its status"""
+    try:
+        redis_client = get_redis_connection("default")
+        redis_client.hset(batch_key, mapping=fields)
+    except Exception as e:
+        logger.warning(f"Could not update batch progress {batch_key}: {e}")
+
+
+def get_batch_progress(batch_key):
+    """Return the counters of a batch as a dict of ints, or None if unknown"""
+    redis_client = get_redis_connection("default")
+    raw = redis_client.hgetall(batch_key)
+    if not raw:
+        return None
+
+    progress = {}
+    for name, value in raw.items():
+        name = name.decode() if isinstance(name, bytes) else name
+        value = value.decode() if isinstance(value, bytes) else value
+        try:
+            progress[name] = int(value)
+        except ValueError:
+            progress[name] = value
+    return progress
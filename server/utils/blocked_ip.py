@@ -1,37 +1,33 @@
-from django.core.cache import cache
 from django.db.models import Q
 from django.http import JsonResponse
 from ipware import get_client_ip  # Import get_client_ip from django-ipware
 from rest_framework import status
 
 from accounts.models import BlockedIP
+from utils.ip_blocklist import is_ip_blocked
+from utils.rate_limit import incr_counter, reset_counter
 
 MAX_ATTEMPTS = 5
 REDIS_EXPIRE_SECONDS  = 60 * 15  # 15 minutes or however long you want to block
 
 def is_ip_in_db_blocklist(ip_address: str) -> bool:
     """
-    Checks the SQL database to see if this IP is permanently blocked.
+    Checks the IP blocklist to see if this IP is permanently blocked.
     """
-    return BlockedIP.objects.filter(blocked_ip=ip_address, is_unblocked=True).exists()
+    return is_ip_blocked(ip_address)
 
 def increment_attempts_in_redis(ip_address: str) -> int:
     """
     Increment the failed attempts in Redis, return the new count.
+    Atomic; the window starts at the first attempt and is not extended.
     """
-    key = f"login_attempts:{ip_address}"
-    attempts = cache.get(key, 0)
-    attempts += 1
-    # Store or refresh the key with an expiry
-    cache.set(key, attempts, REDIS_EXPIRE_SECONDS)
-    return attempts
+    return incr_counter(f"login_attempts:{ip_address}", REDIS_EXPIRE_SECONDS)
 
 def reset_attempts_in_redis(ip_address: str):
     """
     Clear the attempts in Redis for this IP.
     """
-    key = f"login_attempts:{ip_address}"
-    cache.delete(key)
+    reset_counter(f"login_attempts:{ip_address}")
 
 
 def permanently_block_ip(ip_address: str):
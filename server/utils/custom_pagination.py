@@ -1,7 +1,15 @@
+import base64
+import hashlib
 import math
+import uuid
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -33,4 +41,139 @@ class CustomPageNumberPagination(PageNumberPagination):
                 "count": self.page.paginator.count,
                 "results": data,
             }
-        )
\ No newline at end of file
+        )
+
+
+def encode_keyset_cursor(obj, direction):
+    """Opaque cursor pointing before (``previous``) or after (``next``) obj"""
+    raw = f"{direction}|{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_keyset_cursor(cursor):
+    """``(direction, created_at, pk)`` of a cursor, or None for the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        direction, created_at, pk = raw.split("|", 2)
+        created_at = parse_datetime(created_at)
+        pk = uuid.UUID(pk)
+    except (ValueError, UnicodeDecodeError):
+        created_at = None
+    if created_at is None or direction not in ("next", "previous"):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return direction, created_at, pk
+
+
+def estimated_count(queryset, timeout=60):
+    """
+    Row count for a paginated listing without a COUNT(*) per page: the
+    planner's estimate (``pg_class.reltuples``) for an unfiltered table,
+    otherwise an exact count cached for ``timeout`` seconds
+    """
+    if not queryset.query.where:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed
+        if row and row[0] >= 0:
+            return int(row[0])
+
+    sql, params = queryset.query.sql_with_params()
+    key = "keyset_count:" + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPagination(CustomPageNumberPagination):
+    """
+    Keyset pagination on (``created_at``, ``id``), newest first.
+
+    Opted into per view. Requests with a ``cursor`` parameter (empty for the
+    first page, then ``next_cursor``/``previous_cursor`` from the response)
+    are paged with an indexed range condition instead of OFFSET, so deep
+    pages cost the same as the first; the view's own ordering is replaced by
+    the keyset order. Requests without it keep page-number pagination.
+
+    ``count`` is estimated by default (see ``estimated_count``);
+    ``?count=exact`` runs COUNT(*) and ``?count=none`` skips it.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    count_mode = "estimate"
+    count_cache_timeout = 60
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        position = decode_keyset_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        self.count = self.get_count(queryset, request)
+
+        direction = position[0] if position else "next"
+        if direction == "next":
+            queryset = queryset.order_by("-created_at", "-id")
+        else:
+            queryset = queryset.order_by("created_at", "id")
+        if position:
+            _, created_at, pk = position
+            if direction == "next":
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+
+        # One extra row tells whether there is a page beyond this one
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "previous":
+            rows.reverse()
+
+        has_next = has_more if direction == "next" else True
+        has_previous = has_more if direction == "previous" else position is not None
+        self.next_cursor = (
+            encode_keyset_cursor(rows[-1], "next") if rows and has_next else None
+        )
+        self.previous_cursor = (
+            encode_keyset_cursor(rows[0], "previous")
+            if rows and has_previous
+            else None
+        )
+        return rows
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param) or self.count_mode
+        if mode == "none":
+            return None
+        if mode == "exact":
+            return queryset.count()
+        return estimated_count(queryset, self.count_cache_timeout)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "count": self.count,
+                "results": data,
+                "next_cursor": self.next_cursor,
+                "previous_cursor": self.previous_cursor,
+            }
+        )
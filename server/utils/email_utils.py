@@ -8,7 +8,7 @@ using HTML templates and SendGrid API.
 import os
 
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from django.conf import settings
 from django.template import Context, Template
@@ -20,6 +20,27 @@ SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 DEFAULT_FROM_EMAIL = "no-reply@hoyhub.net"  # Use your verified sender
 TEMPLATES_DIR = Path(__file__).parent / "email_templates"
 
+# SendGrid accepts up to 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
+# One client per process and API key, so batches reuse it instead of
+# building a new client for every message
+_sendgrid_clients = {}
+
+
+def get_sendgrid_client(api_key: Optional[str] = None) -> SendGridAPIClient:
+    """Return the shared SendGrid client for this process"""
+    api_key = api_key or SENDGRID_API_KEY
+    client = _sendgrid_clients.get(api_key)
+    if client is None:
+        client = SendGridAPIClient(api_key)
+        _sendgrid_clients[api_key] = client
+    return client
+
+
+class EmailDeliveryError(Exception):
+    """Raised when SendGrid rejects or fails to accept a message"""
+
 
 class EmailService:
     """Service class for handling email operations."""
@@ -89,8 +110,7 @@ class EmailService:
                 html_content=html_content,
             )
 
-            sg = SendGridAPIClient(self.api_key)
-            response = sg.send(message)
+            response = get_sendgrid_client(self.api_key).send(message)
 
             print(f"DEBUG: Response status code: {response.status_code}")
             print(f"DEBUG: Response body: {response.body}")
@@ -132,6 +152,55 @@ class EmailService:
 
             return False
 
+    def send_batch(
+        self,
+        recipient_emails: List[str],
+        subject: str,
+        html_content: str,
+        from_email: Optional[str] = None,
+    ) -> str:
+        """
+        Send the same message to several recipients in one API call.
+
+        Each recipient gets its own personalization, so nobody sees the other
+        addresses. Unlike ``_send_email`` this raises ``EmailDeliveryError`` on
+        failure so callers can retry.
+
+        Returns:
+            str: SendGrid message id (empty if not reported)
+        """
+        if not self.api_key:
+            raise EmailDeliveryError(
+                "SENDGRID_API_KEY not found in environment variables"
+            )
+        if len(recipient_emails) > MAX_PERSONALIZATIONS:
+            raise ValueError(
+                f"At most {MAX_PERSONALIZATIONS} recipients per batch, "
+                f"got {len(recipient_emails)}"
+            )
+
+        message = Mail(
+            from_email=from_email or self.from_email or DEFAULT_FROM_EMAIL,
+            to_emails=list(recipient_emails),
+            subject=subject,
+            html_content=html_content,
+            is_multiple=True,
+        )
+
+        try:
+            response = get_sendgrid_client(self.api_key).send(message)
+        except Exception as e:
+            body = getattr(e, "body", "")
+            raise EmailDeliveryError(f"{type(e).__name__}: {e} {body}".strip()) from e
+
+        if response.status_code not in (200, 201, 202):
+            raise EmailDeliveryError(
+                f"SendGrid API error: {response.status_code} - {response.body}"
+            )
+
+        headers = response.headers or {}
+        return headers.get("X-Message-Id", "") or ""
+
     def send_template_email(
         self,
         recipient_email: str,
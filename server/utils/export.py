@@ -0,0 +1,348 @@
+"""
+CSV/XLSX export of report and table endpoints.
+
+A view with ``ExportMixin`` answers ``?export=csv`` or ``?export=xlsx`` with a
+file instead of its JSON page. Rows are produced lazily by ``export_rows()``:
+list views iterate their filtered queryset (same filterset, search and
+ordering as the JSON endpoint) with ``.iterator(chunk_size=...)``, so an
+export never holds more than a chunk of model instances. CSV is streamed as it
+is written, through an async iterator (``aiter_lines``) so the ASGI handler
+sends each batch of lines as it is produced instead of collecting the whole
+file first; XLSX goes through openpyxl's write-only workbook into a temporary
+file that is streamed once the archive is complete.
+
+With ``&background=true`` the export runs in a Celery task
+(``reports.tasks.export_report``), which stores the file in the media bucket;
+``reports/exports/<export_id>/`` reports progress and, once done, a presigned
+download URL.
+"""
+
+import csv
+import datetime
+import itertools
+import json
+import logging
+import tempfile
+import uuid
+
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from utils.batch_progress import get_batch_progress, start_batch
+
+logger = logging.getLogger(__name__)
+
+# Model instances fetched per round trip while exporting a queryset
+EXPORT_CHUNK_SIZE = 2000
+
+# Lines joined into one chunk per hop from the event loop to the sync thread
+STREAM_BATCH_LINES = 500
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Leading characters that make spreadsheet apps evaluate a cell
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_EMPTY = object()
+
+
+def export_batch_key(export_id):
+    return f"export:{export_id}"
+
+
+def flatten_row(row, prefix=""):
+    """``{"tenant": {"name": ...}}`` -> ``{"tenant.name": ...}``"""
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_row(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def statement_rows(data, prefix=""):
+    """One ``{"line", "value"}`` row per leaf of a nested report dict"""
+    for name, value in flatten_row(data, prefix).items():
+        yield {"line": name, "value": value}
+
+
+def _cell(value, for_xlsx):
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float, Decimal)):
+        return value
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value).replace(tzinfo=None)
+        return value if for_xlsx else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value if for_xlsx else value.isoformat()
+    if isinstance(value, (list, tuple, dict)):
+        value = json.dumps(value, default=str)
+    value = str(value)
+    if value.startswith(_FORMULA_PREFIXES):
+        try:
+            float(value)
+        except ValueError:
+            value = f"'{value}"
+    return value
+
+
+def _table(rows, columns=None, for_xlsx=False):
+    """
+    Yield the header row and then one list of cells per row. Columns are
+    ``(header, key)`` pairs; without them the keys of the first (flattened)
+    row are used.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if columns is None:
+        columns = [(key, key) for key in flatten_row(first or {})]
+    yield [header for header, _ in columns]
+    if first is None:
+        return
+
+    def cells(row):
+        flat = flatten_row(row)
+        return [_cell(flat.get(key), for_xlsx) for _, key in columns]
+
+    yield cells(first)
+    for row in rows:
+        yield cells(row)
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, columns=None):
+    """CSV lines for ``rows``, produced one at a time"""
+    writer = csv.writer(_Echo())
+    # BOM so Excel opens the file as UTF-8
+    yield "\ufeff"
+    for line in _table(rows, columns):
+        yield writer.writerow(line)
+
+
+async def aiter_lines(lines, batch_size=STREAM_BATCH_LINES):
+    """
+    Async iterator over a sync iterator of text lines, for
+    ``StreamingHttpResponse`` under ASGI. Each batch of lines is produced in
+    the sync thread (``thread_sensitive``, so database cursors stay on one
+    connection) and sent before the next one is built.
+    """
+    batches = map("".join, itertools.batched(lines, batch_size))
+    next_batch = sync_to_async(next)
+    while True:
+        batch = await next_batch(batches, _EMPTY)
+        if batch is _EMPTY:
+            return
+        yield batch
+
+
+def write_csv(rows, fileobj, columns=None):
+    """Write ``rows`` as CSV to a binary file; returns the number of rows"""
+    count = -1
+    for count, line in enumerate(iter_csv(rows, columns)):
+        fileobj.write(line.encode("utf-8"))
+    # The BOM and header lines are not rows
+    return max(count - 1, 0)
+
+
+def write_xlsx(rows, fileobj, columns=None, title="Export"):
+    """Write ``rows`` to a write-only workbook; returns the number of rows"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    count = -1
+    for count, line in enumerate(_table(rows, columns, for_xlsx=True)):
+        sheet.append(line)
+    workbook.save(fileobj)
+    return max(count, 0)
+
+
+def write_export(rows, fileobj, export_format, columns=None, title="Export"):
+    if export_format == "xlsx":
+        return write_xlsx(rows, fileobj, columns, title)
+    return write_csv(rows, fileobj, columns)
+
+
+def export_filename(name, export_format):
+    return f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+
+
+def export_response(rows, export_format, name="export", columns=None):
+    """Stream ``rows`` as a CSV or XLSX attachment"""
+    filename = export_filename(name, export_format)
+    if export_format == "xlsx":
+        # A zip archive can only be sent once it is complete; the workbook is
+        # built on disk and streamed from there
+        fileobj = tempfile.TemporaryFile()
+        write_xlsx(rows, fileobj, columns, title=name)
+        fileobj.seek(0)
+        return FileResponse(
+            fileobj,
+            as_attachment=True,
+            filename=filename,
+            content_type=EXPORT_FORMATS["xlsx"],
+        )
+
+    response = StreamingHttpResponse(
+        aiter_lines(iter_csv(rows, columns)), content_type=EXPORT_FORMATS["csv"]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def requested_export_format(request):
+    """The ``?export=`` format of a request, or None for a JSON response"""
+    export_format = request.query_params.get("export")
+    if not export_format:
+        return None
+    export_format = export_format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError(
+            {"export": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}
+        )
+    return export_format
+
+
+def get_export_status(export_id, user=None):
+    """Progress of a background export, with a download URL once completed"""
+    progress = get_batch_progress(export_batch_key(export_id))
+    if progress is None:
+        return None
+    if user is not None and str(progress.get("user_id")) != str(user.id):
+        return None
+
+    if progress.get("status") == "completed" and progress.get("file"):
+        progress["url"] = default_storage.url(progress["file"])
+    return progress
+
+
+def _primed(rows):
+    """
+    Start ``rows`` so errors raised before the first row (bad filters, a
+    failing report) turn into an error response rather than a cut-off file
+    """
+    rows = iter(rows)
+    first = next(rows, _EMPTY)
+    if first is _EMPTY:
+        return iter(())
+    return itertools.chain([first], rows)
+
+
+class ExportMixin:
+    """
+    Adds ``?export=csv|xlsx`` (and ``&background=true``) to a view.
+
+    The view's handler starts with::
+
+        if self.export_requested(request):
+            return self.export(request, *args, **kwargs)
+
+    ``export_rows()`` defaults to the filtered queryset, one dict per
+    instance from ``export_row()``. Views that assemble their report in
+    memory set ``export_results_key`` instead (a dotted path into their own
+    JSON response, e.g. ``"data.units"``); a dict found there is exported as
+    ``line``/``value`` rows.
+    """
+
+    export_filename = "export"
+    export_columns = None
+    export_results_key = None
+    # Format of views that only export, used when ?export= is not given
+    default_export_format = None
+    exporting = False
+
+    def export_format(self, request):
+        return requested_export_format(request) or self.default_export_format
+
+    def export_requested(self, request):
+        return not self.exporting and requested_export_format(request) is not None
+
+    def export(self, request, *args, **kwargs):
+        export_format = self.export_format(request)
+        if request.query_params.get("background", "").lower() in ("true", "1"):
+            return self.queue_export(request, export_format, kwargs)
+        self.exporting = True
+        return export_response(
+            _primed(self.export_rows()),
+            export_format,
+            name=self.export_filename,
+            columns=self.export_columns,
+        )
+
+    def export_rows(self):
+        self.exporting = True
+        if self.export_results_key is not None:
+            yield from self._report_rows()
+            return
+
+        queryset = self.filter_queryset(self.get_queryset())
+        for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self.export_row(obj)
+
+    def export_row(self, obj):
+        return self.get_serializer(obj).data
+
+    def _report_rows(self):
+        handler = getattr(self, self.request.method.lower())
+        response = handler(self.request, *self.args, **self.kwargs)
+        if response.status_code >= 400:
+            message = response.data.get("message") if response.data else None
+            raise ValidationError(message or "Report could not be generated")
+
+        data = response.data
+        for key in self.export_results_key.split("."):
+            data = (data or {}).get(key)
+        if isinstance(data, dict):
+            yield from statement_rows(data)
+        else:
+            yield from data or []
+
+    def queue_export(self, request, export_format, kwargs):
+        from reports.tasks import export_report
+
+        export_id = uuid.uuid4()
+        start_batch(
+            export_batch_key(export_id),
+            0,
+            status="running",
+            format=export_format,
+            user_id=str(request.user.id),
+        )
+        view_path = f"{type(self).__module__}.{type(self).__qualname__}"
+        export_report.delay(
+            view_path,
+            request.query_params.urlencode(),
+            str(request.user.id),
+            str(export_id),
+            {key: str(value) for key, value in kwargs.items()},
+        )
+        logger.info(f"📤 Queued {export_format} export {export_id} of {view_path}")
+        return Response(
+            {
+                "error": False,
+                "message": "Export started",
+                "data": {"export_id": str(export_id), "status": "running"},
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
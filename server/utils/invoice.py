@@ -1,14 +1,14 @@
 import base64
 import math
 
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
+from functools import lru_cache
 from typing import Dict, List, Optional, Union
 
-import weasyprint
-
 from django.core.files.base import ContentFile
 from django.db.models import QuerySet
 from django.utils import timezone
@@ -25,6 +25,14 @@ from properties.models import (
 )
 from sales.models import PaymentSchedule, PropertySaleItem
 from utils.email_utils import email_service
+from utils.invoice_pdf import (
+    invoice_pdf_hash,
+    pdf_filename,
+    render_pdf_batch,
+    render_pdf_bytes,
+    split_stale,
+    stored_pdf_is_current,
+)
 
 
 class InvoiceStatus(Enum):
@@ -115,18 +123,123 @@ class InvoiceItemData:
         }
 
 
+class BillingSnapshot:
+    """
+    Per-period billing state loaded in one pass, shared by InvoiceCalculators.
+
+    Holds the (type, service_id, penalty_id) keys already invoiced on every
+    property for the period and the PROJECT ancestor of every node, so
+    ``_is_item_invoiced`` and ``project_node`` become dictionary lookups.
+    """
+
+    # Items with no reference id are invoiced at most once per period
+    UNKEYED_TYPES = (
+        BillingType.RENT.value,
+        BillingType.DEPOSIT.value,
+        BillingType.SERVICE_CHARGE.value,
+    )
+    SERVICE_KEYED_TYPES = (
+        BillingType.FIXED.value,
+        BillingType.PERCENTAGE.value,
+        BillingType.VARIABLE.value,
+        BillingType.INSTALLMENT.value,
+    )
+    PERIOD_STATUSES = [
+        InvoiceStatus.ISSUED.value,
+        InvoiceStatus.PAID.value,
+        InvoiceStatus.PARTIAL.value,
+    ]
+
+    def __init__(self, year: int, month: int):
+        self.year = year
+        self.month = month
+        self.invoiced_types = defaultdict(set)  # node_id -> {type}
+        self.invoiced_refs = defaultdict(set)  # node_id -> {(type, ref_id)}
+        self.projects_by_tree = {}
+
+    @classmethod
+    def for_nodes(cls, nodes, year: int, month: int) -> "BillingSnapshot":
+        """Load a snapshot covering the given property nodes"""
+        snapshot = cls(year, month)
+        snapshot.load(list(nodes))
+        return snapshot
+
+    def load(self, nodes: List[LocationNode]):
+        node_ids = {node.id for node in nodes}
+        tree_ids = {node.tree_id for node in nodes}
+
+        for project in LocationNode.objects.filter(
+            node_type="PROJECT", tree_id__in=tree_ids
+        ).order_by("tree_id", "lft"):
+            self.projects_by_tree.setdefault(project.tree_id, project)
+
+        for node_id, item_type, service_id, penalty_id in InvoiceItem.objects.filter(
+            invoice__property_id__in=node_ids,
+            invoice__status__in=self.PERIOD_STATUSES,
+            invoice__issue_date__year=self.year,
+            invoice__issue_date__month=self.month,
+            invoice__is_deleted=False,
+        ).values_list("invoice__property_id", "type", "service_id", "penalty_id"):
+            self.mark_invoiced(node_id, item_type, service_id, penalty_id)
+
+    def mark_invoiced(self, node_id, item_type, service_id=None, penalty_id=None):
+        """Record an item as invoiced for a property in this period"""
+        item_type = (item_type or "").upper()
+        self.invoiced_types[node_id].add(item_type)
+        if service_id:
+            self.invoiced_refs[node_id].add((item_type, str(service_id)))
+        if penalty_id:
+            self.invoiced_refs[node_id].add((item_type, str(penalty_id)))
+
+    def is_invoiced(
+        self,
+        node_id,
+        item_type: str,
+        service_id: Optional[str] = None,
+        penalty_id: Optional[str] = None,
+    ) -> bool:
+        """Same rules as InvoiceCalculator._is_item_invoiced, without a query"""
+        item_type = item_type.upper()
+        if item_type in self.UNKEYED_TYPES:
+            return item_type in self.invoiced_types.get(node_id, ())
+        if item_type in self.SERVICE_KEYED_TYPES and service_id:
+            return (item_type, str(service_id)) in self.invoiced_refs.get(node_id, ())
+        if item_type == BillingType.PENALTY.value and penalty_id:
+            return (item_type, str(penalty_id)) in self.invoiced_refs.get(node_id, ())
+        return False
+
+    def project_for(self, node: LocationNode) -> Optional[LocationNode]:
+        """Return the PROJECT ancestor (or self) of a node"""
+        project = self.projects_by_tree.get(node.tree_id)
+        if project and project.lft <= node.lft and project.rght >= node.rght:
+            return project
+        return None
+
+
 class InvoiceCalculator:
     """
     Advanced invoice calculation engine with support for quantity-based billing
     and invoice history validation.
+
+    Pass a BillingSnapshot covering ``node`` to answer invoice-history and
+    project lookups from memory instead of the database.
     """
 
-    def __init__(self, user, node: LocationNode, year: int, month: int, user_type: str):
+    def __init__(
+        self,
+        user,
+        node: LocationNode,
+        year: int,
+        month: int,
+        user_type: str,
+        snapshot: Optional[BillingSnapshot] = None,
+    ):
         self.user = user
         self.node = node
         self.year = year
         self.month = month
         self.user_type = user_type
+        self.snapshot = snapshot
         self.period_label = self._generate_period_label()
 
         # Cache for performance optimization
@@ -205,9 +318,12 @@ class InvoiceCalculator:
     def project_node(self) -> Optional[LocationNode]:
         """Get project node with caching"""
         if self._project_node_cache is None:
-            self._project_node_cache = self.ancestor_nodes.filter(
-                node_type="PROJECT"
-            ).first()
+            if self.snapshot is not None:
+                self._project_node_cache = self.snapshot.project_for(self.node)
+            else:
+                self._project_node_cache = self.ancestor_nodes.filter(
+                    node_type="PROJECT"
+                ).first()
         return self._project_node_cache
 
     def _is_item_invoiced(
@@ -227,6 +343,11 @@ class InvoiceCalculator:
         Returns:
             True if item is already invoiced, False otherwise
         """
+        if self.snapshot is not None:
+            return self.snapshot.is_invoiced(
+                self.node.id, item_type, service_id=service_id, penalty_id=penalty_id
+            )
+
         qs = InvoiceItem.objects.filter(invoice__in=self.period_invoices)
 
         # Build query based on item type
@@ -257,6 +378,51 @@ class InvoiceCalculator:
                 ).exists()
             return False
 
+    def _has_paid_deposit(self, pt: PropertyTenant) -> bool:
+        """Check whether any receipt exists against this tenant's invoices"""
+        return Receipt.objects.filter(
+            invoice__tenants=pt,
+            invoice__property=self.node,
+        ).exists()
+
+    def _get_property_services(self, node: LocationNode, billed_to: str) -> List:
+        """Get active property services on a node billed to the given party"""
+        return PropertyService.objects.filter(
+            property_node=node,
+            service__billed_to=billed_to,
+            service__is_deleted=False,
+            is_deleted=False,
+        ).select_related("service", "currency")
+
+    def _get_pending_penalties(self, pt: PropertyTenant) -> List[Penalty]:
+        """Get pending penalties for a property tenant"""
+        return Penalty.objects.filter(
+            property_tenant=pt,
+            status="pending",
+        )
+
+    def _get_buyer_sale_items(self) -> List:
+        """Get sale items bought by the current user"""
+        return PropertySaleItem.objects.filter(
+            buyer=self.user,
+            # sale__status__in=["active", "completed"]
+        )
+
+    def _get_due_installments(self, payment_plan) -> List:
+        """Get pending installments of a payment plan due in the current period"""
+        return list(
+            PaymentSchedule.objects.filter(
+                payment_plan=payment_plan,
+                status="pending",
+                due_date__year=self.year,
+                due_date__month=self.month,
+            )
+        )
+
+    def _get_default_currency(self):
+        """Get the default currency"""
+        return Currencies.objects.filter(default=True).first()
+
     def _calculate_quantity_from_dates(self, start_date, end_date) -> Decimal:
         """
         Calculate quantity based on date range (number of months).
@@ -458,12 +624,7 @@ class InvoiceCalculator:
             return None
 
         # Check if deposit already paid
-        has_paid_deposit = Receipt.objects.filter(
-            invoice__tenants=pt,
-            invoice__property=self.node,
-        ).exists()
-
-        if has_paid_deposit:
+        if self._has_paid_deposit(pt):
             return None
 
         # Check if already invoiced
@@ -494,21 +655,13 @@ class InvoiceCalculator:
         billed_to_filter = "TENANT" if self.user_type == "tenant" else "OWNER"
 
         # Get services for the current node
-        services = PropertyService.objects.filter(
-            property_node=self.node,
-            service__billed_to=billed_to_filter,
-            service__is_deleted=False,
-            is_deleted=False,
-        ).select_related("service", "currency")
+        services = self._get_property_services(self.node, billed_to_filter)
 
         # For owners, also include project-level services
         if self.user_type == "owner" and self.project_node:
-            project_services = PropertyService.objects.filter(
-                property_node=self.project_node,
-                service__billed_to=billed_to_filter,
-                service__is_deleted=False,
-                is_deleted=False,
-            ).select_related("service", "currency")
+            project_services = self._get_property_services(
+                self.project_node, billed_to_filter
+            )
 
             # Combine services, avoiding duplicates
             all_services = list(services)
@@ -611,10 +764,7 @@ class InvoiceCalculator:
             return items
 
         # Get pending penalties
-        penalties = Penalty.objects.filter(
-            property_tenant=pt,
-            status="pending",
-        )
+        penalties = self._get_pending_penalties(pt)
 
         for penalty in penalties:
             # Check if already invoiced
@@ -656,10 +806,7 @@ class InvoiceCalculator:
         # Find sale items for this owner where:
         # 1. Owner is the buyer
         # 2. Sale status is active/completed
-        sale_items = PropertySaleItem.objects.filter(
-            buyer=self.user,
-            # sale__status__in=["active", "completed"]
-        )
+        sale_items = self._get_buyer_sale_items()
 
         for sale_item in sale_items:
             # Get payment plan for this sale item
@@ -673,14 +820,9 @@ class InvoiceCalculator:
                 print(
                     f"Looking for installments in year: {self.year}, month: {self.month}"
                 )
-                due_installments = PaymentSchedule.objects.filter(
-                    payment_plan=payment_plan,
-                    status="pending",
-                    due_date__year=self.year,
-                    due_date__month=self.month,
-                )
-                print(f"Due installments found: {due_installments.count()}")
-                if due_installments.exists():
+                due_installments = self._get_due_installments(payment_plan)
+                print(f"Due installments found: {len(due_installments)}")
+                if due_installments:
                     for inst in due_installments:
                         print(
                             f"  - Installment {inst.payment_number}: due {inst.due_date}, amount {inst.amount}"
@@ -694,7 +836,7 @@ class InvoiceCalculator:
                         continue
 
                     # Get default currency and pass None for user_currency
-                    default_currency = Currencies.objects.filter(default=True).first()
+                    default_currency = self._get_default_currency()
                     currency_info = self._create_currency_info(default_currency, None)
 
                     # Create installment item
@@ -813,12 +955,12 @@ class InvoiceCalculator:
         # Default: monthly behavior
         return installment_year == target_year and installment_month == target_month
 
-    def calculate_items(self) -> List[Dict]:
+    def collect_items(self) -> List[InvoiceItemData]:
         """
-        Main method to calculate all invoice items with advanced logic.
+        Calculate all invoice items for the period as InvoiceItemData objects.
 
         Returns:
-            List of invoice items as dictionaries
+            List of InvoiceItemData
         """
         items = []
 
@@ -827,36 +969,43 @@ class InvoiceCalculator:
             # Add rent item
             rent_item = self._calculate_rent_item()
             if rent_item:
-                items.append(rent_item.to_dict())
+                items.append(rent_item)
 
             # Add deposit item
             deposit_item = self._calculate_deposit_item()
             if deposit_item:
-                items.append(deposit_item.to_dict())
+                items.append(deposit_item)
 
         elif self.user_type == "owner":
             # Add service charge item for owners
             service_charge_item = self._calculate_management_fee()
             if service_charge_item:
-                items.append(service_charge_item.to_dict())
+                items.append(service_charge_item)
 
             # Add installment items for owners
             installment_items = self._calculate_installment_items()
             print(f"Installment items: {installment_items}")
             print(f"Number of installment items: {len(installment_items)}")
-            items.extend([item.to_dict() for item in installment_items])
+            items.extend(installment_items)
             print(f"Total items after adding installments: {len(items)}")
 
         # Add service items (for both tenants and owners)
-        service_items = self._calculate_service_items()
-        items.extend([item.to_dict() for item in service_items])
+        items.extend(self._calculate_service_items())
 
         # Add penalty items (for tenants only)
-        penalty_items = self._calculate_penalty_items()
-        items.extend([item.to_dict() for item in penalty_items])
+        items.extend(self._calculate_penalty_items())
 
         return items
 
+    def calculate_items(self) -> List[Dict]:
+        """
+        Main method to calculate all invoice items with advanced logic.
+
+        Returns:
+            List of invoice items as dictionaries
+        """
+        return [item.to_dict() for item in self.collect_items()]
+
 
 def custom_round(value: Union[float, Decimal], decimals: int = 2) -> float:
     """
@@ -880,13 +1029,18 @@ def custom_round(value: Union[float, Decimal], decimals: int = 2) -> float:
         return math.floor(value * multiplier) / multiplier
 
 
-def get_missing_invoice_items(user, node, year, month, user_type, period_label=None):
+def get_missing_invoice_items(
+    user, node, year, month, user_type, period_label=None, snapshot=None
+):
     """
     Legacy function for backward compatibility.
 
-    This function now delegates to the new InvoiceCalculator class.
+    This function now delegates to the new InvoiceCalculator class. Callers
+    looping over many nodes should pass a BillingSnapshot for the period.
     """
-    calculator = InvoiceCalculator(user, node, year, month, user_type)
+    calculator = InvoiceCalculator(
+        user, node, year, month, user_type, snapshot=snapshot
+    )
     return calculator.calculate_items()
 
 
@@ -1005,6 +1159,20 @@ def _get_recipient_address(invoice):
         return "Property Address"
 
 
+@lru_cache(maxsize=128)
+def _logo_data_uri(storage, name):
+    """
+    Company logo as a base64 data URI, downloaded from MinIO once per process.
+    A new upload gets a new file name, so the cache never serves a stale logo.
+    """
+    with storage.open(name, "rb") as logo_file:
+        image_content = logo_file.read()
+    if not image_content:
+        return ""
+    encoded = base64.b64encode(image_content).decode("utf-8")
+    return f"data:image/{name.split('.')[-1]};base64,{encoded}"
+
+
 def _get_company_info(user):
     """
     Get company information from user's owned companies.
@@ -1035,12 +1203,7 @@ def _get_company_info(user):
         logo_base64 = ""
         if company.logo:
             try:
-                # Download the image from MinIO and convert to base64
-                # Read the image file
-                image_content = company.logo.read()
-                if image_content:
-                    # Convert to base64
-                    logo_base64 = f"data:image/{company.logo.name.split('.')[-1]};base64,{base64.b64encode(image_content).decode('utf-8')}"
+                logo_base64 = _logo_data_uri(company.logo.storage, company.logo.name)
             except Exception as e:
                 print(f"Error processing company logo: {e}")
                 logo_base64 = ""
@@ -1114,7 +1277,11 @@ def _build_items_list(invoice):
 
 def generate_invoice_pdf(invoice, html_content):
     """
-    Generate PDF from HTML content using WeasyPrint with A4 formatting and responsive design.
+    Generate the A4 PDF for an invoice and attach it to ``invoice.pdf_file``.
+
+    The PDF is keyed by a hash of ``html_content``: when the stored PDF was
+    rendered from the same content it is reused and nothing is rendered.
+    The invoice itself is not saved; persist ``pdf_file`` and ``pdf_hash``.
 
     Args:
         invoice: Invoice object
@@ -1124,155 +1291,15 @@ def generate_invoice_pdf(invoice, html_content):
         str: Path to generated PDF file
     """
     try:
-        # Add responsive CSS for A4 formatting
-        responsive_css = """
-        <style>
-            @page {
-                size: A4;
-                margin: 0;
-                padding: 0;
-            }
-            
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 12px;
-                line-height: 1.4;
-                color: #333;
-                margin: 0;
-                padding: 0;
-                width: 100%;
-                height: 100%;
-            }
-            
-            .invoice-container {
-                width: 100%;
-                height: 100%;
-                margin: 0;
-                padding: 0;
-            }
-            
-            .header {
-                display: flex;
-                justify-content: space-between;
-                align-items: flex-start;
-                margin: 0;
-                padding: 10px;
-                page-break-inside: avoid;
-            }
-            
-            .company-info {
-                flex: 1;
-                max-width: 50%;
-            }
-            
-            .invoice-info {
-                flex: 1;
-                text-align: right;
-                max-width: 50%;
-            }
-            
-            .recipient-info {
-                margin: 0;
-                padding: 10px;
-                page-break-inside: avoid;
-            }
-            
-            .items-table {
-                width: 100%;
-                border-collapse: collapse;
-                margin: 0;
-                padding: 0;
-                page-break-inside: avoid;
-            }
-            
-            .items-table th,
-            .items-table td {
-                border: 1px solid #ddd;
-                padding: 4px;
-                text-align: left;
-                word-wrap: break-word;
-                overflow-wrap: break-word;
-            }
-            
-            .items-table th {
-                background-color: #f5f5f5;
-                font-weight: bold;
-            }
-            
-            .summary-section {
-                margin: 0;
-                padding: 10px;
-                page-break-inside: avoid;
-            }
-            
-            .summary-table {
-                width: 100%;
-                max-width: 300px;
-                margin-left: auto;
-                border-collapse: collapse;
-            }
-            
-            .summary-table td {
-                padding: 3px 8px;
-                border-bottom: 1px solid #ddd;
-            }
-            
-            .total-row {
-                font-weight: bold;
-                border-top: 2px solid #333;
-            }
-            
-            .text-wrap {
-                word-wrap: break-word;
-                overflow-wrap: break-word;
-                white-space: normal;
-            }
-            
-            .long-text {
-                max-width: 200px;
-                word-wrap: break-word;
-                overflow-wrap: break-word;
-            }
-            
-            @media print {
-                .page-break {
-                    page-break-before: always;
-                }
-                
-                .no-break {
-                    page-break-inside: avoid;
-                }
-            }
-        </style>
-        """
-
-        # Wrap HTML content with responsive CSS
-        full_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            {responsive_css}
-        </head>
-        <body>
-            <div class="invoice-container">
-                {html_content}
-            </div>
-        </body>
-        </html>
-        """
-
-        # Create PDF from HTML with A4 settings
-        pdf_bytes = weasyprint.HTML(string=full_html).write_pdf(
-            stylesheets=[], presentational_hints=True
-        )
+        content_hash = invoice_pdf_hash(html_content)
+        if stored_pdf_is_current(invoice, content_hash):
+            return invoice.pdf_file.name
 
-        # Generate filename
-        filename = f"invoice_{invoice.invoice_number:04d}_{invoice.id}.pdf"
+        pdf_bytes = render_pdf_bytes(html_content)
 
         # Save PDF to the invoice's pdf_file field using Django's FileField
-        invoice.pdf_file.save(filename, ContentFile(pdf_bytes), save=False)
+        invoice.pdf_file.save(pdf_filename(invoice), ContentFile(pdf_bytes), save=False)
+        invoice.pdf_hash = content_hash
 
         return invoice.pdf_file.name
     except Exception as e:
@@ -1280,6 +1307,88 @@ def generate_invoice_pdf(invoice, html_content):
         return None
 
 
+def generate_invoice_pdfs(invoices_html, workers=None):
+    """
+    Batch version of ``generate_invoice_pdf`` for month-start runs.
+
+    Renders the stale PDFs of ``(invoice, html_content)`` pairs in a process
+    pool and persists ``pdf_file``/``pdf_hash`` with one bulk update.
+
+    Returns:
+        dict: Counts of rendered, reused and failed PDFs
+    """
+    invoices_html = list(invoices_html)
+    stale = split_stale(invoices_html)
+    rendered = render_pdf_batch([html for _, html, _ in stale], workers=workers)
+
+    updated = []
+    failed = 0
+    for (invoice, _, content_hash), pdf_bytes in zip(stale, rendered):
+        if pdf_bytes is None:
+            failed += 1
+            continue
+        invoice.pdf_file.save(pdf_filename(invoice), ContentFile(pdf_bytes), save=False)
+        invoice.pdf_hash = content_hash
+        invoice.updated_at = timezone.now()
+        updated.append(invoice)
+
+    if updated:
+        Invoice.objects.bulk_update(updated, ["pdf_file", "pdf_hash", "updated_at"])
+
+    return {
+        "rendered": len(updated),
+        "reused": len(invoices_html) - len(stale),
+        "failed": failed,
+    }
+
+
+def invoice_email_subject(invoice):
+    """Subject line for an invoice email"""
+    if invoice.status.upper() == "CANCELLED":
+        return f"Invoice INV-{invoice.invoice_number:04d} - CANCELLED"
+    return f"Invoice INV-{invoice.invoice_number:04d} - {invoice.status}"
+
+
+def render_invoice_email(invoice, user=None, custom_message=None):
+    """
+    Render the invoice email and store its PDF on the invoice.
+
+    Args:
+        invoice: Invoice object
+        user: User object to get company information from
+        custom_message: Optional custom message to include
+
+    Returns:
+        tuple: (subject, html_content, pdf_file_path or None)
+    """
+    # 1. Build context
+    print(f"Building context for invoice {invoice.id}...")
+    context = build_invoice_context(invoice, user)
+    print(f"Context built successfully with {len(context)} items")
+
+    # Add custom message if provided
+    if custom_message:
+        context["custom_message"] = custom_message
+
+    # 2. Render template to HTML
+    print("Rendering template...")
+    template_content = email_service._load_template("invoice_email_template.html")
+    html_content = email_service._render_template(template_content, context)
+    print(f"Template rendered successfully ({len(html_content)} characters)")
+
+    # 3. Generate PDF (reused when the invoice content has not changed)
+    print("Generating PDF...")
+    previous_hash = invoice.pdf_hash
+    pdf_file_path = generate_invoice_pdf(invoice, html_content)
+    if pdf_file_path and invoice.pdf_hash != previous_hash:
+        print(f"PDF generated and saved to database: {pdf_file_path}")
+        # Persist only the PDF file reference
+        invoice.save(update_fields=["pdf_file", "pdf_hash", "updated_at"])
+        print("Invoice saved with PDF file")
+
+    return invoice_email_subject(invoice), html_content, pdf_file_path
+
+
 def send_invoice_email(invoice, user=None, custom_message=None):
     """
     Send invoice email using the existing email service.
@@ -1293,49 +1402,18 @@ def send_invoice_email(invoice, user=None, custom_message=None):
         dict: Result with success status and details
     """
     try:
-        # 1. Build context
-        print(f"Building context for invoice {invoice.id}...")
-        context = build_invoice_context(invoice, user)
-        print(f"Context built successfully with {len(context)} items")
-
-        # Add custom message if provided
-        if custom_message:
-            context["custom_message"] = custom_message
-
-        # 2. Render template to HTML
-        print("Rendering template...")
-        template_content = email_service._load_template("invoice_email_template.html")
-        html_content = email_service._render_template(template_content, context)
-        print(f"Template rendered successfully ({len(html_content)} characters)")
-
-        # 3. Generate PDF
-        print("Generating PDF...")
-        pdf_file_path = generate_invoice_pdf(invoice, html_content)
-        if pdf_file_path:
-            print(f"PDF generated and saved to database: {pdf_file_path}")
-            # Save the invoice to persist the PDF file reference
-            invoice.save()
-            print("Invoice saved with PDF file")
-
-        # 3. Send email using existing email service
+        subject, html_content, pdf_file_path = render_invoice_email(
+            invoice, user, custom_message
+        )
+
+        # 4. Send email using existing email service
         print("Sending email...")
         recipient_email = _get_recipient_email(invoice)
         if not recipient_email:
             print("No recipient email found")
             return {"success": False, "error": "No recipient email found"}
 
-        # Create appropriate subject based on status
-        if invoice.status.upper() == "CANCELLED":
-            subject = f"Invoice INV-{invoice.invoice_number:04d} - CANCELLED"
-        else:
-            subject = f"Invoice INV-{invoice.invoice_number:04d} - {invoice.status}"
-
-        email_sent = email_service.send_template_email(
-            recipient_email=recipient_email,
-            subject=subject,
-            template_name="invoice_email_template.html",
-            context=context,
-        )
+        email_sent = email_service._send_email(recipient_email, subject, html_content)
         print(f"Email sent: {email_sent}")
 
         return {
@@ -1352,6 +1430,31 @@ def send_invoice_email(invoice, user=None, custom_message=None):
         return {"success": False, "error": str(e)}
 
 
+def reminder_email_subject(invoice, reminder_type="upcoming"):
+    """Subject line for a reminder email"""
+    if reminder_type == "outstanding":
+        return f"Outstanding Invoice Reminder: INV-{invoice.invoice_number:04d}"
+    elif reminder_type == "overdue":
+        return f"Overdue Invoice Reminder: INV-{invoice.invoice_number:04d}"
+    return f"Upcoming Invoice: INV-{invoice.invoice_number:04d}"
+
+
+def render_reminder_email(invoice, user=None, reminder_type="upcoming"):
+    """
+    Render the reminder email for an invoice.
+
+    Returns:
+        tuple: (subject, html_content)
+    """
+    print(f"Building reminder context for invoice {invoice.id}...")
+    context = build_reminder_context(invoice, user, reminder_type)
+    print(f"Reminder context built successfully with {len(context)} items")
+
+    template_content = email_service._load_template("rent_reminder.html")
+    html_content = email_service._render_template(template_content, context)
+    return reminder_email_subject(invoice, reminder_type), html_content
+
+
 def send_reminder_email(invoice, user=None, reminder_type="upcoming"):
     """
     Send reminder email using the existing email service.
@@ -1365,32 +1468,15 @@ def send_reminder_email(invoice, user=None, reminder_type="upcoming"):
         dict: Result with success status and details
     """
     try:
-        # 1. Build reminder context
-        print(f"Building reminder context for invoice {invoice.id}...")
-        context = build_reminder_context(invoice, user, reminder_type)
-        print(f"Reminder context built successfully with {len(context)} items")
-
-        # 2. Send email using existing email service
-        print("Sending reminder email...")
         recipient_email = _get_recipient_email(invoice)
         if not recipient_email:
             print("No recipient email found")
             return {"success": False, "error": "No recipient email found"}
 
-        # Create appropriate subject based on reminder type
-        if reminder_type == "outstanding":
-            subject = f"Outstanding Invoice Reminder: INV-{invoice.invoice_number:04d}"
-        elif reminder_type == "overdue":
-            subject = f"Overdue Invoice Reminder: INV-{invoice.invoice_number:04d}"
-        else:
-            subject = f"Upcoming Invoice: INV-{invoice.invoice_number:04d}"
+        subject, html_content = render_reminder_email(invoice, user, reminder_type)
 
-        email_sent = email_service.send_template_email(
-            recipient_email=recipient_email,
-            subject=subject,
-            template_name="rent_reminder.html",
-            context=context,
-        )
+        print("Sending reminder email...")
+        email_sent = email_service._send_email(recipient_email, subject, html_content)
         print(f"Reminder email sent: {email_sent}")
 
         return {
@@ -0,0 +1,202 @@
+"""
+Invoice PDF rendering.
+
+WeasyPrint rendering is the most CPU-heavy step of billing, so this module:
+
+- keys every render by a hash of the rendered invoice HTML (items, totals,
+  status and company details all end up in it) and lets callers reuse the
+  PDF already stored on the invoice when nothing changed;
+- builds the A4 page wrapper once per process and shares one font
+  configuration and image cache across renders, so the company logo and
+  fonts are decoded once per worker instead of once per invoice;
+- renders batches in a process pool for month-start runs.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import weasyprint
+
+from weasyprint.text.fonts import FontConfiguration
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever INVOICE_PDF_CSS or the wrapper changes so stored PDFs are re-rendered
+PDF_RENDER_VERSION = "1"
+
+# A4 formatting shared by every invoice PDF. It stays an inline <style> ahead of
+# the template so the template's own rules keep precedence, exactly as before.
+INVOICE_PDF_CSS = """
+    @page { size: A4; margin: 0; padding: 0; }
+
+    body {
+        font-family: Arial, sans-serif;
+        font-size: 12px;
+        line-height: 1.4;
+        color: #333;
+        margin: 0;
+        padding: 0;
+        width: 100%;
+        height: 100%;
+    }
+
+    .invoice-container { width: 100%; height: 100%; margin: 0; padding: 0; }
+
+    .header {
+        display: flex;
+        justify-content: space-between;
+        align-items: flex-start;
+        margin: 0;
+        padding: 10px;
+        page-break-inside: avoid;
+    }
+
+    .company-info { flex: 1; max-width: 50%; }
+
+    .invoice-info { flex: 1; text-align: right; max-width: 50%; }
+
+    .recipient-info { margin: 0; padding: 10px; page-break-inside: avoid; }
+
+    .items-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 0;
+        padding: 0;
+        page-break-inside: avoid;
+    }
+
+    .items-table th,
+    .items-table td {
+        border: 1px solid #ddd;
+        padding: 4px;
+        text-align: left;
+        word-wrap: break-word;
+        overflow-wrap: break-word;
+    }
+
+    .items-table th { background-color: #f5f5f5; font-weight: bold; }
+
+    .summary-section { margin: 0; padding: 10px; page-break-inside: avoid; }
+
+    .summary-table {
+        width: 100%;
+        max-width: 300px;
+        margin-left: auto;
+        border-collapse: collapse;
+    }
+
+    .summary-table td { padding: 3px 8px; border-bottom: 1px solid #ddd; }
+
+    .total-row { font-weight: bold; border-top: 2px solid #333; }
+
+    .text-wrap {
+        word-wrap: break-word;
+        overflow-wrap: break-word;
+        white-space: normal;
+    }
+
+    .long-text { max-width: 200px; word-wrap: break-word; overflow-wrap: break-word; }
+
+    @media print {
+        .page-break { page-break-before: always; }
+        .no-break { page-break-inside: avoid; }
+    }
+"""
+
+_PAGE_HEAD = (
+    "<!DOCTYPE html><html><head>"
+    '<meta charset="UTF-8">'
+    '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+    f"<style>{INVOICE_PDF_CSS}</style>"
+    '</head><body><div class="invoice-container">'
+)
+_PAGE_TAIL = "</div></body></html>"
+
+# Per-process render state, created lazily (and again after a fork)
+_font_config = None
+_image_cache: Dict = {}
+
+
+def _render_state():
+    global _font_config
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    return _font_config, _image_cache
+
+
+def invoice_pdf_hash(html_content: str) -> str:
+    """Content hash identifying the PDF an invoice HTML renders to"""
+    digest = hashlib.sha256(PDF_RENDER_VERSION.encode())
+    digest.update(html_content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_pdf_bytes(html_content: str) -> bytes:
+    """Render invoice HTML to A4 PDF bytes"""
+    font_config, image_cache = _render_state()
+    return weasyprint.HTML(string=_PAGE_HEAD + html_content + _PAGE_TAIL).write_pdf(
+        presentational_hints=True, font_config=font_config, cache=image_cache
+    )
+
+
+def stored_pdf_is_current(invoice, content_hash: str) -> bool:
+    """True when the invoice already holds the PDF for ``content_hash``"""
+    if not invoice.pdf_file or invoice.pdf_hash != content_hash:
+        return False
+    try:
+        return invoice.pdf_file.storage.exists(invoice.pdf_file.name)
+    except Exception as e:
+        logger.warning(f"Could not check stored PDF for invoice {invoice.id}: {e}")
+        return False
+
+
+def render_pdf_batch(
+    html_documents: List[str], workers: Optional[int] = None
+) -> List[Optional[bytes]]:
+    """
+    Render several invoice HTML documents, in parallel where possible.
+
+    Results keep the input order; a failed render yields ``None``. Daemonic
+    processes (Celery prefork children) cannot start a pool, so they render
+    serially.
+    """
+    workers = workers or os.cpu_count() or 1
+    if (
+        workers <= 1
+        or len(html_documents) <= 1
+        or multiprocessing.current_process().daemon
+    ):
+        return [_safe_render(html) for html in html_documents]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_safe_render, html_documents, chunksize=8))
+
+
+def _safe_render(html_content: str) -> Optional[bytes]:
+    try:
+        return render_pdf_bytes(html_content)
+    except Exception as e:
+        logger.error(f"Error generating PDF: {e}")
+        return None
+
+
+def pdf_filename(invoice) -> str:
+    return f"invoice_{invoice.invoice_number:04d}_{invoice.id}.pdf"
+
+
+def split_stale(invoices_html: List[Tuple]) -> List[Tuple]:
+    """
+    Keep the ``(invoice, html_content)`` pairs whose stored PDF is out of date,
+    adding each one's content hash: ``(invoice, html_content, content_hash)``
+    """
+    stale = []
+    for invoice, html_content in invoices_html:
+        content_hash = invoice_pdf_hash(html_content)
+        if not stored_pdf_is_current(invoice, content_hash):
+            stale.append((invoice, html_content, content_hash))
+    return stale
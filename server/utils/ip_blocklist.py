@@ -0,0 +1,195 @@
+"""
+Per-process IP blocklist.
+
+``IPBlockMiddleware`` runs on every request, so blocked addresses are kept
+in memory instead of being looked up in Postgres each time. Each process
+loads the active ``BlockedIP`` rows at startup. Entries may be single
+addresses or CIDR ranges (``10.0.0.0/8``). A background thread listens on
+a Redis channel and reloads the list whenever a ``BlockedIP`` row changes,
+and also every ``BLOCKLIST_MAX_AGE_SECONDS`` to catch edits made outside
+the ORM. Until the first load succeeds, lookups go to the database.
+"""
+
+import ipaddress
+import logging
+import os
+import threading
+import time
+
+import redis
+
+from django.db import close_old_connections, transaction
+
+from utils.redis_pubsub import LISTENER_MAX_BACKOFF_SECONDS, get_redis
+
+logger = logging.getLogger(__name__)
+
+BLOCKLIST_CHANNEL = "ip_blocklist:changed"
+# Reload even without a notification after this long
+BLOCKLIST_MAX_AGE_SECONDS = 300
+BLOCKLIST_POLL_SECONDS = 5.0
+
+
+def _parse_entry(value):
+    """IP address or network for a ``blocked_ip`` value, None if invalid"""
+    value = (value or "").strip()
+    try:
+        if "/" in value:
+            return ipaddress.ip_network(value, strict=False)
+        return ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+
+def _prefix(address, prefixlen):
+    return int(address) >> (address.max_prefixlen - prefixlen)
+
+
+class IPBlocklist:
+    """
+    Exact addresses in one set, ranges as one set of network prefixes per
+    (version, prefix length), so a lookup is a handful of set probes
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (addresses, {(version, prefixlen): prefixes}, raw values)
+        self._entries = None
+        self._loaded_at = 0.0
+        self._thread = None
+        self._pid = None
+
+    @property
+    def loaded(self):
+        return self._entries is not None
+
+    def start(self):
+        """Load the list and start the invalidation listener"""
+        with self._lock:
+            self._ensure_running()
+        if not self.loaded:
+            self.reload()
+
+    def contains(self, ip):
+        """
+        Whether ``ip`` is blocked, or None when the list has not been loaded
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                self._ensure_running()
+        entries = self._entries
+        if entries is None:
+            return None
+        addresses, networks, raw = entries
+
+        address = _parse_entry(ip)
+        if not isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+            return ip in raw
+        if address in addresses:
+            return True
+        for (version, prefixlen), prefixes in networks.items():
+            if version == address.version and _prefix(address, prefixlen) in prefixes:
+                return True
+        return False
+
+    def reload(self):
+        from accounts.models import BlockedIP
+
+        close_old_connections()
+        try:
+            values = list(
+                BlockedIP.objects.filter(is_unblocked=True).values_list(
+                    "blocked_ip", flat=True
+                )
+            )
+        except Exception as e:
+            logger.error(f"❌ Could not load IP blocklist: {e}")
+            return False
+
+        addresses = set()
+        networks = {}
+        for value in values:
+            entry = _parse_entry(value)
+            if entry is None:
+                continue
+            if isinstance(entry, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+                networks.setdefault((entry.version, entry.prefixlen), set()).add(
+                    _prefix(entry.network_address, entry.prefixlen)
+                )
+            else:
+                addresses.add(entry)
+
+        self._entries = (
+            frozenset(addresses),
+            {key: frozenset(prefixes) for key, prefixes in networks.items()},
+            frozenset(values),
+        )
+        self._loaded_at = time.monotonic()
+        return True
+
+    def _ensure_running(self):
+        if self._pid != os.getpid():
+            # Forked worker: the parent's listener thread does not exist here
+            self._thread = None
+            self._pid = os.getpid()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="ip-blocklist-listener", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(BLOCKLIST_CHANNEL)
+                backoff = 1
+                # Changes published while we were (re)connecting
+                self.reload()
+                while True:
+                    message = pubsub.get_message(timeout=BLOCKLIST_POLL_SECONDS)
+                    stale = (
+                        time.monotonic() - self._loaded_at > BLOCKLIST_MAX_AGE_SECONDS
+                    )
+                    if message or stale:
+                        self.reload()
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ IP blocklist listener lost Redis, retrying: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, LISTENER_MAX_BACKOFF_SECONDS)
+            except Exception as e:
+                logger.error(f"❌ IP blocklist listener error: {e}")
+                time.sleep(backoff)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+blocklist = IPBlocklist()
+
+
+def is_ip_blocked(ip):
+    """Blocklist lookup, falling back to the database until it is loaded"""
+    blocked = blocklist.contains(ip)
+    if blocked is None:
+        from accounts.models import BlockedIP
+
+        return BlockedIP.objects.filter(blocked_ip=ip, is_unblocked=True).exists()
+    return blocked
+
+
+def publish_blocklist_change(ip=""):
+    """Tell every process to reload its blocklist once the transaction commits"""
+
+    def publish():
+        try:
+            get_redis().publish(BLOCKLIST_CHANNEL, ip or "")
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Could not publish IP blocklist change: {e}")
+        # This process reloads right away instead of waiting for its listener
+        blocklist.reload()
+
+    transaction.on_commit(publish)
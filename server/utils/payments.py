@@ -1,4 +1,4 @@
-import requests
+from utils.sasapay import SASAPAY_TIMEOUT, gateway_url, get_session, parse_response
 
 
 def get_payment_request(
@@ -27,7 +27,7 @@ def get_payment_request(
         currency (str, optional): Currency code. Defaults to "KES"
         transaction_fee (int, optional): Transaction fee. Defaults to 0
     """
-    url = "https://sandbox.sasapay.app/api/v1/payments/request-payment/"
+    url = gateway_url("/api/v1/payments/request-payment/")
 
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
@@ -43,8 +43,10 @@ def get_payment_request(
         "AccountReference": account_ref,
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    return response.json()
+    response = get_session().post(
+        url, headers=headers, json=payload, timeout=SASAPAY_TIMEOUT
+    )
+    return parse_response(response)
 
 
 def payout_withdrawal(
@@ -58,7 +60,7 @@ def payout_withdrawal(
     token,
     Currency="KES",
 ):
-    url = "https://sandbox.sasapay.app/api/v1/payments/b2c/"
+    url = gateway_url("/api/v1/payments/b2c/")
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     payload = {
         "MerchantCode": MerchantCode,
@@ -71,8 +73,10 @@ def payout_withdrawal(
         "Currency": Currency,
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    return response.json()
+    response = get_session().post(
+        url, headers=headers, json=payload, timeout=SASAPAY_TIMEOUT
+    )
+    return parse_response(response)
 
 
 def pay_bills(
@@ -88,7 +92,7 @@ def pay_bills(
     reason,
     CallBackURL,
 ):
-    url = "https://api.sasapay.app/api/v2/waas/payments/pay-bills/"
+    url = gateway_url("/api/v2/waas/payments/pay-bills/", "api")
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     payload = {
@@ -105,18 +109,25 @@ def pay_bills(
         "callbackUrl": CallBackURL,
         "reason": reason,
     }
-    response = requests.post(url, headers=headers, json=payload)
-    return response.json()
+    response = get_session().post(
+        url, headers=headers, json=payload, timeout=SASAPAY_TIMEOUT
+    )
+    return parse_response(response)
 
 
 def check_account_balance(
     merchant_code,
     token,
 ):
-    url = f" https://sandbox.sasapay.app/api/v2/waas/merchant-balances/?merchantCode={merchant_code}"
+    url = gateway_url("/api/v2/waas/merchant-balances/")
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    response = requests.get(url, headers=headers)
-    return response.json()
+    response = get_session().get(
+        url,
+        headers=headers,
+        params={"merchantCode": merchant_code},
+        timeout=SASAPAY_TIMEOUT,
+    )
+    return parse_response(response)
 
 
 def submit_business_details(
@@ -147,7 +158,7 @@ def submit_business_details(
     CallbackUrl,
     directors,
 ):
-    url = "https://sandbox.sasapay.app/api/v2/waas/business-onboarding/"
+    url = gateway_url("/api/v2/waas/business-onboarding/")
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     payload = {
         "merchantCode": merchant_code,
@@ -177,8 +188,10 @@ def submit_business_details(
         "directors": directors,
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    response_data = response.json()
+    response = get_session().post(
+        url, headers=headers, json=payload, timeout=SASAPAY_TIMEOUT
+    )
+    response_data = parse_response(response)
 
     return response_data
 
@@ -193,7 +206,7 @@ def business_onboarding_confirmation(
     Confirm business onboarding with OTP verification.
     This is called after receiving the first response with OTP.
     """
-    url = "https://sandbox.sasapay.app/api/v2/waas/business-onboarding/confirmation/"
+    url = gateway_url("/api/v2/waas/business-onboarding/confirmation/")
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     payload = {
         "merchantCode": merchant_code,
@@ -201,8 +214,10 @@ def business_onboarding_confirmation(
         "requestId": requestId,
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    response_data = response.json()
+    response = get_session().post(
+        url, headers=headers, json=payload, timeout=SASAPAY_TIMEOUT
+    )
+    response_data = parse_response(response)
 
     return response_data
 
@@ -245,7 +260,7 @@ def submit_kyc_to_sasapay(
     }
     """
     # Use the correct SasaPay KYC endpoint
-    url = "https://sasapay.app/api/v2/waas/business-onboarding/kyc/"
+    url = gateway_url("/api/v2/waas/business-onboarding/kyc/", "kyc")
     # url = "https://webhook.site/6fb3e235-5a18-4dde-8b1b-e30bed8b3266"
     # Validate required parameters
     if not token:
@@ -314,7 +329,9 @@ def submit_kyc_to_sasapay(
         "Accept": "application/json",
     }
 
-    response = requests.post(url, headers=headers, files=files, data=data, timeout=30)
+    response = get_session().post(
+        url, headers=headers, files=files, data=data, timeout=SASAPAY_TIMEOUT
+    )
 
     # Debug: Print the raw response details
     print(f"Status Code: {response.status_code}")
@@ -322,4 +339,4 @@ def submit_kyc_to_sasapay(
     print(f"Response Text: {response.text}")
     print(f"Response Content: {response.content}")
 
-    return response.json()
+    return parse_response(response)
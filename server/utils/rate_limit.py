@@ -0,0 +1,120 @@
+"""
+Atomic rate limiting on Redis.
+
+Each check is a single Lua script call, so concurrent requests are counted
+correctly and cost one round trip:
+
+- ``incr_counter`` counts events in a fixed window that starts with the
+  first event (the expiry is set once, never pushed back).
+- ``hit`` is a sliding-window limiter. It weighs the previous fixed window
+  by how much of it still overlaps the sliding window, so each key needs
+  two counters, however large the limit.
+
+Keys live in the ``cache-for-ratelimiting`` Redis database.
+"""
+
+import time
+
+from dataclasses import dataclass
+
+from django_redis import get_redis_connection
+
+RATE_LIMIT_CACHE = "cache-for-ratelimiting"
+KEY_PREFIX = "rl"
+
+# KEYS[1] counter; ARGV[1] window seconds
+_INCR_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+# KEYS[1] current window, KEYS[2] previous window
+# ARGV[1] limit, ARGV[2] counter ttl, ARGV[3] previous window weight
+_SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[3]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {1, current, previous}
+"""
+
+_scripts = {}
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    # Estimated requests in the sliding window, this one included if allowed
+    count: float
+    limit: int
+    # Seconds until the next request would be allowed (0 when allowed)
+    retry_after: float
+
+
+def get_rate_limit_redis():
+    return get_redis_connection(RATE_LIMIT_CACHE)
+
+
+def _script(client, source):
+    # Registered once per client; redis-py falls back from EVALSHA to EVAL
+    key = (id(client.connection_pool), source)
+    script = _scripts.get(key)
+    if script is None:
+        script = _scripts[key] = client.register_script(source)
+    return script
+
+
+def _key(key):
+    return f"{KEY_PREFIX}:{key}"
+
+
+def incr_counter(key, window):
+    """Count one event, returning the number of events in the current window"""
+    client = get_rate_limit_redis()
+    return int(_script(client, _INCR_SCRIPT)(keys=[_key(key)], args=[int(window)]))
+
+
+def reset_counter(key):
+    get_rate_limit_redis().delete(_key(key))
+
+
+def hit(key, limit, window, now=None):
+    """
+    Record a request against ``key`` unless it already made ``limit``
+    requests in the last ``window`` seconds
+    """
+    now = time.time() if now is None else now
+    window = int(window)
+    index, elapsed = divmod(now, window)
+    weight = 1 - elapsed / window
+    base = _key(key)
+
+    client = get_rate_limit_redis()
+    allowed, current, previous = _script(client, _SLIDING_WINDOW_SCRIPT)(
+        keys=[f"{base}:{int(index)}", f"{base}:{int(index) - 1}"],
+        args=[int(limit), window * 2, f"{weight:.6f}"],
+    )
+    current, previous = int(current), int(previous)
+    count = previous * weight + current
+
+    if allowed:
+        return RateLimitResult(True, count, limit, 0)
+
+    if current >= limit:
+        # Only the next window can make room
+        retry_after = window - elapsed
+    else:
+        # The previous window's share has to fade below the remaining room,
+        # which happens at the latest when the window rolls over
+        retry_after = min(
+            window * (weight - (limit - current) / previous), window - elapsed
+        )
+    return RateLimitResult(False, count, limit, max(retry_after, 0))
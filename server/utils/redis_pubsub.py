@@ -1,79 +1,317 @@
+"""
+Payment, payout and expense status notifications over Redis pub/sub.
+
+Callback handlers publish a status with ``notify_*``. Request handlers wait
+for it with ``wait_for_*`` (threads) or ``async_wait_for_*`` (ASGI views and
+consumers).
+
+Waiting does not cost a connection per request: each process keeps one
+pattern subscription on all status channels, in a background thread (or one
+task per event loop for the asyncio variant), and hands incoming statuses to
+the futures waiting on that channel. The last status of a channel is also
+kept for a short while, so a callback that lands before the request starts
+waiting is not lost.
+"""
+
+import asyncio
 import json
+import logging
 import os
+import threading
 import time
+import weakref
+
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
 
 REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_PUBSUB_MAX_CONNECTIONS = int(os.getenv("REDIS_PUBSUB_MAX_CONNECTIONS", 20))
+
+STATUS_CHANNEL_PATTERNS = ("payment_status:*", "payout_status:*", "expense_status:*")
+# How long a published status stays readable for late waiters
+STATUS_RETENTION_SECONDS = 300
+# Upper bound on a single blocking read of the listener
+LISTENER_POLL_SECONDS = 1.0
+LISTENER_MAX_BACKOFF_SECONDS = 30
+
+_pool = None
+_pool_lock = threading.Lock()
 
 
 def get_redis():
-    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+    """Client on the process-wide connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool(
+                    host=REDIS_HOST,
+                    port=REDIS_PORT,
+                    db=REDIS_DB,
+                    max_connections=REDIS_PUBSUB_MAX_CONNECTIONS,
+                )
+    return redis.Redis(connection_pool=_pool)
 
 
-def wait_for_payment_status(transaction_id, timeout=90):
-    r = get_redis()
-    pubsub = r.pubsub()
-    channel = f"payment_status:{transaction_id}"
-    pubsub.subscribe(channel)
-    start = time.time()
-    for message in pubsub.listen():
-        if message["type"] == "message":
-            data = json.loads(message["data"])
-            pubsub.unsubscribe(channel)
-            return data["status"]
-        if time.time() - start > timeout:
-            pubsub.unsubscribe(channel)
+def _status_key(channel):
+    return f"{channel}:last"
+
+
+def _decode_status(data):
+    try:
+        return json.loads(data)["status"]
+    except (TypeError, ValueError, KeyError) as e:
+        logger.warning(f"⚠️ Ignoring malformed status message {data!r}: {e}")
+        return None
+
+
+def _channel_name(channel):
+    return channel.decode() if isinstance(channel, bytes) else channel
+
+
+class StatusListener:
+    """
+    One pattern subscription per process, demultiplexed to waiting futures
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(set)
+        self._thread = None
+        self._pid = None
+
+    def wait(self, channel, timeout):
+        """Block until a status is published on ``channel`` or ``timeout``"""
+        future = Future()
+        with self._lock:
+            self._ensure_running()
+            self._waiters[channel].add(future)
+        try:
+            cached = get_redis().get(_status_key(channel))
+            if cached is not None:
+                return _decode_status(cached)
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
             return None
+        finally:
+            self._discard(channel, future)
+
+    def _discard(self, channel, future):
+        with self._lock:
+            waiters = self._waiters.get(channel)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[channel]
+
+    def _ensure_running(self):
+        if self._pid != os.getpid():
+            # Forked worker: the parent's thread and waiters do not exist here
+            self._waiters.clear()
+            self._thread = None
+            self._pid = os.getpid()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="redis-status-listener", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(*STATUS_CHANNEL_PATTERNS)
+                backoff = 1
+                # Statuses published while we were (re)connecting
+                self._resolve_from_cache()
+                while True:
+                    message = pubsub.get_message(timeout=LISTENER_POLL_SECONDS)
+                    if message:
+                        self._dispatch(
+                            _channel_name(message["channel"]), message["data"]
+                        )
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Status listener lost Redis, retrying: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, LISTENER_MAX_BACKOFF_SECONDS)
+            except Exception as e:
+                logger.error(f"❌ Status listener error: {e}")
+                time.sleep(backoff)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def _dispatch(self, channel, data):
+        with self._lock:
+            waiters = list(self._waiters.get(channel, ()))
+        if not waiters:
+            return
+        status = _decode_status(data)
+        for future in waiters:
+            if not future.done():
+                future.set_result(status)
+
+    def _resolve_from_cache(self):
+        with self._lock:
+            channels = list(self._waiters)
+        if not channels:
+            return
+        cached = get_redis().mget([_status_key(channel) for channel in channels])
+        for channel, data in zip(channels, cached):
+            if data is not None:
+                self._dispatch(channel, data)
+
+
+class AsyncStatusListener:
+    """
+    asyncio counterpart of ``StatusListener``: one subscription task per
+    event loop, resolving asyncio futures
+    """
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._client = aioredis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            max_connections=REDIS_PUBSUB_MAX_CONNECTIONS,
+        )
+        self._task = None
+
+    async def wait(self, channel, timeout):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._waiters[channel].add(future)
+        try:
+            cached = await self._client.get(_status_key(channel))
+            if cached is not None:
+                return _decode_status(cached)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(channel)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[channel]
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(*STATUS_CHANNEL_PATTERNS)
+                backoff = 1
+                await self._resolve_from_cache()
+                while True:
+                    message = await pubsub.get_message(timeout=LISTENER_POLL_SECONDS)
+                    if message:
+                        self._dispatch(
+                            _channel_name(message["channel"]), message["data"]
+                        )
+            except redis.RedisError as e:
+                logger.warning(
+                    f"⚠️ Async status listener lost Redis, retrying: {e}"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, LISTENER_MAX_BACKOFF_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _dispatch(self, channel, data):
+        waiters = self._waiters.get(channel)
+        if not waiters:
+            return
+        status = _decode_status(data)
+        for future in list(waiters):
+            if not future.done():
+                future.set_result(status)
+
+    async def _resolve_from_cache(self):
+        channels = list(self._waiters)
+        if not channels:
+            return
+        cached = await self._client.mget([_status_key(c) for c in channels])
+        for channel, data in zip(channels, cached):
+            if data is not None:
+                self._dispatch(channel, data)
+
+
+_listener = StatusListener()
+_async_listeners = weakref.WeakKeyDictionary()
+
+
+def wait_for_status(channel, timeout):
+    return _listener.wait(channel, timeout)
+
+
+async def async_wait_for_status(channel, timeout):
+    loop = asyncio.get_running_loop()
+    # Loops created per call (async_to_sync) would otherwise keep their listener
+    for stale in [other for other in _async_listeners if other.is_closed()]:
+        del _async_listeners[stale]
+    listener = _async_listeners.get(loop)
+    if listener is None:
+        listener = _async_listeners[loop] = AsyncStatusListener()
+    return await listener.wait(channel, timeout)
+
+
+def notify_status(channel, status):
+    payload = json.dumps({"status": status})
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.set(_status_key(channel), payload, ex=STATUS_RETENTION_SECONDS)
+    pipe.publish(channel, payload)
+    pipe.execute()
+
+
+def wait_for_payment_status(transaction_id, timeout=90):
+    return wait_for_status(f"payment_status:{transaction_id}", timeout)
+
+
+async def async_wait_for_payment_status(transaction_id, timeout=90):
+    return await async_wait_for_status(f"payment_status:{transaction_id}", timeout)
 
 
 def notify_payment_status(transaction_id, status):
-    r = get_redis()
-    channel = f"payment_status:{transaction_id}"
-    r.publish(channel, json.dumps({"status": status}))
+    notify_status(f"payment_status:{transaction_id}", status)
 
 
 def wait_for_payout_status_payout(payout_id, timeout=60):
-    r = get_redis()
-    pubsub = r.pubsub()
-    channel = f"payout_status:{payout_id}"
-    pubsub.subscribe(channel)
-    start = time.time()
-    for message in pubsub.listen():
-        if message["type"] == "message":
-            data = json.loads(message["data"])
-            pubsub.unsubscribe(channel)
-            return data["status"]
-        if time.time() - start > timeout:
-            pubsub.unsubscribe(channel)
-            return None
+    return wait_for_status(f"payout_status:{payout_id}", timeout)
+
+
+async def async_wait_for_payout_status(payout_id, timeout=60):
+    return await async_wait_for_status(f"payout_status:{payout_id}", timeout)
 
 
 def notify_payout_status(payout_id, status):
-    r = get_redis()
-    channel = f"payout_status:{payout_id}"
-    r.publish(channel, json.dumps({"status": status}))
+    notify_status(f"payout_status:{payout_id}", status)
 
 
 def wait_for_expense_status(expense_id, timeout=60):
-    r = get_redis()
-    pubsub = r.pubsub()
-    channel = f"expense_status:{expense_id}"
-    pubsub.subscribe(channel)
-    start = time.time()
-    for message in pubsub.listen():
-        if message["type"] == "message":
-            data = json.loads(message["data"])
-            pubsub.unsubscribe(channel)
-            return data["status"]
-        if time.time() - start > timeout:
-            pubsub.unsubscribe(channel)
-            return None
+    return wait_for_status(f"expense_status:{expense_id}", timeout)
+
+
+async def async_wait_for_expense_status(expense_id, timeout=60):
+    return await async_wait_for_status(f"expense_status:{expense_id}", timeout)
 
 
 def notify_expense_status(expense_id, status):
-    r = get_redis()
-    channel = f"expense_status:{expense_id}"
-    r.publish(channel, json.dumps({"status": status}))
+    notify_status(f"expense_status:{expense_id}", status)
@@ -0,0 +1,203 @@
+"""
+SasaPay gateway client.
+
+- One keep-alive ``requests.Session`` per process for every gateway call.
+- The OAuth access token is cached in Redis until shortly before it
+  expires and shared by all workers; a Redis lock makes sure only one
+  worker fetches a new token when it runs out.
+- The organisation account balance is cached for a short while.
+
+Gateway hosts come from ``SASAPAY_SANDBOX_URL``, ``SASAPAY_API_URL`` and
+``SASAPAY_KYC_URL``.
+"""
+
+import logging
+import os
+import threading
+
+import requests
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import LockError, RedisError
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+SASAPAY_SANDBOX_URL = os.getenv("SASAPAY_SANDBOX_URL", "https://sandbox.sasapay.app")
+SASAPAY_API_URL = os.getenv("SASAPAY_API_URL", "https://api.sasapay.app")
+SASAPAY_KYC_URL = os.getenv("SASAPAY_KYC_URL", "https://sasapay.app")
+
+SASAPAY_TIMEOUT = 30
+SASAPAY_POOL_SIZE = int(os.getenv("SASAPAY_POOL_SIZE", 20))
+
+TOKEN_CACHE_KEY = "sasapay:access_token"
+TOKEN_LOCK_KEY = "sasapay:access_token:lock"
+# Refresh this long before the gateway's expiry
+TOKEN_EXPIRY_MARGIN = 120
+# Used when the token response carries no expires_in
+TOKEN_DEFAULT_TTL = 3600
+
+BALANCE_CACHE_TIMEOUT = 60
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+class SasaPayError(Exception):
+    """Raised when the gateway cannot issue an access token"""
+
+
+def gateway_url(path, host="sandbox"):
+    """Full URL for ``path`` on the sandbox, api or kyc host"""
+    base = {
+        "sandbox": SASAPAY_SANDBOX_URL,
+        "api": SASAPAY_API_URL,
+        "kyc": SASAPAY_KYC_URL,
+    }[host]
+    return f"{base}{path}"
+
+
+def get_session():
+    """Process-wide keep-alive session (recreated after a fork)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                # Only idempotent requests are retried; payments are never resent
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=SASAPAY_POOL_SIZE,
+                    max_retries=Retry(
+                        total=2,
+                        backoff_factor=0.5,
+                        status_forcelist=[502, 503, 504],
+                        allowed_methods=["GET"],
+                    ),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def _fetch_access_token():
+    client_id = os.environ.get("CLIENT_ID")
+    client_secret = os.environ.get("CLIENT_SECRET")
+    if not client_id or not client_secret:
+        raise SasaPayError("CLIENT_ID or CLIENT_SECRET environment variables not set")
+
+    try:
+        response = get_session().get(
+            gateway_url("/api/v1/auth/token/"),
+            auth=HTTPBasicAuth(client_id, client_secret),
+            params={"grant_type": "client_credentials"},
+            timeout=10,
+        )
+    except requests.exceptions.RequestException as e:
+        raise SasaPayError(f"Network error getting token: {e}") from e
+
+    if response.status_code != 200:
+        raise SasaPayError(f"Error getting token: HTTP {response.status_code}")
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise SasaPayError(f"JSON decode error getting token: {e}") from e
+
+    access_token = data.get("access_token")
+    if not access_token:
+        raise SasaPayError("No access_token in response")
+
+    try:
+        expires_in = int(data.get("expires_in") or TOKEN_DEFAULT_TTL)
+    except (TypeError, ValueError):
+        expires_in = TOKEN_DEFAULT_TTL
+    return access_token, expires_in
+
+
+def _store_access_token(access_token, expires_in):
+    cache.set(
+        TOKEN_CACHE_KEY,
+        access_token,
+        timeout=max(expires_in - TOKEN_EXPIRY_MARGIN, 30),
+    )
+
+
+def get_access_token(force_refresh=False):
+    """
+    Current SasaPay access token, fetched at most once per expiry across
+    all workers
+
+    Raises:
+        SasaPayError: when the gateway does not issue a token
+    """
+    if not force_refresh:
+        access_token = cache.get(TOKEN_CACHE_KEY)
+        if access_token:
+            return access_token
+
+    try:
+        lock = get_redis_connection("default").lock(
+            TOKEN_LOCK_KEY, timeout=20, blocking_timeout=15
+        )
+        with lock:
+            # Another worker may have refreshed it while we waited
+            access_token = cache.get(TOKEN_CACHE_KEY)
+            if access_token and not force_refresh:
+                return access_token
+            access_token, expires_in = _fetch_access_token()
+            _store_access_token(access_token, expires_in)
+            return access_token
+    except (LockError, RedisError) as e:
+        logger.warning(f"⚠️ SasaPay token lock unavailable, fetching directly: {e}")
+
+    access_token = cache.get(TOKEN_CACHE_KEY)
+    if access_token and not force_refresh:
+        return access_token
+    access_token, expires_in = _fetch_access_token()
+    try:
+        _store_access_token(access_token, expires_in)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache SasaPay token: {e}")
+    return access_token
+
+
+def invalidate_access_token():
+    cache.delete(TOKEN_CACHE_KEY)
+
+
+def parse_response(response):
+    """Decoded gateway response; a rejected token is dropped from the cache"""
+    if response.status_code == 401:
+        invalidate_access_token()
+    return response.json()
+
+
+def get_org_account_balance(merchant_code):
+    """
+    Merchant balance response, cached for ``BALANCE_CACHE_TIMEOUT`` seconds
+
+    Returns None when no token is available.
+    """
+    cache_key = f"sasapay:balance:{merchant_code}"
+    balance = cache.get(cache_key)
+    if balance is not None:
+        return balance
+
+    from utils.payments import check_account_balance
+
+    try:
+        access_token = get_access_token()
+    except SasaPayError as e:
+        logger.error(f"❌ {e}")
+        return None
+
+    balance = check_account_balance(merchant_code, access_token)
+    if balance.get("responseCode") == "0":
+        cache.set(cache_key, balance, timeout=BALANCE_CACHE_TIMEOUT)
+    return balance
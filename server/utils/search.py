@@ -0,0 +1,89 @@
+"""
+Substring search over users, projects and payment plan templates.
+
+Searched columns carry a trigram GIN index on ``UPPER(column)``
+(``trigram_indexes``), the expression Django compiles ``icontains`` and
+``istartswith`` to on PostgreSQL, so the existing lookups are answered from
+the index instead of a sequential scan. ``search_filter`` matches every word
+of the query against any of the fields; ``search`` also annotates
+``search_rank`` (best trigram similarity plus a bonus for a prefix match) for
+views that list the best matches first.
+
+The indexes need the ``pg_trgm`` extension, which ``ensure_trigram_extension``
+creates before migrations run.
+"""
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest, Upper
+
+# Further words of a query are ignored
+MAX_SEARCH_TERMS = 5
+
+# Added to the rank of rows where a field starts with the query
+PREFIX_MATCH_BONUS = 1.0
+
+USER_SEARCH_FIELDS = ("first_name", "last_name", "email", "phone")
+
+
+def ensure_trigram_extension(sender, using="default", **kwargs):
+    """``pre_migrate`` receiver creating ``pg_trgm`` for the trigram indexes"""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+def trigram_indexes(prefix, *fields):
+    """Trigram GIN indexes serving ``icontains``/``istartswith`` on ``fields``"""
+    return [
+        GinIndex(
+            OpClass(Upper(field), name="gin_trgm_ops"),
+            name=f"{prefix}_{field}_trgm",
+        )
+        for field in fields
+    ]
+
+
+def search_terms(query):
+    return (query or "").split()[:MAX_SEARCH_TERMS]
+
+
+def search_filter(queryset, query, fields):
+    """Rows where every word of ``query`` is contained in one of ``fields``"""
+    for term in search_terms(query):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def search(queryset, query, fields):
+    """
+    ``search_filter`` annotated with ``search_rank``; order by
+    ``-search_rank`` (plus a tie-breaker) to list the best matches first
+    """
+    query = " ".join(search_terms(query))
+    queryset = search_filter(queryset, query, fields)
+    if not query:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    similarities = [TrigramSimilarity(field, query) for field in fields]
+    similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+
+    prefix_match = Q()
+    for field in fields:
+        prefix_match |= Q(**{f"{field}__istartswith": query})
+
+    return queryset.annotate(
+        search_rank=Coalesce(similarity, Value(0.0), output_field=FloatField())
+        + Case(
+            When(prefix_match, then=Value(PREFIX_MATCH_BONUS)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
@@ -0,0 +1,46 @@
+import logging
+
+from redis.exceptions import RedisError
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from utils.rate_limit import hit
+
+logger = logging.getLogger(__name__)
+
+
+class RedisRateThrottleMixin:
+    """
+    Sliding-window throttling with one atomic Redis call per check,
+    instead of the cache get/set round trips of ``SimpleRateThrottle``
+    """
+
+    def allow_request(self, request, view):
+        self._wait = None
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            result = hit(self.key, self.num_requests, self.duration)
+        except RedisError as e:
+            # Do not take the API down with the limiter
+            logger.warning(f"⚠️ Throttle check skipped, Redis unavailable: {e}")
+            return True
+
+        if not result.allowed:
+            self._wait = result.retry_after
+        return result.allowed
+
+    def wait(self):
+        return self._wait
+
+
+class RedisAnonRateThrottle(RedisRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class RedisUserRateThrottle(RedisRateThrottleMixin, UserRateThrottle):
+    pass